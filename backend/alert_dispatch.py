@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower value is dispatched first; types not listed get DEFAULT_PRIORITY
+PANIC_PRIORITY = 0
+ALERT_PRIORITIES = {"panic": PANIC_PRIORITY, "geo_fence": 1, "anomaly": 1, "missing": 1}
+DEFAULT_PRIORITY = 2
+
+
+class AlertDispatcher:
+    """Priority queue between alert producers and storage.
+
+    Producers ``submit`` alerts and get one future per alert back; worker tasks
+    take the most urgent alerts, persist them in batches through ``persist`` and
+    then hand them to ``deliver``. A batch only ever holds alerts of one
+    priority, and ``reserved_workers`` take nothing but panic alerts, so a panic
+    never waits behind a slow geo-fence write. Batches that still fail after
+    ``max_attempts`` land in a bounded dead-letter store for inspection and retry.
+
+    ``saturated`` turns true once ``max_pending`` non-panic alerts are waiting;
+    callers should refuse new work until it clears. Panic alerts are always queued.
+    """
+
+    def __init__(self, persist: Callable[[List[dict]], Awaitable[None]],
+                 deliver: Callable[[List[dict]], None],
+                 workers: int = 2, reserved_workers: int = 1, batch_size: int = 100,
+                 max_pending: int = 5000, max_attempts: int = 3, retry_delay: float = 0.5,
+                 dead_letter_size: int = 1000):
+        self.persist = persist
+        self.deliver = deliver
+        self.workers = workers
+        self.reserved_workers = reserved_workers
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.dead_letters = deque(maxlen=dead_letter_size)
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._available = asyncio.Condition()
+        self._pending_by_priority: Dict[int, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight = 0
+        self.persisted = 0
+        self.batches = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.max_panic_wait = 0.0
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending - self._pending_by_priority.get(PANIC_PRIORITY, 0) >= self.max_pending
+
+    async def submit(self, alerts: List[dict]) -> List[asyncio.Future]:
+        """Queue alerts; each future resolves True once persisted and delivered, False if dead-lettered"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        async with self._available:
+            for alert in alerts:
+                priority = ALERT_PRIORITIES.get(alert.get('alert_type'), DEFAULT_PRIORITY)
+                future = loop.create_future()
+                heapq.heappush(self._heap, (priority, next(self._sequence), time.monotonic(), alert, future))
+                self._pending_by_priority[priority] = self._pending_by_priority.get(priority, 0) + 1
+                futures.append(future)
+            self._available.notify_all()
+        return futures
+
+    async def _next_batch(self, max_priority: float) -> List[tuple]:
+        async with self._available:
+            await self._available.wait_for(lambda: self._heap and self._heap[0][0] <= max_priority)
+            priority = self._heap[0][0]
+            batch = []
+            while self._heap and self._heap[0][0] == priority and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self._heap))
+            self._pending_by_priority[priority] -= len(batch)
+            self._in_flight += 1
+            return batch
+
+    async def _dispatch(self, batch: List[tuple]) -> None:
+        alerts = [entry[3] for entry in batch]
+        error: Optional[Exception] = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.persist(alerts)
+                error = None
+                break
+            except Exception as exc:
+                error = exc
+                if attempt < self.max_attempts:
+                    self.retries += 1
+                    await asyncio.sleep(self.retry_delay * attempt)
+
+        if error is not None:
+            logger.error("Dead-lettering %d %s alerts after %d attempts: %s",
+                         len(alerts), alerts[0].get('alert_type'), self.max_attempts, error)
+            failed_at = datetime.now(timezone.utc).isoformat()
+            for alert in alerts:
+                self.dead_letters.append({"alert": alert, "error": repr(error), "failed_at": failed_at})
+            self.dead_lettered += len(alerts)
+            delivered = False
+        else:
+            self.persisted += len(alerts)
+            self.batches += 1
+            try:
+                self.deliver(alerts)
+            except Exception:
+                logger.exception("Delivering %d persisted alerts failed", len(alerts))
+            delivered = True
+
+        if batch[0][0] == PANIC_PRIORITY:
+            self.max_panic_wait = max(self.max_panic_wait, time.monotonic() - batch[0][2])
+        for entry in batch:
+            if not entry[4].done():
+                entry[4].set_result(delivered)
+
+    async def _work(self, max_priority: float) -> None:
+        while True:
+            batch = await self._next_batch(max_priority)
+            try:
+                await self._dispatch(batch)
+            except Exception:
+                logger.exception("Alert dispatch worker failed on a batch of %d", len(batch))
+            finally:
+                self._in_flight -= 1
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work(PANIC_PRIORITY)) for _ in range(self.reserved_workers)]
+        self._tasks += [asyncio.create_task(self._work(float("inf"))) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Give queued and in-flight alerts up to ``drain_timeout`` seconds to be dispatched, then stop the workers"""
+        deadline = time.monotonic() + drain_timeout
+        while (self._heap or self._in_flight) and self._tasks and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._heap or self._in_flight:
+            logger.warning("Stopped alert dispatcher with %d alerts still queued", len(self._heap))
+        self._in_flight = 0
+
+    async def retry_dead_letters(self) -> int:
+        letters = list(self.dead_letters)
+        self.dead_letters.clear()
+        await self.submit([letter["alert"] for letter in letters])
+        return len(letters)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "pending_by_priority": {str(priority): count for priority, count in self._pending_by_priority.items() if count},
+            "saturated": self.saturated,
+            "persisted": self.persisted,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "dead_letters": len(self.dead_letters),
+            "max_panic_wait_ms": round(self.max_panic_wait * 1000, 2),
+        }
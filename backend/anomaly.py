@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geo_distance import haversine, haversine_matrix
+from geo_index import ZoneIndex
+
+logger = logging.getLogger(__name__)
+
+MISSING = "missing"
+SPEED = "speed"
+STILLNESS = "stillness"
+DEVIATION = "deviation"
+
+# Per-tourist flag bits: each condition alerts once until the tourist recovers from it
+_MISSING_ALERTED = 1
+_STILL_ALERTED = 2
+_DEVIATION_ALERTED = 4
+
+
+class AnomalyEvent(NamedTuple):
+    kind: str
+    tourist_id: str
+    latitude: float
+    longitude: float
+    timestamp: datetime
+    # Meters per second for speed, seconds for stillness/missing, meters for deviation
+    value: float
+    zone: Optional[dict] = None
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def trip_window(start, end) -> Tuple[float, float]:
+    """Epoch bounds of a trip; NaN bounds (never active) when the tourist has no trip dates"""
+    if start is None and end is None:
+        return float("nan"), float("nan")
+
+    def epoch(value, missing: float) -> float:
+        if value is None:
+            return missing
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return _as_utc(value).timestamp()
+
+    return epoch(start, float("-inf")), epoch(end, float("inf"))
+
+
+def itinerary_points(itinerary: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitudes and longitudes of the itinerary stops that carry coordinates"""
+    lats, lngs = [], []
+    for stop in itinerary or ():
+        lat = stop.get('latitude', stop.get('lat'))
+        lng = stop.get('longitude', stop.get('lng'))
+        if lat is not None and lng is not None:
+            lats.append(float(lat))
+            lngs.append(float(lng))
+    return np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+
+
+class AnomalyDetector:
+    """Rolling per-tourist state that flags anomalous movement as pings arrive.
+
+    Each tracked tourist owns one slot in a set of parallel numpy arrays (last fix,
+    stillness anchor, flags), so a ping is an O(1) update and 100k tourists cost a
+    few megabytes. ``observe_many`` checks each fix for an impossible speed jump,
+    a long stillness inside a high-risk zone, and distance from the planned
+    itinerary. ``sweep`` finds every tourist on an active trip (``set_trip``) not
+    heard from for ``missing_after`` seconds in one vectorized pass; a tourist who
+    has no trip or whose trip has ended is just someone who closed the app.
+    """
+
+    def __init__(self, zone_index: ZoneIndex, missing_after: float = 1800, max_speed: float = 70.0,
+                 min_jump: float = 1000.0, still_radius: float = 50.0, still_after: float = 1800,
+                 deviation_meters: float = 5000.0, initial_capacity: int = 1024):
+        self.zone_index = zone_index
+        self.missing_after = missing_after
+        self.max_speed = max_speed
+        self.min_jump = min_jump
+        self.still_radius = still_radius
+        self.still_after = still_after
+        self.deviation_meters = deviation_meters
+        self._slots: Dict[str, int] = {}
+        self._tourist_ids: List[str] = []
+        self._itineraries: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._trips: Dict[str, Tuple[float, float]] = {}
+        self._allocate(initial_capacity)
+        self.events: Dict[str, int] = {MISSING: 0, SPEED: 0, STILLNESS: 0, DEVIATION: 0}
+
+    def _allocate(self, capacity: int) -> None:
+        # Epoch seconds; last_heard is server time so client clock skew cannot fake a silence
+        self._last_ts = np.zeros(capacity, dtype=np.float64)
+        self._last_heard = np.zeros(capacity, dtype=np.float64)
+        self._lat = np.zeros(capacity, dtype=np.float64)
+        self._lng = np.zeros(capacity, dtype=np.float64)
+        self._anchor_lat = np.zeros(capacity, dtype=np.float64)
+        self._anchor_lng = np.zeros(capacity, dtype=np.float64)
+        self._still_since = np.zeros(capacity, dtype=np.float64)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        # Trip bounds in epoch seconds; NaN means no trip, so the missing sweep skips the slot
+        self._trip_start = np.full(capacity, np.nan, dtype=np.float64)
+        self._trip_end = np.full(capacity, np.nan, dtype=np.float64)
+
+    def _arrays(self) -> tuple:
+        return (self._last_ts, self._last_heard, self._lat, self._lng, self._anchor_lat, self._anchor_lng,
+                self._still_since, self._flags, self._trip_start, self._trip_end)
+
+    def _grow(self) -> None:
+        old = self._arrays()
+        self._allocate(len(self._flags) * 2)
+        new = self._arrays()
+        for old_array, new_array in zip(old, new):
+            new_array[:len(old_array)] = old_array
+
+    def __len__(self) -> int:
+        return len(self._tourist_ids)
+
+    def set_itinerary(self, tourist_id: str, itinerary: Sequence[dict]) -> None:
+        lats, lngs = itinerary_points(itinerary)
+        if len(lats):
+            self._itineraries[tourist_id] = (lats, lngs)
+        else:
+            self._itineraries.pop(tourist_id, None)
+
+    def set_trip(self, tourist_id: str, start, end) -> None:
+        """Trip start/end (datetimes or None) bounding when a silence counts as missing"""
+        window = trip_window(start, end)
+        if np.isnan(window[0]):
+            self._trips.pop(tourist_id, None)
+        else:
+            self._trips[tourist_id] = window
+        slot = self._slots.get(tourist_id)
+        if slot is not None:
+            self._trip_start[slot], self._trip_end[slot] = window
+
+    def mark_missing(self, tourist_id: str) -> None:
+        """Record an already-raised missing alert so the sweep does not repeat it"""
+        slot = self._slots.get(tourist_id)
+        if slot is not None:
+            self._flags[slot] |= _MISSING_ALERTED
+
+    def clear(self) -> None:
+        self._slots.clear()
+        self._tourist_ids.clear()
+        self._allocate(len(self._flags))
+
+    def observe_many(self, tourist_ids: Sequence[str], lats: Sequence[float], lngs: Sequence[float],
+                     timestamps: Sequence[datetime], received_at: Optional[float] = None) -> List[AnomalyEvent]:
+        """Advance state for a batch of fixes, which must be in timestamp order"""
+        events: List[AnomalyEvent] = []
+        for tourist_id, lat, lng, timestamp in zip(tourist_ids, lats, lngs, timestamps):
+            timestamp = _as_utc(timestamp)
+            ts = timestamp.timestamp()
+            heard = ts if received_at is None else received_at
+            slot = self._slots.get(tourist_id)
+            if slot is None:
+                if len(self._tourist_ids) == len(self._flags):
+                    self._grow()
+                slot = self._slots[tourist_id] = len(self._tourist_ids)
+                self._tourist_ids.append(tourist_id)
+                self._last_ts[slot] = ts
+                self._last_heard[slot] = heard
+                self._lat[slot] = self._anchor_lat[slot] = lat
+                self._lng[slot] = self._anchor_lng[slot] = lng
+                self._still_since[slot] = ts
+                self._trip_start[slot], self._trip_end[slot] = self._trips.get(tourist_id, (np.nan, np.nan))
+                self._check_deviation(events, slot, tourist_id, lat, lng, timestamp)
+                continue
+
+            self._last_heard[slot] = max(self._last_heard[slot], heard)
+            self._flags[slot] &= ~np.uint8(_MISSING_ALERTED)
+            if ts < self._last_ts[slot]:
+                # A late fix from a client's offline buffer must not rewind movement state
+                continue
+
+            self._check_speed(events, slot, tourist_id, lat, lng, timestamp, ts)
+            self._check_stillness(events, slot, tourist_id, lat, lng, timestamp, ts)
+            self._check_deviation(events, slot, tourist_id, lat, lng, timestamp)
+            self._last_ts[slot] = ts
+            self._lat[slot] = lat
+            self._lng[slot] = lng
+
+        for event in events:
+            self.events[event.kind] += 1
+        return events
+
+    def _check_speed(self, events, slot, tourist_id, lat, lng, timestamp, ts) -> None:
+        distance = haversine(self._lat[slot], self._lng[slot], lat, lng)
+        if distance < self.min_jump:
+            # Short hops are GPS noise whatever the implied speed
+            return
+        elapsed = ts - self._last_ts[slot]
+        speed = distance / elapsed if elapsed > 0 else float("inf")
+        if speed > self.max_speed:
+            events.append(AnomalyEvent(SPEED, tourist_id, lat, lng, timestamp, speed))
+
+    def _check_stillness(self, events, slot, tourist_id, lat, lng, timestamp, ts) -> None:
+        if haversine(self._anchor_lat[slot], self._anchor_lng[slot], lat, lng) > self.still_radius:
+            self._anchor_lat[slot] = lat
+            self._anchor_lng[slot] = lng
+            self._still_since[slot] = ts
+            self._flags[slot] &= ~np.uint8(_STILL_ALERTED)
+            return
+        still_for = ts - self._still_since[slot]
+        if still_for < self.still_after or self._flags[slot] & _STILL_ALERTED:
+            return
+        zones = self.zone_index.zones_containing(lat, lng)
+        if zones:
+            self._flags[slot] |= _STILL_ALERTED
+            zone = max(zones, key=lambda zone: zone['radius'])
+            events.append(AnomalyEvent(STILLNESS, tourist_id, lat, lng, timestamp, still_for, zone))
+
+    def _check_deviation(self, events, slot, tourist_id, lat, lng, timestamp) -> None:
+        itinerary = self._itineraries.get(tourist_id)
+        if itinerary is None:
+            return
+        distance = float(haversine_matrix([lat], [lng], itinerary[0], itinerary[1]).min())
+        if distance <= self.deviation_meters:
+            self._flags[slot] &= ~np.uint8(_DEVIATION_ALERTED)
+        elif not self._flags[slot] & _DEVIATION_ALERTED:
+            self._flags[slot] |= _DEVIATION_ALERTED
+            events.append(AnomalyEvent(DEVIATION, tourist_id, lat, lng, timestamp, distance))
+
+    def sweep(self, now: Optional[float] = None) -> List[AnomalyEvent]:
+        """Flag every tourist on an active trip silent for ``missing_after`` seconds, once per silence"""
+        now = time.time() if now is None else now
+        count = len(self._tourist_ids)
+        silence = now - self._last_heard[:count]
+        # NaN trip bounds compare False, so tourists without a trip are never flagged
+        on_trip = (self._trip_start[:count] <= now) & (now < self._trip_end[:count])
+        rows = np.flatnonzero(
+            (silence >= self.missing_after) & ((self._flags[:count] & _MISSING_ALERTED) == 0) & on_trip
+        )
+        self._flags[rows] |= _MISSING_ALERTED
+        events = [
+            AnomalyEvent(
+                MISSING, self._tourist_ids[row], float(self._lat[row]), float(self._lng[row]),
+                datetime.fromtimestamp(self._last_ts[row], tz=timezone.utc), float(silence[row])
+            )
+            for row in rows.tolist()
+        ]
+        self.events[MISSING] += len(events)
+        return events
+
+    def stats(self) -> dict:
+        count = len(self._tourist_ids)
+        return {
+            "tracked": count,
+            "missing": int(np.count_nonzero(self._flags[:count] & _MISSING_ALERTED)),
+            "itineraries": len(self._itineraries),
+            "trips": len(self._trips),
+            **{f"{kind}_events": total for kind, total in self.events.items()},
+        }
+
+
+async def run_missing_sweep(detector: AnomalyDetector, on_events: Callable[[List[AnomalyEvent]], Awaitable[None]],
+                            interval_seconds: float = 60) -> None:
+    """Sweep for missing tourists every ``interval_seconds`` and hand any hits to ``on_events``"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            events = detector.sweep()
+            if events:
+                logger.info("Missing-tourist sweep flagged %d tourists", len(events))
+                await on_events(events)
+        except Exception:
+            logger.exception("Missing-tourist sweep failed")
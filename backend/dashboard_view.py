@@ -0,0 +1,126 @@
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional
+
+RECENT_ALERTS_LIMIT = 50
+# Upper safety_score bound of each risk band, most at risk first
+RISK_BANDS = (("critical", 40), ("high", 60), ("medium", 80), ("low", 101))
+
+
+def risk_band(safety_score: int) -> str:
+    for band, upper in RISK_BANDS:
+        if safety_score < upper:
+            return band
+    return RISK_BANDS[-1][0]
+
+
+def _created_at_key(alert: dict):
+    created_at = alert.get('created_at')
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if isinstance(created_at, datetime) and created_at.tzinfo is None:
+        # Mongo hands back naive UTC datetimes
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at or datetime.min.replace(tzinfo=timezone.utc)
+
+
+class DashboardSnapshot:
+    """Materialized authority dashboard kept in memory and patched by the write paths.
+
+    Every mutation bumps ``version``; the serialized body is rebuilt lazily at most
+    once per version, so unchanged polls cost nothing and clients can revalidate
+    with the ETag.
+    """
+
+    def __init__(self, serializer: Callable[[dict], bytes]):
+        self._serializer = serializer
+        # Process-unique prefix so ETags from before a restart never match
+        self._epoch = format(int(time.time() * 1000), 'x')
+        self.version = 0
+        self._tourists: Dict[str, dict] = {}
+        self._active_alerts: Dict[str, dict] = {}
+        self._zones: Dict[str, dict] = {}
+        self._body: Optional[bytes] = None
+        self._body_version = -1
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self.version}"'
+
+    def _changed(self) -> None:
+        self.version += 1
+
+    def load(self, tourists: Iterable[dict], active_alerts: Iterable[dict], zones: Iterable[dict]) -> None:
+        self._tourists = {tourist['user_id']: tourist for tourist in tourists}
+        self._active_alerts = {alert['id']: alert for alert in active_alerts}
+        self._zones = {zone['id']: zone for zone in zones}
+        self._changed()
+
+    def has_tourist(self, user_id: str) -> bool:
+        return user_id in self._tourists
+
+    def upsert_tourist(self, profile: dict) -> None:
+        self._tourists[profile['user_id']] = profile
+        self._changed()
+
+    def update_location(self, user_id: str, location: dict) -> None:
+        profile = self._tourists.get(user_id)
+        if profile is None:
+            return
+        profile['current_location'] = location
+        self._changed()
+
+    def update_safety_scores(self, scores: Dict[str, int]) -> None:
+        changed = False
+        for user_id, score in scores.items():
+            profile = self._tourists.get(user_id)
+            if profile is not None:
+                profile['safety_score'] = score
+                changed = True
+        if changed:
+            self._changed()
+
+    def add_alert(self, alert: dict) -> None:
+        if alert.get('status', 'active') != 'active':
+            return
+        self._active_alerts[alert['id']] = alert
+        self._changed()
+
+    def resolve_alert(self, alert_id: str) -> None:
+        if self._active_alerts.pop(alert_id, None) is not None:
+            self._changed()
+
+    def add_zone(self, zone: dict) -> None:
+        self._zones[zone['id']] = zone
+        self._changed()
+
+    def replace_zones(self, zones: Iterable[dict]) -> None:
+        self._zones = {zone['id']: zone for zone in zones}
+        self._changed()
+
+    def render(self) -> dict:
+        # Lowest safety score first so the most at-risk tourists lead the list
+        tourists = sorted(
+            (tourist for tourist in self._tourists.values() if tourist.get('current_location')),
+            key=lambda tourist: tourist.get('safety_score', 100)
+        )
+        risk_counts = {band: 0 for band, _ in RISK_BANDS}
+        for tourist in tourists:
+            risk_counts[risk_band(tourist.get('safety_score', 100))] += 1
+        recent_alerts = heapq.nlargest(RECENT_ALERTS_LIMIT, self._active_alerts.values(), key=_created_at_key)
+        return {
+            "version": self.version,
+            "tourists": len(tourists),
+            "active_alerts": len(self._active_alerts),
+            "tourists_by_risk": risk_counts,
+            "tourist_locations": tourists,
+            "recent_alerts": recent_alerts,
+            "high_risk_zones": list(self._zones.values()),
+        }
+
+    def body(self) -> bytes:
+        if self._body_version != self.version:
+            self._body = self._serializer(self.render())
+            self._body_version = self.version
+        return self._body
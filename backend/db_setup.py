@@ -0,0 +1,138 @@
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+
+logger = logging.getLogger(__name__)
+
+LOCATION_HISTORY_RETENTION_DAYS = int(os.environ.get("LOCATION_HISTORY_RETENTION_DAYS", "30"))
+
+# Every index the API's queries rely on, keyed by collection
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "tourist_profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("current_location.point", GEOSPHERE)], name="current_location_2dsphere"),
+    ],
+    "alerts": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Trailing id matches the (created_at, id) keyset used to page /authority/alerts
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id"),
+        IndexModel([("alert_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="type_created_at_id"),
+        IndexModel([("tourist_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="tourist_created_at_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "location_history": [
+        IndexModel([("tourist_id", ASCENDING), ("bucket_start", ASCENDING)], name="tourist_bucket"),
+        # Hourly downsampling looks for raw buckets only, so thinned ones are never rescanned
+        IndexModel([("resolution", ASCENDING), ("bucket_start", ASCENDING)], name="resolution_bucket"),
+        # Changing the retention on an existing deployment needs a collMod; create_indexes will not alter it
+        IndexModel([("bucket_start", ASCENDING)], name="bucket_ttl",
+                   expireAfterSeconds=LOCATION_HISTORY_RETENTION_DAYS * 86400),
+    ],
+    "high_risk_zones": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("center", GEOSPHERE)], name="center_2dsphere"),
+    ],
+}
+
+# (collection, filter, sort) for each hot-path query that must be served by an index
+HOT_QUERIES: List[Tuple[str, Dict[str, Any], List[Tuple[str, int]]]] = [
+    ("users", {"email": "probe@example.com"}, []),
+    ("users", {"id": "probe"}, []),
+    ("tourist_profiles", {"user_id": "probe"}, []),
+    ("tourist_profiles", {"current_location.point": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [[
+        [77.1, 28.5], [77.3, 28.5], [77.3, 28.7], [77.1, 28.7], [77.1, 28.5]
+    ]]}}}}, []),
+    ("alerts", {"id": "probe"}, []),
+    ("alerts", {"status": "active"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("alerts", {"alert_type": "panic"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("alerts", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("location_history", {"bucket_start": {"$lt": datetime(2000, 1, 1)}, "resolution": 0}, []),
+    # Startup replay of recent fixes
+    ("location_history", {"bucket_start": {"$gte": datetime(2000, 1, 1)}}, [("bucket_start", ASCENDING)]),
+]
+
+
+def geojson_point(latitude: float, longitude: float) -> Dict[str, Any]:
+    # GeoJSON orders coordinates longitude first
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def geojson_box(south: float, west: float, north: float, east: float) -> Dict[str, Any]:
+    return {"type": "Polygon", "coordinates": [[
+        [west, south], [east, south], [east, north], [west, north], [west, south]
+    ]]}
+
+
+class QueryPlanError(RuntimeError):
+    """Raised when a hot query would be answered by a collection scan or an in-memory sort"""
+
+
+async def ensure_indexes(db) -> None:
+    for collection, indexes in INDEXES.items():
+        names = await db[collection].create_indexes(indexes)
+        logger.info("Ensured indexes on %s: %s", collection, ", ".join(names))
+
+
+async def migrate_geojson(db) -> None:
+    """Backfill GeoJSON fields on documents written before they existed; safe to re-run"""
+    zones = await db.high_risk_zones.update_many(
+        {"center": {"$exists": False}},
+        [{"$set": {"center": {"type": "Point", "coordinates": ["$center_lng", "$center_lat"]}}}]
+    )
+    profiles = await db.tourist_profiles.update_many(
+        {"current_location.latitude": {"$exists": True}, "current_location.point": {"$exists": False}},
+        [{"$set": {"current_location.point": {
+            "type": "Point",
+            "coordinates": ["$current_location.longitude", "$current_location.latitude"]
+        }}}]
+    )
+    if zones.modified_count or profiles.modified_count:
+        logger.info("Migrated %d zones and %d tourist locations to GeoJSON", zones.modified_count, profiles.modified_count)
+
+
+async def migrate_resolved_at(db) -> None:
+    """Convert resolve times stored as ISO strings to dates, matching created_at; safe to re-run"""
+    result = await db.alerts.update_many(
+        {"resolved_at": {"$type": "string"}},
+        [{"$set": {"resolved_at": {"$toDate": "$resolved_at"}}}]
+    )
+    if result.modified_count:
+        logger.info("Migrated %d alert resolve times to dates", result.modified_count)
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def verify_query_plans(db) -> None:
+    """Explain every hot query and fail if any winning plan scans the collection or sorts in memory"""
+    offenders = []
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        logger.info("Query plan for %s %s sort=%s: %s", collection, query, sort, " <- ".join(stages))
+        if "COLLSCAN" in stages or (sort and "SORT" in stages):
+            offenders.append(f"{collection} {query} sort={sort}")
+
+    if offenders:
+        raise QueryPlanError("Hot queries fall back to a collection scan or blocking sort: " + "; ".join(offenders))
@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Set
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class EventBus:
+    """In-process asyncio pub/sub used to push alert and location changes to live dashboards.
+
+    Publishing never blocks the request path: a subscriber that falls behind has its
+    oldest queued events dropped rather than slowing down the publisher.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, data: Any) -> None:
+        if not self._subscribers:
+            return
+
+        event: Dict[str, Any] = {
+            "type": event_type,
+            "data": data,
+            "published_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
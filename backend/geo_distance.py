@@ -0,0 +1,55 @@
+import math
+from typing import Sequence
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance between two points in meters using the Haversine formula"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = (math.sin(delta_lat / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
+    return EARTH_RADIUS_M * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_matrix(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    center_lats: Sequence[float],
+    center_lngs: Sequence[float],
+) -> np.ndarray:
+    """Distances in meters from every point to every centre, shaped (points, centres)"""
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lng1 = np.radians(np.asarray(lngs, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(center_lats, dtype=np.float64))[None, :]
+    lng2 = np.radians(np.asarray(center_lngs, dtype=np.float64))[None, :]
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def within_radius(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    center_lats: Sequence[float],
+    center_lngs: Sequence[float],
+    radii: Sequence[float],
+) -> np.ndarray:
+    """Boolean containment mask shaped (points, centres)"""
+    distances = haversine_matrix(lats, lngs, center_lats, center_lngs)
+    return distances <= np.asarray(radii, dtype=np.float64)[None, :]
+
+
+def zones_to_arrays(zones: Sequence[dict]):
+    """Split zone documents into the centre/radius arrays the batch functions take"""
+    center_lats = np.fromiter((zone['center_lat'] for zone in zones), dtype=np.float64, count=len(zones))
+    center_lngs = np.fromiter((zone['center_lng'] for zone in zones), dtype=np.float64, count=len(zones))
+    radii = np.fromiter((zone['radius'] for zone in zones), dtype=np.float64, count=len(zones))
+    return center_lats, center_lngs, radii
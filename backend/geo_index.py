@@ -0,0 +1,113 @@
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from geo_distance import within_radius, zones_to_arrays
+
+METERS_PER_DEGREE_LAT = 111320.0
+DEFAULT_CELL_SIZE_DEG = 0.01  # roughly 1.1km of latitude per cell
+
+
+class ZoneIndex:
+    """In-process grid index over high-risk zones.
+
+    Each zone is registered in every grid cell its bounding circle overlaps, so a
+    lookup only has to look at the handful of zones registered in the point's cell
+    instead of every zone in the database.
+    """
+
+    def __init__(self, cell_size_deg: float = DEFAULT_CELL_SIZE_DEG):
+        self.cell_size_deg = cell_size_deg
+        self._zones: Dict[str, dict] = {}
+        self._zone_cells: Dict[str, List[Tuple[int, int]]] = {}
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def get(self, zone_id: str) -> Optional[dict]:
+        return self._zones.get(zone_id)
+
+    def zones(self) -> List[dict]:
+        return list(self._zones.values())
+
+    @property
+    def max_radius(self) -> float:
+        return max((zone['radius'] for zone in self._zones.values()), default=0.0)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size_deg), math.floor(lng / self.cell_size_deg))
+
+    def _covering_cells(self, zone: dict) -> List[Tuple[int, int]]:
+        lat, lng, radius = zone['center_lat'], zone['center_lng'], zone['radius']
+        delta_lat = radius / METERS_PER_DEGREE_LAT
+        # Clamp near the poles where a degree of longitude collapses to nothing
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        delta_lng = radius / (METERS_PER_DEGREE_LAT * cos_lat)
+
+        min_row, min_col = self._cell(lat - delta_lat, lng - delta_lng)
+        max_row, max_col = self._cell(lat + delta_lat, lng + delta_lng)
+        return [
+            (row, col)
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+        ]
+
+    def add(self, zone: dict) -> None:
+        zone_id = zone['id']
+        if zone_id in self._zones:
+            self.remove(zone_id)
+
+        cells = self._covering_cells(zone)
+        self._zones[zone_id] = zone
+        self._zone_cells[zone_id] = cells
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(zone_id)
+
+    def remove(self, zone_id: str) -> None:
+        self._zones.pop(zone_id, None)
+        for cell in self._zone_cells.pop(zone_id, []):
+            members = self._cells.get(cell)
+            if members is None:
+                continue
+            members.discard(zone_id)
+            if not members:
+                del self._cells[cell]
+
+    def clear(self) -> None:
+        self._zones.clear()
+        self._zone_cells.clear()
+        self._cells.clear()
+
+    def rebuild(self, zones: Iterable[dict]) -> None:
+        self.clear()
+        for zone in zones:
+            self.add(zone)
+
+    def candidates(self, lat: float, lng: float) -> List[dict]:
+        """Zones whose bounding box covers the point's cell; callers still need an exact distance check."""
+        zone_ids = self._cells.get(self._cell(lat, lng), ())
+        return [self._zones[zone_id] for zone_id in zone_ids]
+
+    def zones_containing(self, lat: float, lng: float) -> List[dict]:
+        return self.zones_containing_many([lat], [lng])[0]
+
+    def zones_containing_many(self, lats: Sequence[float], lngs: Sequence[float]) -> List[List[dict]]:
+        """Exact containment for a batch of points, evaluated one vectorized pass per grid cell"""
+        results: List[List[dict]] = [[] for _ in range(len(lats))]
+        points_by_cell: Dict[Tuple[int, int], List[int]] = {}
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            points_by_cell.setdefault(self._cell(lat, lng), []).append(i)
+
+        for cell, point_ids in points_by_cell.items():
+            zone_ids = self._cells.get(cell)
+            if not zone_ids:
+                continue
+            zones = [self._zones[zone_id] for zone_id in zone_ids]
+            mask = within_radius(
+                [lats[i] for i in point_ids],
+                [lngs[i] for i in point_ids],
+                *zones_to_arrays(zones),
+            )
+            for row, i in enumerate(point_ids):
+                results[i] = [zone for zone, hit in zip(zones, mask[row]) if hit]
+        return results
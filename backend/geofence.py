@@ -0,0 +1,121 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Sequence, Set
+
+from geo_distance import haversine
+from geo_index import ZoneIndex
+
+ENTER = "enter"
+EXIT = "exit"
+DWELL = "dwell"
+
+
+class GeofenceEvent(NamedTuple):
+    kind: str
+    tourist_id: str
+    zone: dict
+    latitude: float
+    longitude: float
+    timestamp: datetime
+    dwell_seconds: float = 0.0
+
+
+@dataclass
+class Presence:
+    entered_at: datetime
+    last_seen: datetime
+    dwell_alerted: Set[int] = field(default_factory=set)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class GeofenceTracker:
+    """Per-tourist, per-zone presence state so geo-fence alerts fire on transitions only.
+
+    A tourist enters a zone at its radius but only leaves once they are more than
+    ``exit_margin`` meters outside it, so GPS jitter at the boundary does not flap.
+    While inside, one event fires for each crossed ``dwell_thresholds`` entry (seconds).
+    """
+
+    def __init__(self, zone_index: ZoneIndex, exit_margin: float = 50.0,
+                 dwell_thresholds: Sequence[int] = (600, 1800)):
+        self.zone_index = zone_index
+        self.exit_margin = exit_margin
+        self.dwell_thresholds = sorted(dwell_thresholds)
+        self._presence: Dict[str, Dict[str, Presence]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(zones) for zones in self._presence.values())
+
+    def zones_for(self, tourist_id: str) -> List[str]:
+        return list(self._presence.get(tourist_id, {}))
+
+    def clear(self) -> None:
+        self._presence.clear()
+
+    def evaluate_many(self, tourist_ids: Sequence[str], lats: Sequence[float], lngs: Sequence[float],
+                      timestamps: Sequence[datetime]) -> List[GeofenceEvent]:
+        """Advance state for a batch of fixes, which must be in timestamp order"""
+        containing = self.zone_index.zones_containing_many(lats, lngs)
+        events: List[GeofenceEvent] = []
+        for tourist_id, lat, lng, timestamp, zones in zip(tourist_ids, lats, lngs, timestamps, containing):
+            events.extend(self._advance(tourist_id, lat, lng, _as_utc(timestamp), zones))
+        return events
+
+    def _advance(self, tourist_id: str, lat: float, lng: float, timestamp: datetime,
+                 zones_inside: List[dict]) -> List[GeofenceEvent]:
+        events = []
+        presence = self._presence.setdefault(tourist_id, {})
+        if presence and timestamp < max(state.last_seen for state in presence.values()):
+            # A late fix from a client's offline buffer must not rewind presence
+            return events
+        inside_ids = set()
+
+        for zone in zones_inside:
+            inside_ids.add(zone['id'])
+            state = presence.get(zone['id'])
+            if state is None:
+                presence[zone['id']] = Presence(entered_at=timestamp, last_seen=timestamp)
+                events.append(GeofenceEvent(ENTER, tourist_id, zone, lat, lng, timestamp))
+                continue
+            state.last_seen = timestamp
+            events.extend(self._dwell_events(tourist_id, zone, state, lat, lng, timestamp))
+
+        for zone_id in list(presence):
+            if zone_id in inside_ids:
+                continue
+            state = presence[zone_id]
+            zone = self.zone_index.get(zone_id)
+            if zone is None:
+                # Zone was removed; forget it without an exit event
+                del presence[zone_id]
+                continue
+            distance = haversine(lat, lng, zone['center_lat'], zone['center_lng'])
+            if distance > zone['radius'] + self.exit_margin:
+                del presence[zone_id]
+                events.append(GeofenceEvent(
+                    EXIT, tourist_id, zone, lat, lng, timestamp,
+                    dwell_seconds=(timestamp - state.entered_at).total_seconds()
+                ))
+            else:
+                # Inside the hysteresis band: still counts as present
+                state.last_seen = timestamp
+                events.extend(self._dwell_events(tourist_id, zone, state, lat, lng, timestamp))
+
+        if not presence:
+            del self._presence[tourist_id]
+        return events
+
+    def _dwell_events(self, tourist_id: str, zone: dict, state: Presence, lat: float, lng: float,
+                      timestamp: datetime) -> List[GeofenceEvent]:
+        dwell = (timestamp - state.entered_at).total_seconds()
+        events = []
+        for threshold in self.dwell_thresholds:
+            if dwell < threshold:
+                break
+            if threshold not in state.dwell_alerted:
+                state.dwell_alerted.add(threshold)
+                events.append(GeofenceEvent(DWELL, tourist_id, zone, lat, lng, timestamp, dwell_seconds=dwell))
+        return events
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import math
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from geo_distance import within_radius, zones_to_arrays
+from geo_index import METERS_PER_DEGREE_LAT, ZoneIndex
+from safety import RISK_WEIGHTS
+
+# Each tile is split into GRID x GRID cells, so cells at zoom z are tiles at zoom z + GRID_BITS
+GRID_BITS = 5
+GRID = 1 << GRID_BITS
+TILE_PIXELS = 256
+MAX_LATITUDE = 85.05112878
+
+TOURISTS = 0
+ALERTS = 1
+
+Cell = Tuple[int, int]
+TileKey = Tuple[int, int, int]
+
+
+def mercator_cell(lat: float, lng: float, level: int) -> Cell:
+    """Web Mercator cell containing the point, on the 2**level x 2**level grid"""
+    lat = min(max(lat, -MAX_LATITUDE), MAX_LATITUDE)
+    scale = 1 << level
+    lat_rad = math.radians(lat)
+    x = int((lng + 180.0) / 360.0 * scale)
+    y = int((1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0 * scale)
+    return min(max(x, 0), scale - 1), min(max(y, 0), scale - 1)
+
+
+def cell_centers(z: int, x: int, y: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitudes and longitudes of a tile's cell centres, row-major"""
+    scale = float(1 << (z + GRID_BITS))
+    offsets = np.arange(GRID, dtype=np.float64) + 0.5
+    lngs = (x * GRID + offsets) / scale * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (y * GRID + offsets) / scale))))
+    return np.repeat(lats, GRID), np.tile(lngs, GRID)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """South, west, north and east edges of a tile in degrees"""
+    scale = float(1 << z)
+    west = x / scale * 360.0 - 180.0
+    east = (x + 1) / scale * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / scale))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * (y + 1) / scale))))
+    return south, west, north, east
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Minimal RGBA PNG encoder for an (height, width, 4) uint8 array"""
+    height, width, _ = rgba.shape
+    # Filter type 0 (none) in front of every scanline
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+class HeatmapTiles:
+    """Tourist density, active-alert density and zone risk aggregated into map tiles.
+
+    Counts are kept per zoom level in sparse ``{tile: {cell: count}}`` maps and
+    adjusted as tourists move and alerts open or resolve; a move only touches the
+    zoom levels where the old and new cells differ. Rendered tiles are cached
+    (LRU) and dropped whenever a count in them changes; zone edits drop them all.
+    """
+
+    def __init__(self, zone_index: ZoneIndex, min_zoom: int = 4, max_zoom: int = 16, cache_size: int = 4096,
+                 saturation: int = 50, alert_weight: float = 5.0):
+        self.zone_index = zone_index
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.cache_size = cache_size
+        self.saturation = saturation
+        self.alert_weight = alert_weight
+        self._levels = {
+            layer: {z: {} for z in range(min_zoom, max_zoom + 1)} for layer in (TOURISTS, ALERTS)
+        }
+        # Finest-level cell of every tracked tourist and active alert
+        self._tourists: Dict[str, Cell] = {}
+        self._alerts: Dict[str, Cell] = {}
+        self._cache: "OrderedDict[TileKey, Dict[tuple, Tuple[bytes, str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return mercator_cell(lat, lng, self.max_zoom + GRID_BITS)
+
+    def _adjust(self, layer: int, cell: Cell, delta: int, old: Optional[Cell] = None) -> None:
+        """Add ``delta`` at ``cell`` on every zoom level, taking it from ``old`` where that differs"""
+        levels = self._levels[layer]
+        for z in range(self.max_zoom, self.min_zoom - 1, -1):
+            shift = self.max_zoom - z
+            cx, cy = cell[0] >> shift, cell[1] >> shift
+            if old is not None:
+                ox, oy = old[0] >> shift, old[1] >> shift
+                if (ox, oy) == (cx, cy):
+                    # Coarser levels merge the two cells too
+                    return
+                self._count(levels[z], z, ox, oy, -delta)
+            self._count(levels[z], z, cx, cy, delta)
+
+    def _count(self, level: dict, z: int, cx: int, cy: int, delta: int) -> None:
+        tile = (cx >> GRID_BITS, cy >> GRID_BITS)
+        index = (cy & (GRID - 1)) * GRID + (cx & (GRID - 1))
+        cells = level.setdefault(tile, {})
+        count = cells.get(index, 0) + delta
+        if count > 0:
+            cells[index] = count
+        else:
+            cells.pop(index, None)
+            if not cells:
+                del level[tile]
+        self._cache.pop((z,) + tile, None)
+
+    def load(self, tourists: Iterable[dict], active_alerts: Iterable[dict]) -> None:
+        for tourist in tourists:
+            location = tourist.get('current_location')
+            if location:
+                self.move_tourist(tourist['user_id'], location['latitude'], location['longitude'])
+        self.add_alerts(active_alerts)
+
+    def move_tourist(self, tourist_id: str, lat: float, lng: float) -> None:
+        cell = self._cell(lat, lng)
+        old = self._tourists.get(tourist_id)
+        if old == cell:
+            return
+        self._tourists[tourist_id] = cell
+        self._adjust(TOURISTS, cell, 1, old)
+
+    def add_alerts(self, alerts: Iterable[dict]) -> None:
+        for alert in alerts:
+            location = alert.get('location') or {}
+            if alert.get('status', 'active') != 'active' or alert['id'] in self._alerts or 'latitude' not in location:
+                continue
+            cell = self._alerts[alert['id']] = self._cell(location['latitude'], location['longitude'])
+            self._adjust(ALERTS, cell, 1)
+
+    def resolve_alert(self, alert_id: str) -> None:
+        cell = self._alerts.pop(alert_id, None)
+        if cell is not None:
+            self._adjust(ALERTS, cell, -1)
+
+    def zones_changed(self) -> None:
+        self._cache.clear()
+
+    def _risk(self, z: int, x: int, y: int) -> np.ndarray:
+        """Highest zone risk weight per cell: zones covering the cell centre or centred in the cell"""
+        risk = np.zeros(GRID * GRID, dtype=np.float64)
+        zones = self.zone_index.zones()
+        if not zones:
+            return risk
+        south, west, north, east = tile_bounds(z, x, y)
+        center_lats, center_lngs, radii = zones_to_arrays(zones)
+        margin_lat = radii / METERS_PER_DEGREE_LAT
+        margin_lng = margin_lat / np.maximum(np.cos(np.radians(center_lats)), 0.01)
+        near = ((center_lats + margin_lat >= south) & (center_lats - margin_lat <= north)
+                & (center_lngs + margin_lng >= west) & (center_lngs - margin_lng <= east))
+        if not near.any():
+            return risk
+        indices = np.flatnonzero(near)
+        weights = np.array([RISK_WEIGHTS.get(zones[i].get('risk_level'), 0.5) for i in indices])
+        cell_lats, cell_lngs = cell_centers(z, x, y)
+        inside = within_radius(cell_lats, cell_lngs, center_lats[indices], center_lngs[indices], radii[indices])
+        risk = np.max(np.where(inside, weights[None, :], 0.0), axis=1)
+        # Zones smaller than a cell at this zoom still mark the cell they sit in
+        level = z + GRID_BITS
+        for i, weight in zip(indices.tolist(), weights.tolist()):
+            cx, cy = mercator_cell(center_lats[i], center_lngs[i], level)
+            if cx >> GRID_BITS == x and cy >> GRID_BITS == y:
+                index = (cy & (GRID - 1)) * GRID + (cx & (GRID - 1))
+                risk[index] = max(risk[index], weight)
+        return risk
+
+    def _layers(self, z: int, x: int, y: int, activity: bool):
+        tourists = np.zeros(GRID * GRID, dtype=np.int64)
+        alerts = np.zeros(GRID * GRID, dtype=np.int64)
+        if activity:
+            for layer, counts in ((TOURISTS, tourists), (ALERTS, alerts)):
+                cells = self._levels[layer][z].get((x, y))
+                if cells:
+                    counts[list(cells)] = list(cells.values())
+        return tourists, alerts, self._risk(z, x, y)
+
+    def _render_json(self, z: int, x: int, y: int, activity: bool) -> bytes:
+        tourists, alerts, risk = self._layers(z, x, y, activity)
+        occupied = np.flatnonzero((tourists > 0) | (alerts > 0) | (risk > 0))
+        cells = [[index, int(tourists[index]), int(alerts[index]), round(float(risk[index]), 2)]
+                 for index in occupied.tolist()]
+        payload = {"z": z, "x": x, "y": y, "grid": GRID, "fields": ["cell", "tourists", "alerts", "risk"],
+                   "cells": cells}
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    def _render_png(self, z: int, x: int, y: int, activity: bool) -> bytes:
+        tourists, alerts, risk = self._layers(z, x, y, activity)
+        intensity = np.clip(np.log1p(tourists + self.alert_weight * alerts) / math.log1p(self.saturation), 0.0, 1.0)
+        heat = np.maximum(intensity, risk)
+        rgba = np.zeros((GRID * GRID, 4), dtype=np.uint8)
+        # Green through yellow to red as heat rises; empty cells stay transparent
+        rgba[:, 0] = np.clip(heat * 2.0, 0.0, 1.0) * 255
+        rgba[:, 1] = np.clip((1.0 - heat) * 2.0, 0.0, 1.0) * 255
+        rgba[:, 3] = np.where(heat > 0, 80 + heat * 150, 0)
+        scale = TILE_PIXELS // GRID
+        pixels = rgba.reshape(GRID, GRID, 4).repeat(scale, axis=0).repeat(scale, axis=1)
+        return encode_png(pixels)
+
+    def tile(self, z: int, x: int, y: int, tile_format: str = "json", activity: bool = True) -> Tuple[bytes, str]:
+        """Rendered tile body and its ETag, from cache when nothing in the tile changed"""
+        if not self.min_zoom <= z <= self.max_zoom or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+            raise ValueError(f"Tile {z}/{x}/{y} is outside zoom levels {self.min_zoom}-{self.max_zoom}")
+        key = (z, x, y)
+        variant = (tile_format, activity)
+        rendered = self._cache.get(key)
+        if rendered is not None and variant in rendered:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return rendered[variant]
+
+        self.misses += 1
+        body = self._render_png(z, x, y, activity) if tile_format == "png" else self._render_json(z, x, y, activity)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        self._cache.setdefault(key, {})[variant] = (body, etag)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return body, etag
+
+    def stats(self) -> dict:
+        return {
+            "tourists": len(self._tourists),
+            "alerts": len(self._alerts),
+            "cached_tiles": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
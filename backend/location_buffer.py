@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class LatestPositionBuffer:
+    """Write-behind table of each tourist's latest ``current_location``.
+
+    Pings only replace the in-memory entry; a background task hands the coalesced
+    table to ``writer`` (one ``bulk_write`` for Mongo) every ``flush_interval``
+    seconds, or sooner once ``max_pending`` tourists are waiting. Readers should
+    consult ``get`` before falling back to the stored profile.
+
+    A failed or cancelled write puts its entries back for the next flush. An entry
+    that has failed ``max_attempts`` writes without being replaced by a newer fix
+    moves to a bounded dead-letter store, so one unwritable position cannot hold
+    back the batches it shares forever.
+    """
+
+    def __init__(self, writer: Callable[[Dict[str, dict]], Awaitable[None]],
+                 flush_interval: float = 2.0, max_pending: int = 1000, max_attempts: int = 5,
+                 dead_letter_size: int = 1000):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.dead_letters = deque(maxlen=dead_letter_size)
+        # Failed writes per tourist for the entry currently buffered
+        self._attempts: Dict[str, int] = {}
+        self._pending: Dict[str, Tuple[datetime, dict]] = {}
+        # Entries handed to the writer, still readable until the write commits
+        self._inflight: Dict[str, Tuple[datetime, dict]] = {}
+        self._wakeup = asyncio.Event()
+        # One write at a time, so an overlapping flush cannot clear another's in-flight entries
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+        self.written = 0
+        self.dead_lettered = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, user_id: str, location: dict, timestamp: datetime) -> None:
+        timestamp = _as_utc(timestamp)
+        current = self._pending.get(user_id)
+        if current is not None and current[0] > timestamp:
+            return
+        self._pending[user_id] = (timestamp, location)
+        self._attempts.pop(user_id, None)
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._pending.get(user_id) or self._inflight.get(user_id)
+        return entry[1] if entry else None
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            self._inflight = pending
+            try:
+                await self.writer({user_id: location for user_id, (_, location) in pending.items()})
+            except BaseException as exc:
+                # Cancellation included: the batch goes back so the shutdown flush still writes it
+                self._requeue(pending, exc if isinstance(exc, Exception) else None)
+                raise
+            finally:
+                self._inflight = {}
+
+            for user_id in pending:
+                self._attempts.pop(user_id, None)
+            self.flushes += 1
+            self.written += len(pending)
+            return len(pending)
+
+    def _requeue(self, pending: Dict[str, Tuple[datetime, dict]], error: Optional[Exception]) -> None:
+        """Put a failed batch back unless a newer fix arrived while we were writing"""
+        failed_at = datetime.now(timezone.utc).isoformat()
+        for user_id, entry in pending.items():
+            current = self._pending.get(user_id)
+            if current is not None and current[0] >= entry[0]:
+                continue
+            if error is not None:
+                attempts = self._attempts.get(user_id, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(user_id, None)
+                    self.dead_letters.append({
+                        "user_id": user_id, "location": entry[1], "error": repr(error), "failed_at": failed_at
+                    })
+                    self.dead_lettered += 1
+                    logger.error("Dropping buffered location of %s after %d failed writes: %s",
+                                 user_id, attempts, error)
+                    continue
+                self._attempts[user_id] = attempts
+            self._pending[user_id] = entry
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing %d buffered locations failed; will retry", len(self._pending))
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "written": self.written,
+            "dead_lettered": self.dead_lettered,
+            "dead_letters": len(self.dead_letters),
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+RAW_RESOLUTION = 0
+
+# (tourist_id, fix timestamp) position in the tourist-then-time export ordering
+FixPosition = Tuple[str, float]
+
+
+class LocationSample(NamedTuple):
+    tourist_id: str
+    latitude: float
+    longitude: float
+    timestamp: datetime
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def bucket_start(timestamp: datetime) -> datetime:
+    return _as_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_id(tourist_id: str, start: datetime) -> str:
+    return f"{tourist_id}:{start.strftime('%Y%m%d%H')}"
+
+
+def bucket_fixes(bucket: dict, start_ts: float, end_ts: float,
+                  after: Optional[FixPosition]) -> Iterable[LocationSample]:
+    tourist_id = bucket["tourist_id"]
+    for ts, lat, lng in sorted(zip(bucket["ts"], bucket["lats"], bucket["lngs"])):
+        if start_ts <= ts < end_ts and (after is None or (tourist_id, ts) > after):
+            yield LocationSample(tourist_id, lat, lng, datetime.fromtimestamp(ts, timezone.utc))
+
+
+class LocationHistoryStore:
+    """Append-only location trail stored as one document per tourist per hour.
+
+    Each bucket holds parallel ``lats``/``lngs``/``ts`` arrays, so a ping is a single
+    ``$push`` and a trail read touches one document per hour in the window. Buckets
+    older than ``downsample_after`` are thinned to one fix per ``downsample_interval``
+    seconds; expiry is handled by the TTL index on ``bucket_start``.
+    """
+
+    def __init__(self, collection, downsample_after: timedelta = timedelta(hours=24),
+                 downsample_interval: int = 60):
+        self.collection = collection
+        self.downsample_after = downsample_after
+        self.downsample_interval = downsample_interval
+
+    async def append(self, samples: Iterable[LocationSample]) -> None:
+        buckets: Dict[Tuple[str, datetime], List[LocationSample]] = {}
+        for sample in sorted(samples, key=lambda sample: _as_utc(sample.timestamp)):
+            buckets.setdefault((sample.tourist_id, bucket_start(sample.timestamp)), []).append(sample)
+        if not buckets:
+            return
+
+        operations = [
+            UpdateOne(
+                {"_id": bucket_id(tourist_id, start)},
+                {
+                    "$setOnInsert": {"tourist_id": tourist_id, "bucket_start": start, "resolution": RAW_RESOLUTION},
+                    "$push": {
+                        "lats": {"$each": [sample.latitude for sample in bucket]},
+                        "lngs": {"$each": [sample.longitude for sample in bucket]},
+                        "ts": {"$each": [_as_utc(sample.timestamp).timestamp() for sample in bucket]},
+                    },
+                    "$inc": {"count": len(bucket)},
+                },
+                upsert=True,
+            )
+            for (tourist_id, start), bucket in buckets.items()
+        ]
+        await self.collection.bulk_write(operations, ordered=False)
+
+    async def trail(self, tourist_id: str, start: datetime, end: datetime) -> List[dict]:
+        start, end = _as_utc(start), _as_utc(end)
+        cursor = self.collection.find(
+            {"tourist_id": tourist_id, "bucket_start": {"$gte": bucket_start(start), "$lt": end}},
+            {"_id": 0, "lats": 1, "lngs": 1, "ts": 1},
+        ).sort("bucket_start", 1)
+
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        points = []
+        async for bucket in cursor:
+            points.extend(
+                (ts, lat, lng)
+                for lat, lng, ts in zip(bucket["lats"], bucket["lngs"], bucket["ts"])
+                if start_ts <= ts < end_ts
+            )
+        # Buckets are appended in arrival order, which is not always fix order
+        points.sort()
+        return [
+            {"latitude": lat, "longitude": lng, "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat()}
+            for ts, lat, lng in points
+        ]
+
+    async def iter_fixes_since(self, since: datetime, batch_size: int = 500) -> AsyncIterator[LocationSample]:
+        """Stream fixes from ``since`` onwards hour bucket by hour bucket, each tourist's in time order.
+
+        Ordered by ``bucket_start`` alone so the bucket_start index serves the sort; callers that
+        need one tourist's fixes together should use ``iter_fixes``.
+        """
+        since = _as_utc(since)
+        cursor = self.collection.find(
+            {"bucket_start": {"$gte": bucket_start(since)}}, {"_id": 0, "tourist_id": 1, "lats": 1, "lngs": 1, "ts": 1}
+        ).sort("bucket_start", 1).batch_size(batch_size)
+        try:
+            async for bucket in cursor:
+                for sample in bucket_fixes(bucket, since.timestamp(), float("inf"), None):
+                    yield sample
+        finally:
+            await cursor.close()
+
+    async def iter_fixes(self, start: datetime, end: datetime, tourist_id: Optional[str] = None,
+                         after: Optional[FixPosition] = None, batch_size: int = 100) -> AsyncIterator[LocationSample]:
+        """Stream fixes in [start, end) ordered by tourist then time, strictly after ``after``"""
+        start, end = _as_utc(start), _as_utc(end)
+        query = {"bucket_start": {"$gte": bucket_start(start), "$lt": end}}
+        if tourist_id:
+            query["tourist_id"] = tourist_id
+        if after:
+            # The bucket holding the last exported fix is re-read and skipped up to that fix
+            after_tourist, after_ts = after
+            query["$or"] = [
+                {"tourist_id": {"$gt": after_tourist}},
+                {"tourist_id": after_tourist,
+                 "bucket_start": {"$gte": bucket_start(datetime.fromtimestamp(after_ts, timezone.utc))}},
+            ]
+
+        cursor = self.collection.find(
+            query, {"_id": 0, "tourist_id": 1, "lats": 1, "lngs": 1, "ts": 1}
+        ).sort([("tourist_id", 1), ("bucket_start", 1)]).batch_size(batch_size)
+        try:
+            async for bucket in cursor:
+                for sample in bucket_fixes(bucket, start.timestamp(), end.timestamp(), after):
+                    yield sample
+        finally:
+            await cursor.close()
+
+    def _thin(self, bucket: dict) -> dict:
+        latest_per_slot: Dict[int, Tuple[float, float, float]] = {}
+        for lat, lng, ts in zip(bucket["lats"], bucket["lngs"], bucket["ts"]):
+            slot = int(ts // self.downsample_interval)
+            if slot not in latest_per_slot or ts > latest_per_slot[slot][2]:
+                latest_per_slot[slot] = (lat, lng, ts)
+        kept = [latest_per_slot[slot] for slot in sorted(latest_per_slot)]
+        return {
+            "lats": [point[0] for point in kept],
+            "lngs": [point[1] for point in kept],
+            "ts": [point[2] for point in kept],
+            "count": len(kept),
+            "resolution": self.downsample_interval,
+        }
+
+    async def downsample(self) -> int:
+        """Thin raw buckets older than ``downsample_after``; returns the number rewritten"""
+        cutoff = datetime.now(timezone.utc) - self.downsample_after
+        cursor = self.collection.find({"bucket_start": {"$lt": cutoff}, "resolution": RAW_RESOLUTION})
+
+        operations = []
+        rewritten = 0
+        async for bucket in cursor:
+            # Guard on count so fixes appended since the read are not lost
+            operations.append(UpdateOne(
+                {"_id": bucket["_id"], "count": bucket["count"]},
+                {"$set": self._thin(bucket)},
+            ))
+            rewritten += 1
+            if len(operations) >= 500:
+                await self.collection.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        return rewritten
+
+
+async def run_downsampler(store, interval_seconds: float = 3600) -> None:
+    """Periodically downsample any store exposing ``downsample()``"""
+    while True:
+        try:
+            rewritten = await store.downsample()
+            if rewritten:
+                logger.info("Downsampled %d location history buckets", rewritten)
+        except Exception:
+            logger.exception("Location history downsampling failed")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,384 @@
+import bisect
+import copy
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from geo_distance import haversine_matrix, within_radius, zones_to_arrays
+from location_history import RAW_RESOLUTION, FixPosition, LocationSample, bucket_fixes, bucket_start
+from storage import AlertPosition, BoundingBox, DuplicateEmailError, Repository
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _project(document: dict, fields: Optional[Sequence[str]]) -> dict:
+    """Deep copy of the document, limited to ``fields`` when given"""
+    if fields:
+        document = {field: document[field] for field in fields if field in document}
+    return copy.deepcopy(document)
+
+
+def _alert_position(alert: dict) -> AlertPosition:
+    created_at = alert['created_at']
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return _as_utc(created_at), alert['id']
+
+
+class MemoryLocationHistory:
+    """In-memory counterpart of ``LocationHistoryStore`` using the same hourly buckets"""
+
+    def __init__(self, downsample_after: timedelta = timedelta(hours=24), downsample_interval: int = 60):
+        self.downsample_after = downsample_after
+        self.downsample_interval = downsample_interval
+        self._buckets: Dict[Tuple[str, datetime], dict] = {}
+
+    async def append(self, samples: Iterable[LocationSample]) -> None:
+        for sample in sorted(samples, key=lambda sample: _as_utc(sample.timestamp)):
+            start = bucket_start(sample.timestamp)
+            bucket = self._buckets.setdefault((sample.tourist_id, start), {
+                "tourist_id": sample.tourist_id, "bucket_start": start, "resolution": RAW_RESOLUTION,
+                "lats": [], "lngs": [], "ts": [], "count": 0,
+            })
+            bucket["lats"].append(sample.latitude)
+            bucket["lngs"].append(sample.longitude)
+            bucket["ts"].append(_as_utc(sample.timestamp).timestamp())
+            bucket["count"] += 1
+
+    def _points(self, buckets: Iterable[dict], start_ts: float, end_ts: float):
+        for bucket in buckets:
+            for lat, lng, ts in zip(bucket["lats"], bucket["lngs"], bucket["ts"]):
+                if start_ts <= ts < end_ts:
+                    yield ts, bucket["tourist_id"], lat, lng
+
+    async def trail(self, tourist_id: str, start: datetime, end: datetime) -> List[dict]:
+        start, end = _as_utc(start), _as_utc(end)
+        first = bucket_start(start)
+        buckets = [
+            bucket for (owner, bucket_time), bucket in self._buckets.items()
+            if owner == tourist_id and first <= bucket_time < end
+        ]
+        points = sorted(self._points(buckets, start.timestamp(), end.timestamp()))
+        return [
+            {"latitude": lat, "longitude": lng, "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat()}
+            for ts, _, lat, lng in points
+        ]
+
+    async def iter_fixes_since(self, since: datetime, batch_size: int = 500) -> AsyncIterator[LocationSample]:
+        since = _as_utc(since)
+        first = bucket_start(since)
+        keys = sorted((key for key in self._buckets if key[1] >= first), key=lambda key: (key[1], key[0]))
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                for sample in bucket_fixes(bucket, since.timestamp(), float("inf"), None):
+                    yield sample
+
+    async def iter_fixes(self, start: datetime, end: datetime, tourist_id: Optional[str] = None,
+                         after: Optional[FixPosition] = None, batch_size: int = 100) -> AsyncIterator[LocationSample]:
+        start, end = _as_utc(start), _as_utc(end)
+        first = bucket_start(start)
+        keys = sorted(
+            key for key in self._buckets
+            if first <= key[1] < end and (not tourist_id or key[0] == tourist_id)
+            and (after is None or key >= (after[0], bucket_start(datetime.fromtimestamp(after[1], timezone.utc))))
+        )
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                for sample in bucket_fixes(bucket, start.timestamp(), end.timestamp(), after):
+                    yield sample
+
+    async def downsample(self) -> int:
+        cutoff = datetime.now(timezone.utc) - self.downsample_after
+        rewritten = 0
+        for (_, bucket_time), bucket in self._buckets.items():
+            if bucket_time >= cutoff or bucket["resolution"] != RAW_RESOLUTION:
+                continue
+            latest_per_slot: Dict[int, Tuple[float, float, float]] = {}
+            for lat, lng, ts in zip(bucket["lats"], bucket["lngs"], bucket["ts"]):
+                slot = int(ts // self.downsample_interval)
+                if slot not in latest_per_slot or ts > latest_per_slot[slot][2]:
+                    latest_per_slot[slot] = (lat, lng, ts)
+            kept = [latest_per_slot[slot] for slot in sorted(latest_per_slot)]
+            bucket.update({
+                "lats": [point[0] for point in kept],
+                "lngs": [point[1] for point in kept],
+                "ts": [point[2] for point in kept],
+                "count": len(kept),
+                "resolution": self.downsample_interval,
+            })
+            rewritten += 1
+        return rewritten
+
+
+class MemoryRepository(Repository):
+    """Repository kept entirely in process memory, for the demo server, tests and benchmarks.
+
+    Hash indexes on email and user_id keep user and profile lookups O(1). Alerts
+    are indexed by (created_at, id) in sorted lists, one overall and one per
+    status, so a page of alerts is a bisect plus a walk over at most the rows it
+    has to filter rather than a sort of every stored alert.
+    """
+
+    def __init__(self, history_downsample_after: timedelta = timedelta(hours=24),
+                 history_downsample_interval: int = 60):
+        self._users: Dict[str, dict] = {}
+        self._user_ids_by_email: Dict[str, str] = {}
+        self._profiles_by_user_id: Dict[str, dict] = {}
+        self._alerts: Dict[str, dict] = {}
+        self._alert_positions: List[AlertPosition] = []
+        self._alert_positions_by_status: Dict[str, List[AlertPosition]] = {}
+        self._zones: Dict[str, dict] = {}
+        self.location_history = MemoryLocationHistory(history_downsample_after, history_downsample_interval)
+
+    # Users
+    async def get_user_by_id(self, user_id: str) -> Optional[dict]:
+        user = self._users.get(user_id)
+        return copy.deepcopy(user) if user else None
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        user_id = self._user_ids_by_email.get(email)
+        return await self.get_user_by_id(user_id) if user_id else None
+
+    async def insert_user(self, user: dict) -> None:
+        if user['email'] in self._user_ids_by_email:
+            raise DuplicateEmailError(user['email'])
+        self._users[user['id']] = copy.deepcopy(user)
+        self._user_ids_by_email[user['email']] = user['id']
+
+    async def update_user(self, user_id: str, changes: dict) -> bool:
+        user = self._users.get(user_id)
+        if user is None:
+            return False
+        if 'email' in changes and changes['email'] != user['email']:
+            if changes['email'] in self._user_ids_by_email:
+                raise DuplicateEmailError(changes['email'])
+            del self._user_ids_by_email[user['email']]
+            self._user_ids_by_email[changes['email']] = user_id
+        user.update(copy.deepcopy(changes))
+        return True
+
+    # Tourist profiles
+    async def insert_profile(self, profile: dict) -> None:
+        self._profiles_by_user_id[profile['user_id']] = copy.deepcopy(profile)
+
+    async def get_profile(self, user_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        profile = self._profiles_by_user_id.get(user_id)
+        return _project(profile, fields) if profile else None
+
+    async def all_profiles(self) -> List[dict]:
+        return copy.deepcopy(list(self._profiles_by_user_id.values()))
+
+    async def set_current_locations(self, locations: Dict[str, dict]) -> None:
+        for user_id, location in locations.items():
+            profile = self._profiles_by_user_id.get(user_id)
+            if profile is not None:
+                profile['current_location'] = copy.deepcopy(location)
+
+    async def set_safety_scores(self, scores: Dict[str, int]) -> None:
+        for user_id, score in scores.items():
+            profile = self._profiles_by_user_id.get(user_id)
+            if profile is not None:
+                profile['safety_score'] = score
+
+    async def tourists_near(self, latitude: float, longitude: float, radius: float, limit: int,
+                            fields: Optional[Sequence[str]] = None) -> List[dict]:
+        located = [
+            profile for profile in self._profiles_by_user_id.values()
+            if profile.get('current_location')
+        ]
+        if not located:
+            return []
+        distances = haversine_matrix(
+            [profile['current_location']['latitude'] for profile in located],
+            [profile['current_location']['longitude'] for profile in located],
+            [latitude], [longitude],
+        )[:, 0]
+        # Nearest first, matching $nearSphere
+        nearest = sorted((distance, i) for i, distance in enumerate(distances) if distance <= radius)[:limit]
+        return [_project(located[i], fields) for _, i in nearest]
+
+    def _map_points_in_box(self, box: BoundingBox):
+        south, west, north, east = box
+        for profile in self._profiles_by_user_id.values():
+            location = profile.get('current_location')
+            if location and south <= location['latitude'] <= north and west <= location['longitude'] <= east:
+                yield {
+                    'user_id': profile['user_id'],
+                    'digital_id': profile.get('digital_id'),
+                    'safety_score': profile.get('safety_score'),
+                    'latitude': location['latitude'],
+                    'longitude': location['longitude'],
+                    'timestamp': location.get('timestamp'),
+                }
+
+    async def tourists_in_box(self, box: BoundingBox, limit: int) -> List[dict]:
+        points = []
+        for point in self._map_points_in_box(box):
+            if len(points) == limit:
+                break
+            points.append(point)
+        return points
+
+    async def cluster_tourists_in_box(self, box: BoundingBox, cell_lat: float, cell_lng: float) -> List[dict]:
+        south, west = box[0], box[1]
+        cells: Dict[Tuple[int, int], List[dict]] = {}
+        for point in self._map_points_in_box(box):
+            cell = (int((point['latitude'] - south) // cell_lat), int((point['longitude'] - west) // cell_lng))
+            cells.setdefault(cell, []).append(point)
+        clusters = []
+        for points in cells.values():
+            cluster = {
+                'count': len(points),
+                'latitude': sum(point['latitude'] for point in points) / len(points),
+                'longitude': sum(point['longitude'] for point in points) / len(points),
+                'min_safety_score': min((point['safety_score'] for point in points if point['safety_score'] is not None),
+                                        default=None),
+            }
+            if len(points) == 1:
+                cluster['tourist'] = points[0]
+            clusters.append(cluster)
+        return clusters
+
+    # Alerts
+    def _index_alert(self, alert: dict) -> None:
+        position = _alert_position(alert)
+        bisect.insort(self._alert_positions, position)
+        bisect.insort(self._alert_positions_by_status.setdefault(alert['status'], []), position)
+
+    def _unindex_alert(self, alert: dict) -> None:
+        position = _alert_position(alert)
+        for positions in (self._alert_positions, self._alert_positions_by_status.get(alert['status'], [])):
+            i = bisect.bisect_left(positions, position)
+            if i < len(positions) and positions[i] == position:
+                del positions[i]
+
+    async def insert_alerts(self, alerts: List[dict]) -> None:
+        for alert in alerts:
+            existing = self._alerts.get(alert['id'])
+            if existing is not None:
+                self._unindex_alert(existing)
+            self._alerts[alert['id']] = copy.deepcopy(alert)
+            self._index_alert(alert)
+
+    async def get_alert(self, alert_id: str) -> Optional[dict]:
+        alert = self._alerts.get(alert_id)
+        return copy.deepcopy(alert) if alert else None
+
+    async def active_alerts(self) -> List[dict]:
+        return [
+            copy.deepcopy(self._alerts[alert_id])
+            for _, alert_id in reversed(self._alert_positions_by_status.get("active", []))
+        ]
+
+    async def find_alerts(
+        self,
+        limit: int,
+        status: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        tourist_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[AlertPosition] = None,
+        after: Optional[AlertPosition] = None,
+        fields: Optional[Sequence[str]] = None,
+        oldest_first: bool = False,
+    ) -> List[dict]:
+        positions = self._alert_positions_by_status.get(status, []) if status else self._alert_positions
+
+        # Narrow to the slice of the ordering allowed by the time range and keyset cursors;
+        # "" sorts before every id, so (t, "") marks the first position at time t
+        lo, hi = 0, len(positions)
+        if start:
+            lo = max(lo, bisect.bisect_left(positions, (_as_utc(start), "")))
+        if after:
+            lo = max(lo, bisect.bisect_right(positions, (_as_utc(after[0]), after[1])))
+        if end:
+            hi = min(hi, bisect.bisect_left(positions, (_as_utc(end), "")))
+        if before:
+            hi = min(hi, bisect.bisect_left(positions, (_as_utc(before[0]), before[1])))
+
+        matches = []
+        for i in (range(lo, hi) if oldest_first else range(hi - 1, lo - 1, -1)):
+            alert = self._alerts[positions[i][1]]
+            if alert_type and alert['alert_type'] != alert_type:
+                continue
+            if tourist_id and alert['tourist_id'] != tourist_id:
+                continue
+            matches.append(_project(alert, fields))
+            if len(matches) >= limit:
+                break
+        return matches
+
+    async def iter_alerts(
+        self,
+        status: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        tourist_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[AlertPosition] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[dict]:
+        position = (_as_utc(after[0]), after[1]) if after else None
+        if start and (position is None or position < (_as_utc(start), "")):
+            # Just before the first position at ``start``
+            position = (_as_utc(start), "")
+            inclusive = True
+        else:
+            inclusive = False
+        end = _as_utc(end) if end else None
+
+        while True:
+            # Re-bisect for every batch since the index may change while the consumer awaits
+            positions = self._alert_positions_by_status.get(status, []) if status else self._alert_positions
+            if position is None:
+                i = 0
+            elif inclusive:
+                i = bisect.bisect_left(positions, position)
+            else:
+                i = bisect.bisect_right(positions, position)
+            batch = positions[i:i + batch_size]
+            if not batch:
+                return
+            for position in batch:
+                if end and position[0] >= end:
+                    return
+                alert = self._alerts.get(position[1])
+                if alert is None:
+                    continue
+                if alert_type and alert['alert_type'] != alert_type:
+                    continue
+                if tourist_id and alert['tourist_id'] != tourist_id:
+                    continue
+                yield copy.deepcopy(alert)
+            inclusive = False
+
+    async def resolve_alert(self, alert_id: str, authority_id: str, resolved_at: datetime) -> bool:
+        alert = self._alerts.get(alert_id)
+        if alert is None or alert.get('status') == "resolved":
+            return False
+        self._unindex_alert(alert)
+        alert.update({"status": "resolved", "resolved_at": resolved_at, "authority_id": authority_id})
+        self._index_alert(alert)
+        return True
+
+    # High-risk zones
+    async def list_zones(self, limit: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> List[dict]:
+        return [_project(zone, fields) for zone in list(self._zones.values())[:limit]]
+
+    async def insert_zone(self, zone: dict) -> None:
+        self._zones[zone['id']] = copy.deepcopy(zone)
+
+    async def replace_zones(self, zones: Iterable[dict]) -> None:
+        self._zones = {zone['id']: copy.deepcopy(zone) for zone in zones}
+
+    async def zones_containing(self, latitude: float, longitude: float, max_radius: float,
+                               fields: Optional[Sequence[str]] = None) -> List[dict]:
+        zones = list(self._zones.values())
+        if not zones:
+            return []
+        mask = within_radius([latitude], [longitude], *zones_to_arrays(zones))[0]
+        return [_project(zone, fields) for zone, inside in zip(zones, mask) if inside]
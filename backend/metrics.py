@@ -0,0 +1,306 @@
+import bisect
+import contextvars
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# Seconds; Prometheus' default latency buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Mongo time spent by the request being handled, so it can be split out from handler CPU time
+_request_db_seconds: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "request_db_seconds", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: Tuple[str, ...], value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last slot is +Inf), sum, count
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, labels: Tuple[str, ...] = ()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(labels, time.perf_counter() - start)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        # Re-registering the same metric returns the existing one, e.g. when Starlette rebuilds its middleware
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, in-flight requests and Mongo time per request.
+
+    Routes are labelled by their path template (``/api/authority/alerts/{alert_id}/resolve``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry, routes: Iterable, slow_request_seconds: float = 1.0):
+        self.app = app
+        self.routes = routes
+        self.slow_request_seconds = slow_request_seconds
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+        )
+        self.db_time = registry.histogram(
+            "http_request_db_seconds", "Time each HTTP request spent waiting on MongoDB", ("method", "route")
+        )
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "HTTP requests currently being handled", ("method", "route")
+        )
+
+    def _route_template(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], self._route_template(scope))
+        status = ["500"]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        db_seconds = [0.0]
+        token = _request_db_seconds.set(db_seconds)
+        self.in_flight.inc(labels)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight.dec(labels)
+            _request_db_seconds.reset(token)
+            self.latency.observe(labels + (status[0],), elapsed)
+            self.db_time.observe(labels, db_seconds[0])
+            if elapsed >= self.slow_request_seconds:
+                logger.warning("Slow request %s %s: %.1f ms total, %.1f ms in MongoDB, status %s",
+                               labels[0], labels[1], elapsed * 1000, db_seconds[0] * 1000, status[0])
+
+
+class MongoTimer:
+    """Times awaited Motor calls per collection and operation"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.duration = registry.histogram(
+            "mongo_operation_duration_seconds", "MongoDB call latency by collection and operation",
+            ("collection", "operation")
+        )
+
+    async def time(self, collection: str, operation: str, awaitable):
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            elapsed = time.perf_counter() - start
+            self.duration.observe((collection, operation), elapsed)
+            request_db_seconds = _request_db_seconds.get()
+            if request_db_seconds is not None:
+                request_db_seconds[0] += elapsed
+
+
+class InstrumentedCursor:
+    """Motor cursor proxy; fetches are attributed to the operation that created the cursor"""
+
+    def __init__(self, cursor, collection: str, operation: str, timer: MongoTimer):
+        self._cursor = cursor
+        self._collection = collection
+        self._operation = operation
+        self._timer = timer
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            # sort/limit/skip return the cursor itself; keep the chain wrapped
+            if result is self._cursor:
+                return self
+            if inspect.isawaitable(result):
+                return self._timer.time(self._collection, self._operation, result)
+            return result
+        return call
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._timer.time(self._collection, self._operation, self._cursor.__anext__())
+
+
+class InstrumentedCollection:
+    """Motor collection proxy timing every awaited operation"""
+
+    CURSOR_METHODS = frozenset({"find", "aggregate", "list_indexes"})
+
+    def __init__(self, collection, timer: MongoTimer):
+        self._collection = collection
+        self._timer = timer
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        collection_name = self._collection.name
+        if name in self.CURSOR_METHODS:
+            return lambda *args, **kwargs: InstrumentedCursor(
+                attribute(*args, **kwargs), collection_name, name, self._timer
+            )
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            if inspect.isawaitable(result):
+                return self._timer.time(collection_name, name, result)
+            return result
+        return call
+
+
+class InstrumentedDatabase:
+    """Motor database proxy handing out instrumented collections"""
+
+    def __init__(self, database, timer: MongoTimer):
+        self._database = database
+        self._timer = timer
+        self._collections: Dict[str, InstrumentedCollection] = {}
+
+    def __getitem__(self, name: str) -> InstrumentedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = InstrumentedCollection(self._database[name], self._timer)
+        return collection
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
@@ -0,0 +1,300 @@
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import db_setup
+from db_setup import geojson_box, geojson_point
+from location_history import LocationHistoryStore
+from metrics import InstrumentedDatabase, MetricsRegistry, MongoTimer
+from storage import AlertPosition, BoundingBox, DuplicateEmailError, Repository
+
+NO_ID = {"_id": 0}
+
+
+def _projection(fields: Optional[Sequence[str]]) -> dict:
+    if not fields:
+        return NO_ID
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+# Flat map point projected from a tourist profile
+MAP_POINT_PROJECTION = {
+    "_id": 0,
+    "user_id": 1,
+    "digital_id": 1,
+    "safety_score": 1,
+    "latitude": "$current_location.latitude",
+    "longitude": "$current_location.longitude",
+    "timestamp": "$current_location.timestamp",
+}
+
+
+def _box_query(box: BoundingBox) -> dict:
+    south, west, north, east = box
+    if east - west >= 180:
+        # A GeoJSON polygon this wide would be read as its smaller complement; filter on the plain fields instead
+        return {
+            "current_location.point": {"$exists": True},
+            "current_location.latitude": {"$gte": south, "$lte": north},
+            "current_location.longitude": {"$gte": west, "$lte": east},
+        }
+    return {"current_location.point": {"$geoWithin": {"$geometry": geojson_box(south, west, north, east)}}}
+
+
+def _alert_query(
+    status: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    tourist_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    before: Optional[AlertPosition] = None,
+    after: Optional[AlertPosition] = None,
+) -> dict:
+    query = {}
+    if status:
+        query["status"] = status
+    if alert_type:
+        query["alert_type"] = alert_type
+    if tourist_id:
+        query["tourist_id"] = tourist_id
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+
+    # Keyset pagination on (created_at, id)
+    keyset = []
+    if before:
+        created_at, alert_id = before
+        keyset.append({"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": alert_id}}
+        ]})
+    if after:
+        created_at, alert_id = after
+        keyset.append({"$or": [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "id": {"$gt": alert_id}}
+        ]})
+    if keyset:
+        query = {"$and": [query, *keyset]} if query else {"$and": keyset}
+    return query
+
+
+class MongoRepository(Repository):
+    """Repository backed by MongoDB through Motor"""
+
+    def __init__(self, mongo_url: str, db_name: str,
+                 history_downsample_after: timedelta = timedelta(hours=24),
+                 history_downsample_interval: int = 60):
+        self.client = AsyncIOMotorClient(mongo_url)
+        self.db = self.client[db_name]
+        self.location_history = LocationHistoryStore(
+            self.db.location_history,
+            downsample_after=history_downsample_after,
+            downsample_interval=history_downsample_interval,
+        )
+
+    def instrument(self, registry: MetricsRegistry) -> None:
+        self.db = InstrumentedDatabase(self.db, MongoTimer(registry))
+        self.location_history.collection = self.db.location_history
+
+    async def prepare(self, verify_query_plans: bool = False) -> None:
+        await db_setup.ensure_indexes(self.db)
+        await db_setup.migrate_geojson(self.db)
+        await db_setup.migrate_resolved_at(self.db)
+        # Diagnostic mode: refuse to start if any hot query would scan a whole collection
+        if verify_query_plans:
+            await db_setup.verify_query_plans(self.db)
+
+    async def close(self) -> None:
+        self.client.close()
+
+    # Users
+    async def get_user_by_id(self, user_id: str) -> Optional[dict]:
+        return await self.db.users.find_one({"id": user_id}, NO_ID)
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        return await self.db.users.find_one({"email": email}, NO_ID)
+
+    async def insert_user(self, user: dict) -> None:
+        try:
+            await self.db.users.insert_one(dict(user))
+        except DuplicateKeyError:
+            raise DuplicateEmailError(user['email'])
+
+    async def update_user(self, user_id: str, changes: dict) -> bool:
+        result = await self.db.users.update_one({"id": user_id}, {"$set": changes})
+        return result.matched_count > 0
+
+    # Tourist profiles
+    async def insert_profile(self, profile: dict) -> None:
+        await self.db.tourist_profiles.insert_one(dict(profile))
+
+    async def get_profile(self, user_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        return await self.db.tourist_profiles.find_one({"user_id": user_id}, _projection(fields))
+
+    async def all_profiles(self) -> List[dict]:
+        return await self.db.tourist_profiles.find({}, NO_ID).to_list(None)
+
+    async def set_current_locations(self, locations: Dict[str, dict]) -> None:
+        if not locations:
+            return
+        await self.db.tourist_profiles.bulk_write([
+            UpdateOne({"user_id": user_id}, {"$set": {"current_location": location}})
+            for user_id, location in locations.items()
+        ], ordered=False)
+
+    async def set_safety_scores(self, scores: Dict[str, int]) -> None:
+        if not scores:
+            return
+        await self.db.tourist_profiles.bulk_write([
+            UpdateOne({"user_id": user_id}, {"$set": {"safety_score": score}})
+            for user_id, score in scores.items()
+        ], ordered=False)
+
+    async def tourists_near(self, latitude: float, longitude: float, radius: float, limit: int,
+                            fields: Optional[Sequence[str]] = None) -> List[dict]:
+        cursor = self.db.tourist_profiles.find(
+            {"current_location.point": {"$nearSphere": {
+                "$geometry": geojson_point(latitude, longitude),
+                "$maxDistance": radius
+            }}},
+            _projection(fields)
+        ).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def tourists_in_box(self, box: BoundingBox, limit: int) -> List[dict]:
+        cursor = self.db.tourist_profiles.aggregate([
+            {"$match": _box_query(box)},
+            {"$limit": limit},
+            {"$project": MAP_POINT_PROJECTION},
+        ])
+        return await cursor.to_list(limit)
+
+    async def cluster_tourists_in_box(self, box: BoundingBox, cell_lat: float, cell_lng: float) -> List[dict]:
+        south, west = box[0], box[1]
+        cursor = self.db.tourist_profiles.aggregate([
+            {"$match": _box_query(box)},
+            {"$project": MAP_POINT_PROJECTION},
+            {"$group": {
+                "_id": {
+                    "row": {"$floor": {"$divide": [{"$subtract": ["$latitude", south]}, cell_lat]}},
+                    "col": {"$floor": {"$divide": [{"$subtract": ["$longitude", west]}, cell_lng]}},
+                },
+                "count": {"$sum": 1},
+                "latitude": {"$avg": "$latitude"},
+                "longitude": {"$avg": "$longitude"},
+                "min_safety_score": {"$min": "$safety_score"},
+                "tourist": {"$first": "$$ROOT"},
+            }},
+            {"$project": {"_id": 0}},
+        ])
+        clusters = await cursor.to_list(None)
+        for cluster in clusters:
+            if cluster['count'] > 1:
+                del cluster['tourist']
+        return clusters
+
+    # Alerts
+    async def insert_alerts(self, alerts: List[dict]) -> None:
+        if not alerts:
+            return
+        try:
+            # Copies, so Motor's generated _id never leaks back into the caller's dicts
+            await self.db.alerts.insert_many([dict(alert) for alert in alerts], ordered=False)
+        except BulkWriteError as exc:
+            # Alerts already stored by an earlier, partially failed attempt are fine to skip
+            details = exc.details
+            if details.get('writeConcernErrors') or any(error.get('code') != 11000 for error in details.get('writeErrors', [])):
+                raise
+
+    async def get_alert(self, alert_id: str) -> Optional[dict]:
+        return await self.db.alerts.find_one({"id": alert_id}, NO_ID)
+
+    async def active_alerts(self) -> List[dict]:
+        return await self.db.alerts.find({"status": "active"}, NO_ID).to_list(None)
+
+    async def find_alerts(
+        self,
+        limit: int,
+        status: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        tourist_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[AlertPosition] = None,
+        after: Optional[AlertPosition] = None,
+        fields: Optional[Sequence[str]] = None,
+        oldest_first: bool = False,
+    ) -> List[dict]:
+        query = _alert_query(status, alert_type, tourist_id, start, end, before, after)
+        direction = 1 if oldest_first else -1
+        cursor = self.db.alerts.find(query, _projection(fields)).sort(
+            [("created_at", direction), ("id", direction)]
+        ).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def iter_alerts(
+        self,
+        status: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        tourist_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[AlertPosition] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[dict]:
+        query = _alert_query(status, alert_type, tourist_id, start, end, after=after)
+        # Walks the same (created_at, id) indexes as find_alerts, in the other direction
+        cursor = self.db.alerts.find(query, NO_ID).sort([("created_at", 1), ("id", 1)]).batch_size(batch_size)
+        try:
+            async for alert in cursor:
+                yield alert
+        finally:
+            await cursor.close()
+
+    async def resolve_alert(self, alert_id: str, authority_id: str, resolved_at: datetime) -> bool:
+        # Conditional so a repeated resolve changes nothing and reports False
+        result = await self.db.alerts.update_one(
+            {"id": alert_id, "status": {"$ne": "resolved"}},
+            {"$set": {
+                "status": "resolved",
+                "resolved_at": resolved_at,
+                "authority_id": authority_id
+            }}
+        )
+        return result.modified_count > 0
+
+    # High-risk zones
+    async def list_zones(self, limit: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> List[dict]:
+        return await self.db.high_risk_zones.find({}, _projection(fields)).to_list(limit)
+
+    async def insert_zone(self, zone: dict) -> None:
+        await self.db.high_risk_zones.insert_one(dict(zone))
+
+    async def replace_zones(self, zones: Iterable[dict]) -> None:
+        await self.db.high_risk_zones.delete_many({})
+        zones = [dict(zone) for zone in zones]
+        if zones:
+            await self.db.high_risk_zones.insert_many(zones)
+
+    async def zones_containing(self, latitude: float, longitude: float, max_radius: float,
+                               fields: Optional[Sequence[str]] = None) -> List[dict]:
+        # $geoNear narrows to zones whose centre is within the largest radius, then each zone's own radius applies
+        pipeline = [
+            {"$geoNear": {
+                "near": geojson_point(latitude, longitude),
+                "key": "center",
+                "distanceField": "distance",
+                "maxDistance": max_radius,
+                "spherical": True
+            }},
+            {"$match": {"$expr": {"$lte": ["$distance", "$radius"]}}},
+            {"$project": _projection(fields) if fields else {"_id": 0, "distance": 0}}
+        ]
+        return await self.db.high_risk_zones.aggregate(pipeline).to_list(None)
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import bcrypt
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when too many password operations are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism here.
+    Requests beyond ``max_pending`` queued or running operations are rejected
+    immediately instead of piling up behind a slow pool.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64, rounds: int = 12):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_seconds = 0.0
+        self.hash_seconds = 0.0
+
+    def hash_sync(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    def verify_sync(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolSaturated(f"{self._pending} password operations already pending")
+
+        submitted_at = time.perf_counter()
+        timings = {}
+
+        def timed():
+            started_at = time.perf_counter()
+            timings['wait'] = started_at - submitted_at
+            try:
+                return func(*args)
+            finally:
+                timings['work'] = time.perf_counter() - started_at
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+            self.queue_wait_seconds += timings.get('wait', 0.0)
+            self.hash_seconds += timings.get('work', 0.0)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.verify_sync, password, hashed_password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "rounds": self.rounds,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_seconds_total": self.queue_wait_seconds,
+            "hash_seconds_total": self.hash_seconds,
+            "avg_queue_wait_seconds": self.queue_wait_seconds / self.completed if self.completed else 0.0,
+            "avg_hash_seconds": self.hash_seconds / self.completed if self.completed else 0.0,
+        }
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from geo_index import ZoneIndex
+
+logger = logging.getLogger(__name__)
+
+# How much each zone risk level and alert type counts against a tourist
+RISK_WEIGHTS = {"low": 0.25, "medium": 0.5, "high": 0.75, "critical": 1.0}
+ALERT_WEIGHTS = {"panic": 2.0, "anomaly": 1.0, "missing": 1.0, "geo_fence": 0.5}
+
+# Maximum points each factor can take off a perfect 100
+PRESENCE_PENALTY = 20.0
+EXPOSURE_PENALTY = 25.0
+ALERT_PENALTY = 30.0
+NIGHT_PENALTY = 10.0
+STALE_PENALTY = 15.0
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value).timestamp()
+    return time.time()
+
+
+def zone_weight(zones: Sequence[dict]) -> float:
+    return max((RISK_WEIGHTS.get(zone.get('risk_level'), 0.5) for zone in zones), default=0.0)
+
+
+class SafetyScorer:
+    """Per-tourist safety score from zone exposure, recent alerts, time of day and fix freshness.
+
+    Pings and alerts only update compact per-tourist arrays and mark the tourist
+    dirty; ``run`` rescores the dirty set every ``debounce_seconds`` in one
+    vectorized pass, so a tourist pinging every second is still scored once per
+    interval. Everyone is rescored every ``refresh_seconds`` (freshness and decay
+    move without pings) and after ``zones_changed``. Only scores that actually
+    changed are handed to ``apply``.
+    """
+
+    def __init__(self, zone_index: ZoneIndex, apply: Callable[[Dict[str, int]], Awaitable[None]],
+                 debounce_seconds: float = 30.0, refresh_seconds: float = 300.0,
+                 exposure_half_life: float = 7200.0, exposure_scale: float = 1800.0, exposure_gap: float = 900.0,
+                 alert_half_life: float = 21600.0, fresh_seconds: float = 300.0, stale_seconds: float = 7200.0,
+                 timezone_name: str = "Asia/Kolkata", night_start: int = 22, night_end: int = 5,
+                 initial_capacity: int = 1024):
+        self.zone_index = zone_index
+        self.apply = apply
+        self.debounce_seconds = debounce_seconds
+        self.refresh_seconds = refresh_seconds
+        self.exposure_half_life = exposure_half_life
+        self.exposure_scale = exposure_scale
+        # Silences longer than this are not counted as time spent in a zone
+        self.exposure_gap = exposure_gap
+        self.alert_half_life = alert_half_life
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.timezone = ZoneInfo(timezone_name)
+        self.night_start = night_start
+        self.night_end = night_end
+        self._slots: Dict[str, int] = {}
+        self._tourist_ids: List[str] = []
+        self._dirty = set()
+        self._zones_changed = False
+        self._allocate(initial_capacity)
+        self.rescored = 0
+        self.applied = 0
+
+    def _allocate(self, capacity: int) -> None:
+        previous = getattr(self, "_arrays", None)
+        self._lat = np.zeros(capacity, dtype=np.float64)
+        self._lng = np.zeros(capacity, dtype=np.float64)
+        # Epoch seconds of the newest fix, NaN until the tourist has one
+        self._last_fix = np.full(capacity, np.nan, dtype=np.float64)
+        self._zone_weight = np.zeros(capacity, dtype=np.float64)
+        # Risk-weighted seconds in zones, decayed to _last_fix
+        self._exposure = np.zeros(capacity, dtype=np.float64)
+        # Weighted alert count, decayed to _last_alert
+        self._alert_load = np.zeros(capacity, dtype=np.float64)
+        self._last_alert = np.zeros(capacity, dtype=np.float64)
+        # Last score handed to apply, -1 if none yet
+        self._score = np.full(capacity, -1, dtype=np.int16)
+        self._arrays = (self._lat, self._lng, self._last_fix, self._zone_weight,
+                        self._exposure, self._alert_load, self._last_alert, self._score)
+        if previous is not None:
+            for old_array, new_array in zip(previous, self._arrays):
+                new_array[:len(old_array)] = old_array
+
+    def _slot(self, tourist_id: str) -> int:
+        slot = self._slots.get(tourist_id)
+        if slot is None:
+            if len(self._tourist_ids) == len(self._score):
+                self._allocate(len(self._score) * 2)
+            slot = self._slots[tourist_id] = len(self._tourist_ids)
+            self._tourist_ids.append(tourist_id)
+        return slot
+
+    def __len__(self) -> int:
+        return len(self._tourist_ids)
+
+    def score(self, tourist_id: str) -> Optional[int]:
+        slot = self._slots.get(tourist_id)
+        if slot is None or self._score[slot] < 0:
+            return None
+        return int(self._score[slot])
+
+    def observe_many(self, tourist_ids: Sequence[str], lats: Sequence[float], lngs: Sequence[float],
+                     timestamps: Sequence[datetime]) -> None:
+        """Fold a batch of fixes, in timestamp order, into zone exposure"""
+        weights = [zone_weight(zones) for zones in self.zone_index.zones_containing_many(lats, lngs)]
+        for tourist_id, lat, lng, timestamp, weight in zip(tourist_ids, lats, lngs, timestamps, weights):
+            slot = self._slot(tourist_id)
+            ts = _timestamp(timestamp)
+            last_fix = self._last_fix[slot]
+            if not math.isnan(last_fix):
+                elapsed = ts - last_fix
+                if elapsed < 0:
+                    # A late fix from a client's offline buffer must not rewind exposure
+                    continue
+                # The zone at the previous fix is where the tourist spent the time in between
+                self._exposure[slot] = (self._exposure[slot] * 2 ** (-elapsed / self.exposure_half_life)
+                                        + self._zone_weight[slot] * min(elapsed, self.exposure_gap))
+            self._last_fix[slot] = ts
+            self._lat[slot] = lat
+            self._lng[slot] = lng
+            self._zone_weight[slot] = weight
+            self._dirty.add(slot)
+
+    def record_alerts(self, alerts: Sequence[dict]) -> None:
+        for alert in alerts:
+            slot = self._slot(alert['tourist_id'])
+            ts = _timestamp(alert.get('created_at'))
+            elapsed = max(ts - self._last_alert[slot], 0.0)
+            self._alert_load[slot] = (self._alert_load[slot] * 2 ** (-elapsed / self.alert_half_life)
+                                      + ALERT_WEIGHTS.get(alert.get('alert_type'), 0.5))
+            self._last_alert[slot] = max(self._last_alert[slot], ts)
+            self._dirty.add(slot)
+
+    def zones_changed(self) -> None:
+        """Recompute everyone's zone weight and score on the next run tick"""
+        self._zones_changed = True
+
+    def _is_night(self, now: float) -> bool:
+        hour = datetime.fromtimestamp(now, tz=self.timezone).hour
+        if self.night_start > self.night_end:
+            return hour >= self.night_start or hour < self.night_end
+        return self.night_start <= hour < self.night_end
+
+    def compute(self, rows: np.ndarray, now: float) -> np.ndarray:
+        """Scores for the given slots at ``now``, as integers in 0-100"""
+        weight = self._zone_weight[rows]
+        since_fix = now - self._last_fix[rows]
+        located = ~np.isnan(since_fix)
+        since_fix = np.where(located, np.maximum(since_fix, 0.0), 0.0)
+
+        # Exposure keeps accruing at the current zone's weight until the next fix
+        exposure = (self._exposure[rows] * np.exp2(-since_fix / self.exposure_half_life)
+                    + weight * np.minimum(since_fix, self.exposure_gap))
+        alert_load = self._alert_load[rows] * np.exp2(
+            -np.maximum(now - self._last_alert[rows], 0.0) / self.alert_half_life
+        )
+        staleness = np.clip((since_fix - self.fresh_seconds) / (self.stale_seconds - self.fresh_seconds), 0.0, 1.0)
+
+        penalty = (PRESENCE_PENALTY * weight
+                   + EXPOSURE_PENALTY * (1.0 - np.exp(-exposure / self.exposure_scale))
+                   + ALERT_PENALTY * (1.0 - np.exp(-alert_load))
+                   + STALE_PENALTY * np.where(located, staleness, 0.0))
+        if self._is_night(now):
+            penalty += NIGHT_PENALTY * (0.5 + 0.5 * weight)
+        return np.clip(np.rint(100.0 - penalty), 0, 100).astype(np.int16)
+
+    async def _rescore(self, rows: np.ndarray) -> int:
+        if not len(rows):
+            return 0
+        scores = self.compute(rows, time.time())
+        changed = scores != self._score[rows]
+        rows, scores = rows[changed], scores[changed]
+        self.rescored += len(changed)
+        if len(rows):
+            await self.apply({self._tourist_ids[row]: int(score) for row, score in zip(rows.tolist(), scores.tolist())})
+            self._score[rows] = scores
+            self.applied += len(rows)
+        return len(rows)
+
+    async def rescore_dirty(self) -> int:
+        dirty, self._dirty = self._dirty, set()
+        try:
+            return await self._rescore(np.fromiter(dirty, dtype=np.int64, count=len(dirty)))
+        except Exception:
+            self._dirty |= dirty
+            raise
+
+    async def rescore_all(self) -> int:
+        """Vectorized rescore of every tracked tourist, re-reading zones first if they changed"""
+        count = len(self._tourist_ids)
+        if self._zones_changed:
+            self._zones_changed = False
+            located = np.flatnonzero(~np.isnan(self._last_fix[:count]))
+            containing = self.zone_index.zones_containing_many(self._lat[located].tolist(), self._lng[located].tolist())
+            self._zone_weight[located] = [zone_weight(zones) for zones in containing]
+        self._dirty.clear()
+        return await self._rescore(np.arange(count))
+
+    async def run(self) -> None:
+        last_full = time.monotonic()
+        while True:
+            await asyncio.sleep(self.debounce_seconds)
+            try:
+                if self._zones_changed or time.monotonic() - last_full >= self.refresh_seconds:
+                    changed = await self.rescore_all()
+                    last_full = time.monotonic()
+                    logger.info("Rescored all %d tourists, %d safety scores changed", len(self), changed)
+                else:
+                    await self.rescore_dirty()
+            except Exception:
+                logger.exception("Safety score rescoring failed; will retry")
+
+    def stats(self) -> dict:
+        return {"tracked": len(self), "dirty": len(self._dirty), "rescored": self.rescored, "applied": self.applied}
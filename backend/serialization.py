@@ -0,0 +1,75 @@
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Type
+
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; stdlib json is used without it
+    orjson = None
+
+
+def isoformat(value: datetime) -> str:
+    """ISO 8601 as ``dumps`` writes it, UTC as ``Z``"""
+    text = value.isoformat()
+    return text[:-6] + "Z" if value.utcoffset() == timedelta(0) else text
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return isoformat(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """JSON-encode plain dicts/lists/datetimes; orjson when installed, stdlib json otherwise.
+
+    Datetimes come out as ISO 8601 with UTC written as ``Z``, the same as pydantic's JSON output.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class LeanJSONResponse(Response):
+    """JSON response for data that is already shaped for the client; no model validation or jsonable_encoder pass"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class TrustedRows:
+    """Response shaping for documents read back from our own storage.
+
+    Stored documents were validated by the model on the way in, so reads only
+    need the model's fields (``fields``, passed to the repository as a
+    projection) and its static defaults for documents written before a field
+    existed. This replaces ``[Model(**doc) for doc in docs]`` on hot read paths.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self._defaults: Dict[str, Any] = {
+            name: field.default
+            for name, field in model.model_fields.items()
+            if field.default is not PydanticUndefined and field.default_factory is None
+        }
+
+    def row(self, document: dict) -> dict:
+        if self._defaults.keys() <= document.keys():
+            return document
+        return {**self._defaults, **document}
+
+    def rows(self, documents: Iterable[dict]) -> List[dict]:
+        return [self.row(document) for document in documents]
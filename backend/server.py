@@ -1,27 +1,61 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import base64
+import csv
+import io
+import json
 import os
 import logging
+import math
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr, field_validator, model_validator
+from typing import Dict, List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import hashlib
-import bcrypt
 import random
+import time
+
+from alert_dispatch import AlertDispatcher
+from anomaly import MISSING, SPEED, STILLNESS, AnomalyDetector, run_missing_sweep
+from dashboard_view import DashboardSnapshot
+from db_setup import geojson_point
+from events import EventBus
+from geo_distance import haversine
+from geo_index import ZoneIndex
+from geofence import DWELL, ENTER, GeofenceTracker
+from heatmap import HeatmapTiles
+from location_buffer import LatestPositionBuffer
+from location_history import LocationSample, _as_utc, run_downsampler
+from metrics import CONTENT_TYPE, MetricsMiddleware, MetricsRegistry
+from password_pool import PasswordHasher, PasswordPoolSaturated
+from safety import SafetyScorer
+from serialization import LeanJSONResponse, TrustedRows, dumps, isoformat
+from storage import DuplicateEmailError, create_repository
+from user_cache import UserCache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Storage backend: MongoDB in production, the indexed in-memory store for the demo server and benchmarks
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo")
+repo = create_repository(
+    STORAGE_BACKEND,
+    history_downsample_after=timedelta(hours=int(os.environ.get("LOCATION_HISTORY_DOWNSAMPLE_AFTER_HOURS", "24"))),
+    history_downsample_interval=int(os.environ.get("LOCATION_HISTORY_DOWNSAMPLE_SECONDS", "60"))
+)
+
+# Request, storage and auth timings, served in Prometheus format on /metrics
+metrics = MetricsRegistry()
+repo.instrument(metrics)
+auth_seconds = metrics.histogram(
+    "auth_operation_duration_seconds", "Password hashing and JWT time by operation", ("operation",)
+)
 
 # Create the main app without a prefix
 app = FastAPI(title="SafeTrail API", description="Smart Tourist Safety & Incident Response Platform")
@@ -32,6 +66,67 @@ api_router = APIRouter(prefix="/api")
 # Security
 security = HTTPBearer()
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production")
+JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
+JWT_EXPIRE_HOURS = int(os.environ.get("JWT_EXPIRE_HOURS", "24"))
+
+# Spatial index over high-risk zones, loaded on startup and kept in sync by the zone write paths
+zone_index = ZoneIndex()
+
+# Per-tourist zone presence so geo-fence alerts fire on enter/exit/dwell transitions only
+geofence_tracker = GeofenceTracker(
+    zone_index,
+    exit_margin=float(os.environ.get("GEOFENCE_EXIT_MARGIN_METERS", "50")),
+    dwell_thresholds=[int(minutes) * 60 for minutes in os.environ.get("GEOFENCE_DWELL_MINUTES", "10,30").split(",")]
+)
+
+# Per-tourist movement state behind the "anomaly" and "missing" alerts
+anomaly_detector = AnomalyDetector(
+    zone_index,
+    missing_after=float(os.environ.get("ANOMALY_MISSING_MINUTES", "30")) * 60,
+    max_speed=float(os.environ.get("ANOMALY_MAX_SPEED_KMH", "250")) / 3.6,
+    still_radius=float(os.environ.get("ANOMALY_STILL_RADIUS_METERS", "50")),
+    still_after=float(os.environ.get("ANOMALY_STILL_MINUTES", "30")) * 60,
+    deviation_meters=float(os.environ.get("ANOMALY_ITINERARY_DEVIATION_METERS", "5000"))
+)
+
+# Live change feed for authority dashboards
+event_bus = EventBus()
+
+# Hourly-bucketed trail of every location fix
+location_history = repo.location_history
+background_tasks: List[asyncio.Task] = []
+
+# Coalesces current_location writes; flushed to Mongo in batches by a background task
+location_buffer = LatestPositionBuffer(
+    repo.set_current_locations,
+    flush_interval=float(os.environ.get("LOCATION_FLUSH_INTERVAL_SECONDS", "2")),
+    max_pending=int(os.environ.get("LOCATION_FLUSH_MAX_PENDING", "1000")),
+    max_attempts=int(os.environ.get("LOCATION_FLUSH_MAX_ATTEMPTS", "5"))
+)
+
+# Materialized authority dashboard, patched by every write path that affects it
+dashboard = DashboardSnapshot(serializer=dumps)
+
+# Tourist, alert and zone-risk density per map tile, patched by the same write paths as the dashboard
+heatmap = HeatmapTiles(
+    zone_index,
+    min_zoom=int(os.environ.get("HEATMAP_MIN_ZOOM", "4")),
+    max_zoom=int(os.environ.get("HEATMAP_MAX_ZOOM", "16")),
+    cache_size=int(os.environ.get("HEATMAP_CACHE_TILES", "4096"))
+)
+
+# Safety scores are rescored off the request path and written back to profiles and the dashboard
+async def apply_safety_scores(scores: Dict[str, int]) -> None:
+    dashboard.update_safety_scores(scores)
+    await repo.set_safety_scores(scores)
+
+safety_scorer = SafetyScorer(
+    zone_index,
+    apply_safety_scores,
+    debounce_seconds=float(os.environ.get("SAFETY_SCORE_DEBOUNCE_SECONDS", "30")),
+    refresh_seconds=float(os.environ.get("SAFETY_SCORE_REFRESH_SECONDS", "300")),
+    timezone_name=os.environ.get("SAFETY_SCORE_TIMEZONE", "Asia/Kolkata")
+)
 
 # Models
 class UserRole(str):
@@ -92,60 +187,186 @@ class Alert(BaseModel):
 class HighRiskZone(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
-    center_lat: float
-    center_lng: float
+    center_lat: float = Field(ge=-90, le=90)
+    center_lng: float = Field(ge=-180, le=180)
     radius: float  # in meters
     risk_level: str  # low, medium, high, critical
     description: str
+    center: Optional[dict] = None  # GeoJSON point for 2dsphere queries, derived from center_lat/center_lng
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    @model_validator(mode="after")
+    def set_geojson_center(self):
+        self.center = geojson_point(self.center_lat, self.center_lng)
+        return self
+
 class LocationUpdate(BaseModel):
     tourist_id: str
-    latitude: float
-    longitude: float
+    # 2dsphere indexes refuse points outside these ranges, so reject them at the API boundary
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_as_utc(cls, value: datetime) -> datetime:
+        # Clients send both naive and offset timestamps; one batch must sort and store consistently
+        return _as_utc(value)
+
+class LocationBatch(BaseModel):
+    samples: List[LocationUpdate]
+
+# Stored documents were validated on the way in; reads project the model's fields and skip re-validation
+alert_rows = TrustedRows(Alert)
+zone_rows = TrustedRows(HighRiskZone)
+profile_rows = TrustedRows(TouristProfile)
+
+MAX_LOCATION_BATCH = int(os.environ.get("MAX_LOCATION_BATCH", "500"))
+
+# Trust the signed role/name/email/active claims instead of looking the user up on cache misses.
+# Claims are only trusted when issued after the user's durable claims_valid_after marker, which
+# every user change moves forward; other workers see a change within JWT_CLAIM_MARKER_TTL_SECONDS
+TRUST_TOKEN_CLAIMS = os.environ.get("JWT_TRUST_CLAIMS", "false").lower() == "true"
+
+# Authenticated users, keyed by user id
+user_cache: UserCache[User] = UserCache(
+    max_size=int(os.environ.get("USER_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+)
+# Each user's claims_valid_after (epoch seconds) as last read from storage; a miss means look the user up
+claim_markers: UserCache[float] = UserCache(
+    max_size=int(os.environ.get("USER_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("JWT_CLAIM_MARKER_TTL_SECONDS", "300"))
+)
+
+# bcrypt runs on a bounded worker pool so logins never stall the event loop
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get("PASSWORD_POOL_WORKERS", "4")),
+    max_pending=int(os.environ.get("PASSWORD_POOL_MAX_PENDING", "64")),
+    rounds=int(os.environ.get("BCRYPT_ROUNDS", "12"))
+)
+
 # Utility functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    try:
+        with auth_seconds.time(("bcrypt_hash",)):
+            return await password_hasher.hash(password)
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
-def verify_password(password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+async def verify_password(password: str, hashed_password: str) -> bool:
+    try:
+        with auth_seconds.time(("bcrypt_verify",)):
+            return await password_hasher.verify(password, hashed_password)
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(hours=24)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
+        expire = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRE_HOURS)
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
+    with auth_seconds.time(("jwt_encode",)):
+        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def access_token_claims(user: User) -> dict:
+    return {"sub": user.id, "role": user.role, "name": user.full_name, "email": user.email, "active": user.is_active}
+
+def remember_user(user_doc: dict) -> User:
+    """Cache a user read from storage together with its claims marker"""
+    user = User(**user_doc)
+    user_cache.put(user.id, user)
+    claim_markers.put(user.id, user_doc.get('claims_valid_after', 0.0))
+    return user
+
+def trusted_claims_user(user_id: str, payload: dict) -> Optional[User]:
+    """User built from the token's claims, if they were issued after the user last changed"""
+    marker = claim_markers.get(user_id)
+    if marker is None or "role" not in payload or payload.get("iat", 0) <= marker:
+        return None
+    return User(id=user_id, email=payload["email"], full_name=payload["name"], role=payload["role"],
+                is_active=payload.get("active", True))
+
+async def authenticate_token(token: str) -> User:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
+        with auth_seconds.time(("jwt_decode",)):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = await db.users.find_one({"id": user_id})
+    user = user_cache.get(user_id)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
+        user = trusted_claims_user(user_id, payload) if TRUST_TOKEN_CLAIMS else None
+        if user is not None:
+            user_cache.put(user_id, user)
+        else:
+            user_doc = await repo.get_user_by_id(user_id)
+            if user_doc is None:
+                raise HTTPException(status_code=401, detail="User not found")
+            user = remember_user(user_doc)
+    
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="Account is disabled")
+    return user
+
+async def update_user(user_id: str, changes: dict) -> bool:
+    """Persist user changes and drop any cached copy so the next request sees them.
+
+    Moving claims_valid_after forward stops tokens issued before the change from being trusted.
+    """
+    changed_at = time.time()
+    updated = await repo.update_user(user_id, {**changes, "claims_valid_after": changed_at})
+    user_cache.invalidate(user_id)
+    claim_markers.put(user_id, changed_at)
+    return updated
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate_token(credentials.credentials)
+
+def publish_alerts(alerts: List[dict]):
+    for alert in alerts:
+        dashboard.add_alert(alert)
+        event_bus.publish("alert_created", alert)
+    heatmap.add_alerts(alerts)
+    safety_scorer.record_alerts(alerts)
+
+# Alerts are persisted and published off the request path, panic first
+alert_dispatcher = AlertDispatcher(
+    repo.insert_alerts,
+    publish_alerts,
+    workers=int(os.environ.get("ALERT_DISPATCH_WORKERS", "2")),
+    reserved_workers=int(os.environ.get("ALERT_DISPATCH_PANIC_WORKERS", "1")),
+    batch_size=int(os.environ.get("ALERT_DISPATCH_BATCH_SIZE", "100")),
+    max_pending=int(os.environ.get("ALERT_DISPATCH_MAX_PENDING", "5000")),
+    max_attempts=int(os.environ.get("ALERT_DISPATCH_MAX_ATTEMPTS", "3"))
+)
+PANIC_ACK_TIMEOUT = float(os.environ.get("PANIC_ACK_TIMEOUT_SECONDS", "2"))
+
+def check_alert_backlog():
+    """Refuse new pings while the geo-fence alert backlog is full, before any state changes"""
+    if alert_dispatcher.saturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
 # Authentication endpoints
 @api_router.post("/auth/register", response_model=Token)
 async def register_user(user_data: UserCreate):
     # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await repo.get_user_by_email(user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    # Validate password strength
+    if len(user_data.password) < 6:
+        raise HTTPException(status_code=400, detail="Password must be at least 6 characters long")
+    
     # Hash password
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     # Create user
     user_dict = user_data.dict()
@@ -154,7 +375,12 @@ async def register_user(user_data: UserCreate):
     user_doc = user.dict()
     user_doc['hashed_password'] = hashed_password
     
-    await db.users.insert_one(user_doc)
+    try:
+        await repo.insert_user(user_doc)
+    except DuplicateEmailError:
+        # Lost a race with a concurrent registration for the same email
+        raise HTTPException(status_code=400, detail="Email already registered")
+    remember_user(user_doc)
     
     # Create tourist profile if role is tourist
     if user_data.role == UserRole.TOURIST:
@@ -165,23 +391,26 @@ async def register_user(user_data: UserCreate):
                 "phone": user_data.emergency_phone,
                 "relationship": "Emergency Contact"
             }]
-        await db.tourist_profiles.insert_one(tourist_profile.dict())
+        await repo.insert_profile(tourist_profile.dict())
+        dashboard.upsert_tourist(tourist_profile.dict())
     
     # Generate token
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=access_token_claims(user))
     return Token(access_token=access_token, token_type="bearer", user=user)
 
 @api_router.post("/auth/login", response_model=Token)
 async def login_user(login_data: UserLogin):
     # Find user
-    user_doc = await db.users.find_one({"email": login_data.email})
-    if not user_doc or not verify_password(login_data.password, user_doc['hashed_password']):
+    user_doc = await repo.get_user_by_email(login_data.email)
+    if not user_doc or not await verify_password(login_data.password, user_doc['hashed_password']):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    user = User(**user_doc)
+    user = remember_user(user_doc)
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="Account is disabled")
     
     # Generate token
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=access_token_claims(user))
     return Token(access_token=access_token, token_type="bearer", user=user)
 
 # Tourist endpoints
@@ -190,61 +419,134 @@ async def get_tourist_profile(current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.TOURIST:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    profile_data = await db.tourist_profiles.find_one({"user_id": current_user.id})
+    profile_data = await repo.get_profile(current_user.id, fields=profile_rows.fields)
     if not profile_data:
         raise HTTPException(status_code=404, detail="Tourist profile not found")
     
-    # Remove ObjectId before creating Pydantic model
-    if '_id' in profile_data:
-        del profile_data['_id']
+    # A fix still waiting in the write-behind buffer is newer than the stored one
+    profile_data['current_location'] = location_buffer.get(current_user.id) or profile_data.get('current_location')
     
-    return TouristProfile(**profile_data)
+    return LeanJSONResponse(profile_rows.row(profile_data))
 
 @api_router.put("/tourist/location")
 async def update_location(location_data: LocationUpdate, current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.TOURIST:
         raise HTTPException(status_code=403, detail="Access denied")
+    check_alert_backlog()
     
     # Update tourist location
-    await db.tourist_profiles.update_one(
-        {"user_id": current_user.id},
-        {"$set": {"current_location": {
-            "latitude": location_data.latitude,
-            "longitude": location_data.longitude,
-            "timestamp": location_data.timestamp.isoformat()
-        }}}
+    current_location = {
+        "latitude": location_data.latitude,
+        "longitude": location_data.longitude,
+        "timestamp": location_data.timestamp.isoformat(),
+        "point": geojson_point(location_data.latitude, location_data.longitude)
+    }
+    location_buffer.put(current_user.id, current_location, location_data.timestamp)
+    dashboard.update_location(current_user.id, current_location)
+    heatmap.move_tourist(current_user.id, location_data.latitude, location_data.longitude)
+    await location_history.append([LocationSample(
+        current_user.id, location_data.latitude, location_data.longitude, location_data.timestamp
+    )])
+    
+    # Check for geo-fence violations against the zones near this point only
+    alerts = geo_fence_alerts(
+        [current_user.id], [location_data.latitude], [location_data.longitude], [location_data.timestamp]
+    )
+    alerts += anomaly_alerts(anomaly_detector.observe_many(
+        [current_user.id], [location_data.latitude], [location_data.longitude], [location_data.timestamp],
+        received_at=time.time()
+    ))
+    safety_scorer.observe_many(
+        [current_user.id], [location_data.latitude], [location_data.longitude], [location_data.timestamp]
     )
+    if alerts:
+        await alert_dispatcher.submit(alerts)
     
-    # Check for geo-fence violations (simulate)
-    high_risk_zones = await db.high_risk_zones.find().to_list(100)
-    for zone in high_risk_zones:
-        distance = calculate_distance(
-            location_data.latitude, location_data.longitude,
-            zone['center_lat'], zone['center_lng']
-        )
-        if distance <= zone['radius']:
-            # Create geo-fence alert
-            alert = Alert(
-                tourist_id=current_user.id,
-                alert_type="geo_fence",
-                message=f"Tourist entered high-risk zone: {zone['name']}",
-                location={
-                    "latitude": location_data.latitude,
-                    "longitude": location_data.longitude
-                }
-            )
-            await db.alerts.insert_one(alert.dict())
+    event_bus.publish("location_updated", {"user_id": current_user.id, **current_location})
     
     return {"message": "Location updated successfully"}
 
+async def unknown_tourist_ids(tourist_ids) -> set:
+    """Ids without a tourist profile; the dashboard snapshot answers first, storage confirms its misses"""
+    missing = [tourist_id for tourist_id in tourist_ids if not dashboard.has_tourist(tourist_id)]
+    if not missing:
+        return set()
+    profiles = await asyncio.gather(*(repo.get_profile(tourist_id, fields=("user_id",)) for tourist_id in missing))
+    return {tourist_id for tourist_id, profile in zip(missing, profiles) if profile is None}
+
+@api_router.post("/tourist/locations/batch")
+async def update_locations_batch(batch: LocationBatch, current_user: User = Depends(get_current_user)):
+    # Tourists flush their own buffered fixes; authority gateways may submit fixes for many tourists
+    if current_user.role == UserRole.TOURIST:
+        samples = [sample.copy(update={"tourist_id": current_user.id}) for sample in batch.samples]
+    elif current_user.role == UserRole.AUTHORITY:
+        samples = batch.samples
+    else:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not samples:
+        return {"message": "No samples received", "accepted": 0, "alerts": 0, "rejected_tourist_ids": []}
+    if len(samples) > MAX_LOCATION_BATCH:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_LOCATION_BATCH} samples")
+    check_alert_backlog()
+    
+    # Gateway fixes for unknown tourists would otherwise grow history, tracker state and missing alerts
+    rejected = set()
+    if current_user.role == UserRole.AUTHORITY:
+        rejected = await unknown_tourist_ids({sample.tourist_id for sample in samples})
+        if rejected:
+            samples = [sample for sample in samples if sample.tourist_id not in rejected]
+            if not samples:
+                return {"message": "No known tourists in batch", "accepted": 0, "alerts": 0,
+                        "rejected_tourist_ids": sorted(rejected)}
+    
+    samples.sort(key=lambda sample: sample.timestamp)
+    
+    # Only the newest fix per tourist becomes current_location
+    latest = {}
+    for sample in samples:
+        latest[sample.tourist_id] = {
+            "latitude": sample.latitude,
+            "longitude": sample.longitude,
+            "timestamp": sample.timestamp.isoformat(),
+            "point": geojson_point(sample.latitude, sample.longitude)
+        }
+        location_buffer.put(sample.tourist_id, latest[sample.tourist_id], sample.timestamp)
+    await location_history.append(
+        LocationSample(sample.tourist_id, sample.latitude, sample.longitude, sample.timestamp)
+        for sample in samples
+    )
+    
+    # Geo-fence and anomaly evaluate every sample in one pass
+    tourist_ids = [sample.tourist_id for sample in samples]
+    lats = [sample.latitude for sample in samples]
+    lngs = [sample.longitude for sample in samples]
+    timestamps = [sample.timestamp for sample in samples]
+    alerts = geo_fence_alerts(tourist_ids, lats, lngs, timestamps)
+    alerts += anomaly_alerts(anomaly_detector.observe_many(tourist_ids, lats, lngs, timestamps, received_at=time.time()))
+    safety_scorer.observe_many(tourist_ids, lats, lngs, timestamps)
+    if alerts:
+        await alert_dispatcher.submit(alerts)
+    
+    for tourist_id, location in latest.items():
+        dashboard.update_location(tourist_id, location)
+        heatmap.move_tourist(tourist_id, location['latitude'], location['longitude'])
+        event_bus.publish("location_updated", {"user_id": tourist_id, **location})
+    
+    return {"message": "Locations updated successfully", "accepted": len(samples), "alerts": len(alerts),
+            "rejected_tourist_ids": sorted(rejected)}
+
 @api_router.post("/tourist/panic")
 async def trigger_panic_alert(current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.TOURIST:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get current location from profile
-    profile = await db.tourist_profiles.find_one({"user_id": current_user.id})
-    if not profile or not profile.get('current_location'):
+    # Get current location, preferring a fix not yet flushed to the profile
+    current_location = location_buffer.get(current_user.id)
+    if current_location is None:
+        profile = await repo.get_profile(current_user.id)
+        current_location = profile.get('current_location') if profile else None
+    if not current_location:
         raise HTTPException(status_code=400, detail="Location not available")
     
     # Create panic alert
@@ -252,111 +554,428 @@ async def trigger_panic_alert(current_user: User = Depends(get_current_user)):
         tourist_id=current_user.id,
         alert_type="panic",
         message=f"PANIC BUTTON pressed by {current_user.full_name}",
-        location=profile['current_location']
+        location=current_location
     )
-    await db.alerts.insert_one(alert.dict())
+    # Panic jumps the dispatch queue; wait a bounded time for it to be stored and broadcast
+    [dispatched] = await alert_dispatcher.submit([alert.dict()])
+    try:
+        delivered = await asyncio.wait_for(asyncio.shield(dispatched), PANIC_ACK_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"message": "Panic alert queued", "alert_id": alert.id, "status": "queued"}
+    if not delivered:
+        raise HTTPException(status_code=503, detail="Panic alert could not be recorded, please retry")
     
-    return {"message": "Panic alert sent successfully", "alert_id": alert.id}
+    return {"message": "Panic alert sent successfully", "alert_id": alert.id, "status": "delivered"}
 
 # Authority endpoints
 @api_router.get("/authority/dashboard")
-async def get_authority_dashboard(current_user: User = Depends(get_current_user)):
+async def get_authority_dashboard(request: Request, current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.AUTHORITY:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get all active tourists with locations
-    tourists_cursor = db.tourist_profiles.find(
-        {"current_location": {"$exists": True}}
-    )
-    tourists_raw = await tourists_cursor.to_list(1000)
-    
-    # Convert to serializable format
-    tourists = []
-    for tourist in tourists_raw:
-        # Remove MongoDB ObjectId and convert to dict
-        if '_id' in tourist:
-            del tourist['_id']
-        tourists.append(tourist)
-    
-    # Get recent alerts
-    alerts_cursor = db.alerts.find(
-        {"status": "active"}
-    ).sort("created_at", -1).limit(50)
-    alerts_raw = await alerts_cursor.to_list(50)
-    
-    # Convert to serializable format
-    alerts = []
-    for alert in alerts_raw:
-        if '_id' in alert:
-            del alert['_id']
-        alerts.append(alert)
-    
-    # Get high-risk zones
-    zones_cursor = db.high_risk_zones.find()
-    zones_raw = await zones_cursor.to_list(100)
-    
-    # Convert to serializable format
-    zones = []
-    for zone in zones_raw:
-        if '_id' in zone:
-            del zone['_id']
-        zones.append(zone)
+    # Served from the in-memory snapshot; unchanged since the client's copy means 304
+    etag = dashboard.etag
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
     
-    return {
-        "tourists": len(tourists),
-        "active_alerts": len(alerts),
-        "tourist_locations": tourists,
-        "recent_alerts": alerts,
-        "high_risk_zones": zones
-    }
+    return Response(content=dashboard.body(), media_type="application/json", headers={"ETag": etag})
+
+def encode_alert_cursor(alert: dict) -> str:
+    created_at = alert['created_at']
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, alert['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_alert_cursor(cursor: str):
+    try:
+        created_at, alert_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_at), alert_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @api_router.get("/authority/alerts", response_model=List[Alert])
-async def get_alerts(current_user: User = Depends(get_current_user)):
+async def get_alerts(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Return alerts older than this position (X-Next-Cursor)"),
+    since: Optional[str] = Query(None, description="Return alerts newer than this position (X-Latest-Cursor), oldest first"),
+    status: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    tourist_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
     if current_user.role != UserRole.AUTHORITY:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    alerts_cursor = db.alerts.find().sort("created_at", -1).limit(100)
-    alerts_raw = await alerts_cursor.to_list(100)
+    alerts_raw = await repo.find_alerts(
+        limit,
+        status=status,
+        alert_type=alert_type,
+        tourist_id=tourist_id,
+        start=start,
+        end=end,
+        before=decode_alert_cursor(cursor) if cursor else None,
+        after=decode_alert_cursor(since) if since else None,
+        fields=alert_rows.fields,
+        # Polls walk forward from since, so a burst larger than limit arrives over several polls
+        oldest_first=since is not None
+    )
     
-    # Convert to Alert objects, removing ObjectId
-    alerts = []
-    for alert_data in alerts_raw:
-        if '_id' in alert_data:
-            del alert_data['_id']
-        alerts.append(Alert(**alert_data))
+    headers = {}
+    if since:
+        headers["X-Latest-Cursor"] = encode_alert_cursor(alerts_raw[-1]) if alerts_raw else since
+    else:
+        if len(alerts_raw) == limit:
+            headers["X-Next-Cursor"] = encode_alert_cursor(alerts_raw[-1])
+        if alerts_raw:
+            headers["X-Latest-Cursor"] = encode_alert_cursor(alerts_raw[0])
     
-    return alerts
+    return LeanJSONResponse(alert_rows.rows(alerts_raw), headers=headers)
 
 @api_router.put("/authority/alerts/{alert_id}/resolve")
 async def resolve_alert(alert_id: str, current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.AUTHORITY:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    await db.alerts.update_one(
-        {"id": alert_id},
-        {"$set": {
-            "status": "resolved",
-            "resolved_at": datetime.now(timezone.utc).isoformat(),
-            "authority_id": current_user.id
-        }}
-    )
+    # Stored as a datetime like created_at, so lean reads encode it the same way the model did
+    resolved_at = datetime.now(timezone.utc)
+    if not await repo.resolve_alert(alert_id, current_user.id, resolved_at):
+        # Only the request that actually resolves the alert publishes it, so stream counts stay exact
+        if await repo.get_alert(alert_id) is None:
+            raise HTTPException(status_code=404, detail="Alert not found")
+        raise HTTPException(status_code=409, detail="Alert already resolved")
+    
+    dashboard.resolve_alert(alert_id)
+    heatmap.resolve_alert(alert_id)
+    event_bus.publish("alert_resolved", {
+        "id": alert_id,
+        "status": "resolved",
+        "resolved_at": resolved_at,
+        "authority_id": current_user.id
+    })
     
     return {"message": "Alert resolved successfully"}
 
+@api_router.websocket("/authority/stream")
+async def authority_event_stream(websocket: WebSocket, token: str = Query(...)):
+    # Browsers cannot set headers on a WebSocket handshake, so the JWT travels as a query parameter
+    try:
+        user = await authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if user.role != UserRole.AUTHORITY:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    queue = event_bus.subscribe()
+    
+    async def forward_events():
+        while True:
+            event = await queue.get()
+            await websocket.send_text(dumps(event).decode('utf-8'))
+    
+    sender = asyncio.create_task(forward_events())
+    try:
+        # Drain client frames so a disconnect is noticed even when no events are flowing
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        event_bus.unsubscribe(queue)
+
+@api_router.get("/authority/tourists/{tourist_id}/trail")
+async def get_tourist_trail(tourist_id: str, start: datetime, end: Optional[datetime] = None,
+                            current_user: User = Depends(get_current_user)):
+    # Authorities can read any trail, tourists only their own
+    if current_user.role != UserRole.AUTHORITY and current_user.id != tourist_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Query strings may carry naive timestamps; treat them as UTC like the stored fixes
+    start = _as_utc(start)
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    return LeanJSONResponse(await location_history.trail(tourist_id, start, end))
+
+MAX_NEARBY_TOURISTS = 500
+
+async def flush_buffered_positions() -> None:
+    """Write buffered pings through before a spatial query, which reads positions from storage"""
+    try:
+        await location_buffer.flush()
+    except Exception:
+        # Serve the stored positions rather than fail the read; the buffer keeps the batch for retry
+        logger.exception("Flushing buffered locations before a spatial read failed")
+
+@api_router.get("/authority/tourists/near")
+async def get_tourists_near(latitude: float, longitude: float, radius: float = Query(1000, gt=0),
+                            current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    await flush_buffered_positions()
+    return LeanJSONResponse(
+        await repo.tourists_near(latitude, longitude, radius, MAX_NEARBY_TOURISTS, fields=profile_rows.fields)
+    )
+
+# Viewport queries return only what the officer's map shows, clustered once it gets dense
+VIEWPORT_CLUSTER_THRESHOLD = int(os.environ.get("VIEWPORT_CLUSTER_THRESHOLD", "300"))
+VIEWPORT_CLUSTER_PIXELS = int(os.environ.get("VIEWPORT_CLUSTER_PIXELS", "60"))
+
+@api_router.get("/authority/tourists/viewport")
+async def get_tourists_in_viewport(south: float = Query(..., ge=-90, le=90), west: float = Query(..., ge=-180, le=180),
+                                   north: float = Query(..., ge=-90, le=90), east: float = Query(..., ge=-180, le=180),
+                                   zoom: int = Query(..., ge=0, le=22),
+                                   current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if south >= north or west >= east:
+        raise HTTPException(status_code=400, detail="Bounding box must have south < north and west < east")
+    
+    box = (south, west, north, east)
+    await flush_buffered_positions()
+    tourists = await repo.tourists_in_box(box, VIEWPORT_CLUSTER_THRESHOLD + 1)
+    if len(tourists) <= VIEWPORT_CLUSTER_THRESHOLD:
+        return LeanJSONResponse(
+            {"zoom": zoom, "clustered": False, "total": len(tourists), "tourists": tourists, "clusters": []}
+        )
+    
+    # Cluster cells span VIEWPORT_CLUSTER_PIXELS screen pixels at this zoom
+    cell_lng = 360.0 / (256 * 2 ** zoom) * VIEWPORT_CLUSTER_PIXELS
+    cell_lat = cell_lng * math.cos(math.radians((south + north) / 2))
+    cells = await repo.cluster_tourists_in_box(box, cell_lat, cell_lng)
+    return LeanJSONResponse({
+        "zoom": zoom,
+        "clustered": True,
+        "total": sum(cell['count'] for cell in cells),
+        "tourists": [cell['tourist'] for cell in cells if cell['count'] == 1],
+        "clusters": [cell for cell in cells if cell['count'] > 1],
+    })
+
+@api_router.get("/authority/alerts/{alert_id}/nearby-tourists")
+async def get_tourists_near_alert(alert_id: str, radius: float = Query(1000, gt=0),
+                                  current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    alert = await repo.get_alert(alert_id)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    
+    location = alert['location']
+    await flush_buffered_positions()
+    return LeanJSONResponse(await repo.tourists_near(
+        location['latitude'], location['longitude'], radius, MAX_NEARBY_TOURISTS, fields=profile_rows.fields
+    ))
+
+class UserStatusUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    role: Optional[str] = None
+
+@api_router.put("/authority/users/{user_id}")
+async def update_user_status(user_id: str, update: UserStatusUpdate, current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    changes = update.dict(exclude_none=True)
+    if "role" in changes and changes["role"] not in (UserRole.TOURIST, UserRole.AUTHORITY):
+        raise HTTPException(status_code=400, detail="Invalid role")
+    if not changes:
+        raise HTTPException(status_code=400, detail="No changes supplied")
+    if not await update_user(user_id, changes):
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return {"message": "User updated successfully"}
+
+# Export endpoints: stream rows straight from the storage cursor so memory stays bounded
+EXPORT_CHUNK_ROWS = 500
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+ALERT_EXPORT_COLUMNS = [
+    "cursor", "id", "created_at", "alert_type", "status", "tourist_id",
+    "latitude", "longitude", "message", "resolved_at", "authority_id"
+]
+LOCATION_EXPORT_COLUMNS = ["cursor", "tourist_id", "timestamp", "latitude", "longitude"]
+
+def export_timestamp(value):
+    """Datetimes in the same form as every other JSON response, UTC written as Z"""
+    if isinstance(value, datetime):
+        # Mongo hands back naive UTC datetimes
+        return isoformat(_as_utc(value))
+    return value
+
+def encode_location_cursor(tourist_id: str, ts: float) -> str:
+    return base64.urlsafe_b64encode(json.dumps([tourist_id, ts]).encode('utf-8')).decode('ascii')
+
+def decode_location_cursor(cursor: str):
+    try:
+        tourist_id, ts = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(tourist_id), float(ts)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def export_zone(zone_id: Optional[str]) -> Optional[dict]:
+    if zone_id is None:
+        return None
+    zone = zone_index.get(zone_id)
+    if zone is None:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    return zone
+
+def in_zone(zone: Optional[dict], latitude, longitude) -> bool:
+    if zone is None:
+        return True
+    if latitude is None or longitude is None:
+        return False
+    return haversine(latitude, longitude, zone['center_lat'], zone['center_lng']) <= zone['radius']
+
+async def stream_export(rows, columns: List[str], export_format: str):
+    """Serialize rows in chunks of EXPORT_CHUNK_ROWS as NDJSON or CSV"""
+    def render(chunk: List[dict]):
+        if export_format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([[row.get(column) for column in columns] for row in chunk])
+            return buffer.getvalue()
+        return b"".join(dumps(row) + b"\n" for row in chunk)
+    
+    if export_format == "csv":
+        yield ",".join(columns) + "\r\n"
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield render(chunk)
+            chunk = []
+    if chunk:
+        yield render(chunk)
+
+def export_response(rows, columns: List[str], export_format: str, name: str) -> StreamingResponse:
+    filename = f"{name}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{export_format}"
+    return StreamingResponse(
+        stream_export(rows, columns, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/authority/exports/alerts")
+async def export_alerts(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    cursor: Optional[str] = Query(None, description="Resume after the row carrying this cursor"),
+    status: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    tourist_id: Optional[str] = None,
+    zone_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Every matching alert, oldest first; each row carries the cursor to resume after it"""
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    after = decode_alert_cursor(cursor) if cursor else None
+    zone = export_zone(zone_id)
+    
+    async def rows():
+        async for alert in repo.iter_alerts(status, alert_type, tourist_id, start, end, after=after):
+            location = alert.get('location') or {}
+            if not in_zone(zone, location.get('latitude'), location.get('longitude')):
+                continue
+            yield {
+                "cursor": encode_alert_cursor(alert),
+                "id": alert['id'],
+                "created_at": export_timestamp(alert['created_at']),
+                "alert_type": alert['alert_type'],
+                "status": alert['status'],
+                "tourist_id": alert['tourist_id'],
+                "latitude": location.get('latitude'),
+                "longitude": location.get('longitude'),
+                "message": alert.get('message'),
+                "resolved_at": export_timestamp(alert.get('resolved_at')),
+                "authority_id": alert.get('authority_id')
+            }
+    
+    return export_response(rows(), ALERT_EXPORT_COLUMNS, export_format, "alerts")
+
+@api_router.get("/authority/exports/locations")
+async def export_locations(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    cursor: Optional[str] = Query(None, description="Resume after the row carrying this cursor"),
+    tourist_id: Optional[str] = None,
+    zone_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Recorded location fixes, by tourist then time; defaults to the last 24 hours"""
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    after = decode_location_cursor(cursor) if cursor else None
+    zone = export_zone(zone_id)
+    
+    async def rows():
+        async for fix in location_history.iter_fixes(start, end, tourist_id=tourist_id, after=after):
+            if not in_zone(zone, fix.latitude, fix.longitude):
+                continue
+            yield {
+                "cursor": encode_location_cursor(fix.tourist_id, fix.timestamp.timestamp()),
+                "tourist_id": fix.tourist_id,
+                "timestamp": export_timestamp(fix.timestamp),
+                "latitude": fix.latitude,
+                "longitude": fix.longitude
+            }
+    
+    return export_response(rows(), LOCATION_EXPORT_COLUMNS, export_format, "locations")
+
+@api_router.get("/authority/cache-stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {
+        "user_cache": user_cache.stats(),
+        "claim_markers": claim_markers.stats(),
+        "password_pool": password_hasher.stats(),
+        "location_buffer": location_buffer.stats(),
+        "alert_dispatcher": alert_dispatcher.stats(),
+        "anomaly_detector": anomaly_detector.stats(),
+        "safety_scorer": safety_scorer.stats(),
+        "heatmap": heatmap.stats()
+    }
+
+@api_router.get("/authority/alerts/dead-letters")
+async def get_dead_letter_alerts(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return LeanJSONResponse(list(alert_dispatcher.dead_letters))
+
+@api_router.post("/authority/alerts/dead-letters/retry")
+async def retry_dead_letter_alerts(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.AUTHORITY:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {"requeued": await alert_dispatcher.retry_dead_letters()}
+
 # High-risk zones endpoints
 @api_router.get("/zones", response_model=List[HighRiskZone])
 async def get_high_risk_zones():
-    zones_cursor = db.high_risk_zones.find()
-    zones_raw = await zones_cursor.to_list(100)
-    
-    # Convert to HighRiskZone objects, removing ObjectId
-    zones = []
-    for zone_data in zones_raw:
-        if '_id' in zone_data:
-            del zone_data['_id']
-        zones.append(HighRiskZone(**zone_data))
-    
-    return zones
+    return LeanJSONResponse(zone_rows.rows(await repo.list_zones(100, fields=zone_rows.fields)))
+
+@api_router.get("/zones/containing", response_model=List[HighRiskZone])
+async def get_zones_containing_point(latitude: float, longitude: float):
+    return LeanJSONResponse(zone_rows.rows(
+        await repo.zones_containing(latitude, longitude, zone_index.max_radius, fields=zone_rows.fields)
+    ))
 
 @api_router.post("/zones", response_model=HighRiskZone)
 async def create_high_risk_zone(zone_data: HighRiskZone, current_user: User = Depends(get_current_user)):
@@ -364,26 +983,77 @@ async def create_high_risk_zone(zone_data: HighRiskZone, current_user: User = De
         raise HTTPException(status_code=403, detail="Access denied")
     
     zone_dict = zone_data.dict()
-    await db.high_risk_zones.insert_one(zone_dict)
+    await repo.insert_zone(zone_dict)
+    zone_index.add(zone_data.dict())
+    dashboard.add_zone(zone_data.dict())
+    heatmap.zones_changed()
+    safety_scorer.zones_changed()
     return zone_data
 
-# Utility function for distance calculation
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two points in meters using Haversine formula"""
-    import math
-    
-    R = 6371000  # Earth's radius in meters
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = (math.sin(delta_lat/2) * math.sin(delta_lat/2) +
-         math.cos(lat1_rad) * math.cos(lat2_rad) *
-         math.sin(delta_lon/2) * math.sin(delta_lon/2))
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+# Map tiles
+HEATMAP_MEDIA_TYPES = {"json": "application/json", "png": "image/png"}
+
+@api_router.get("/map/tiles/{z}/{x}/{y}.{tile_format}")
+async def get_heatmap_tile(z: int, x: int, y: int, tile_format: str, request: Request,
+                           current_user: User = Depends(get_current_user)):
+    if tile_format not in HEATMAP_MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Tile format must be json or png")
     
-    return R * c
+    # Tourists see zone risk only; tourist and alert density is for authorities
+    try:
+        body, etag = heatmap.tile(z, x, y, tile_format, activity=current_user.role == UserRole.AUTHORITY)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=HEATMAP_MEDIA_TYPES[tile_format], headers=headers)
+
+def geo_fence_alerts(tourist_ids: List[str], lats: List[float], lngs: List[float],
+                     timestamps: List[datetime]) -> List[dict]:
+    """Build geo-fence alert documents for zone entries, exits and dwell thresholds"""
+    alerts = []
+    for event in geofence_tracker.evaluate_many(tourist_ids, lats, lngs, timestamps):
+        zone_name = event.zone['name']
+        if event.kind == ENTER:
+            message = f"Tourist entered high-risk zone: {zone_name}"
+        elif event.kind == DWELL:
+            message = f"Tourist has been in high-risk zone {zone_name} for {int(event.dwell_seconds // 60)} minutes"
+        else:
+            message = f"Tourist left high-risk zone: {zone_name}"
+        alert = Alert(
+            tourist_id=event.tourist_id,
+            alert_type="geo_fence",
+            message=message,
+            location={"latitude": event.latitude, "longitude": event.longitude}
+        )
+        alerts.append(alert.dict())
+    return alerts
+
+def anomaly_alerts(events) -> List[dict]:
+    """Build "anomaly" and "missing" alert documents from anomaly detector events"""
+    alerts = []
+    for event in events:
+        if event.kind == MISSING:
+            message = f"No location received from tourist for {int(event.value // 60)} minutes"
+        elif event.kind == SPEED:
+            message = f"Tourist location jumped at an impossible {event.value * 3.6:.0f} km/h"
+        elif event.kind == STILLNESS:
+            message = (f"Tourist has not moved for {int(event.value // 60)} minutes "
+                       f"in high-risk zone {event.zone['name']}")
+        else:
+            message = f"Tourist is {event.value / 1000:.1f} km from their planned itinerary"
+        alert = Alert(
+            tourist_id=event.tourist_id,
+            alert_type="missing" if event.kind == MISSING else "anomaly",
+            message=message,
+            location={"latitude": event.latitude, "longitude": event.longitude}
+        )
+        alerts.append(alert.dict())
+    return alerts
+
+async def submit_anomaly_alerts(events) -> None:
+    await alert_dispatcher.submit(anomaly_alerts(events))
 
 # Initialize demo data
 @api_router.post("/init-demo-data")
@@ -416,15 +1086,49 @@ async def initialize_demo_data():
         )
     ]
     
-    # Clear existing zones
-    await db.high_risk_zones.delete_many({})
+    # Replace existing zones with the demo zones
+    await repo.replace_zones(zone.dict() for zone in demo_zones)
     
-    # Insert demo zones
-    for zone in demo_zones:
-        await db.high_risk_zones.insert_one(zone.dict())
+    zone_index.rebuild(zone.dict() for zone in demo_zones)
+    geofence_tracker.clear()
+    dashboard.replace_zones(zone.dict() for zone in demo_zones)
+    heatmap.zones_changed()
+    safety_scorer.zones_changed()
     
     return {"message": "Demo data initialized successfully"}
 
+# Health check endpoint
+@api_router.get("/health")
+async def health_check():
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "version": "1.0.0",
+        "storage": STORAGE_BACKEND
+    }
+
+# Metrics endpoint for Prometheus scraping
+component_stats = metrics.gauge(
+    "safetrail_component_stat", "Point-in-time stats of in-process caches, pools and queues", ("component", "stat")
+)
+
+@app.get("/metrics")
+async def get_metrics():
+    for component, stats in (
+        ("user_cache", user_cache.stats()),
+        ("claim_markers", claim_markers.stats()),
+        ("password_pool", password_hasher.stats()),
+        ("location_buffer", location_buffer.stats()),
+        ("alert_dispatcher", alert_dispatcher.stats()),
+        ("anomaly_detector", anomaly_detector.stats()),
+        ("safety_scorer", safety_scorer.stats()),
+        ("heatmap", heatmap.stats())
+    ):
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)):
+                component_stats.set((component, stat), value)
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -434,6 +1138,15 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Latest-Cursor"],
+)
+
+# Per-route latency, in-flight counts and MongoDB time; requests slower than SLOW_REQUEST_MS are logged
+app.add_middleware(
+    MetricsMiddleware,
+    registry=metrics,
+    routes=app.router.routes,
+    slow_request_seconds=float(os.environ.get("SLOW_REQUEST_MS", "1000")) / 1000
 )
 
 # Configure logging
@@ -443,6 +1156,81 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def prepare_database():
+    await repo.prepare(
+        verify_query_plans=os.environ.get("MONGO_VERIFY_QUERY_PLANS", "false").lower() == "true"
+    )
+
+# Fixes per evaluate/observe call when rebuilding per-tourist state at startup
+REPLAY_CHUNK_SIZE = 5000
+
+@app.on_event("startup")
+async def load_in_memory_views():
+    zones = await repo.list_zones()
+    zone_index.rebuild(zones)
+    logger.info("Loaded %d high-risk zones into the spatial index", len(zone_index))
+    
+    # Replay recent fixes so presence survives a restart without re-alerting. The state is per tourist,
+    # so fixes stream hour bucket by hour bucket and are fed in chunks rather than loaded all at once
+    lookback = timedelta(hours=float(os.environ.get("GEOFENCE_REBUILD_HOURS", "1")))
+    now = datetime.now(timezone.utc)
+    replayed = 0
+    chunk: List[LocationSample] = []
+    
+    def replay(fixes: List[LocationSample]) -> None:
+        columns = (
+            [fix.tourist_id for fix in fixes],
+            [fix.latitude for fix in fixes],
+            [fix.longitude for fix in fixes],
+            [fix.timestamp for fix in fixes]
+        )
+        geofence_tracker.evaluate_many(*columns)
+        anomaly_detector.observe_many(*columns)
+        safety_scorer.observe_many(*columns)
+    
+    async for fix in location_history.iter_fixes_since(now - lookback, batch_size=500):
+        chunk.append(fix)
+        if len(chunk) >= REPLAY_CHUNK_SIZE:
+            replay(chunk)
+            replayed += len(chunk)
+            chunk = []
+    replay(chunk)
+    replayed += len(chunk)
+    logger.info("Rebuilt geo-fence presence, anomaly and safety score state from %d recent fixes", replayed)
+    
+    tourists = await repo.all_profiles()
+    active_alerts = await repo.active_alerts()
+    for tourist in tourists:
+        anomaly_detector.set_itinerary(tourist['user_id'], tourist.get('planned_itinerary'))
+        anomaly_detector.set_trip(tourist['user_id'], tourist.get('trip_start_date'), tourist.get('trip_end_date'))
+    for alert in active_alerts:
+        if alert['alert_type'] == "missing":
+            anomaly_detector.mark_missing(alert['tourist_id'])
+    safety_scorer.record_alerts(active_alerts)
+    dashboard.load(tourists, active_alerts, zones)
+    heatmap.load(tourists, active_alerts)
+    logger.info("Loaded dashboard snapshot with %d tourists and %d active alerts", len(tourists), len(active_alerts))
+
+@app.on_event("startup")
+async def start_background_tasks():
+    background_tasks.append(asyncio.create_task(run_downsampler(location_history)))
+    background_tasks.append(asyncio.create_task(location_buffer.run()))
+    background_tasks.append(asyncio.create_task(safety_scorer.run()))
+    background_tasks.append(asyncio.create_task(run_missing_sweep(
+        anomaly_detector, submit_anomaly_alerts, float(os.environ.get("ANOMALY_SWEEP_SECONDS", "60"))
+    )))
+    alert_dispatcher.start()
+
 @app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+async def shutdown_storage():
+    for task in background_tasks:
+        task.cancel()
+    # Let cancelled tasks unwind first, so a flush cut short has put its batch back
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await alert_dispatcher.stop()
+    # Durability flush so no buffered position is lost on a clean shutdown
+    await location_buffer.flush()
+    await repo.close()
+    password_hasher.shutdown()
\ No newline at end of file
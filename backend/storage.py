@@ -0,0 +1,154 @@
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (created_at, id) position in the newest-first alert ordering
+AlertPosition = Tuple[datetime, str]
+
+# (south, west, north, east) in degrees
+BoundingBox = Tuple[float, float, float, float]
+
+
+class DuplicateEmailError(Exception):
+    """Raised when inserting a user whose email is already registered"""
+
+
+class Repository(ABC):
+    """Storage operations the API needs, independent of where the data lives.
+
+    Documents go in and come out as plain dicts shaped like the pydantic models,
+    never carrying Mongo's ``_id``. Read methods taking ``fields`` return only
+    those top-level fields, projected by the store rather than trimmed afterwards. ``location_history`` exposes the
+    append/trail/iter_fixes/iter_fixes_since/downsample interface of ``LocationHistoryStore``.
+    """
+
+    location_history = None
+
+    async def prepare(self, verify_query_plans: bool = False) -> None:
+        """Create indexes and run migrations before the app starts serving"""
+
+    async def close(self) -> None:
+        """Release connections on shutdown"""
+
+    def instrument(self, registry) -> None:
+        """Report storage call timings to a ``metrics.MetricsRegistry``"""
+
+    # Users
+    @abstractmethod
+    async def get_user_by_id(self, user_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_user_by_email(self, email: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def insert_user(self, user: dict) -> None: ...
+
+    @abstractmethod
+    async def update_user(self, user_id: str, changes: dict) -> bool: ...
+
+    # Tourist profiles
+    @abstractmethod
+    async def insert_profile(self, profile: dict) -> None: ...
+
+    @abstractmethod
+    async def get_profile(self, user_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def all_profiles(self) -> List[dict]: ...
+
+    @abstractmethod
+    async def set_current_locations(self, locations: Dict[str, dict]) -> None: ...
+
+    @abstractmethod
+    async def set_safety_scores(self, scores: Dict[str, int]) -> None: ...
+
+    @abstractmethod
+    async def tourists_near(self, latitude: float, longitude: float, radius: float, limit: int,
+                            fields: Optional[Sequence[str]] = None) -> List[dict]: ...
+
+    @abstractmethod
+    async def tourists_in_box(self, box: BoundingBox, limit: int) -> List[dict]:
+        """Located tourists inside the box as flat map points: user_id, digital_id,
+        safety_score, latitude, longitude and timestamp"""
+
+    @abstractmethod
+    async def cluster_tourists_in_box(self, box: BoundingBox, cell_lat: float, cell_lng: float) -> List[dict]:
+        """Located tourists inside the box grouped into cells of ``cell_lat`` x ``cell_lng`` degrees.
+
+        Each cluster has count, mean latitude/longitude and min_safety_score; single-tourist
+        cells also carry that tourist's map point under ``tourist``.
+        """
+
+    # Alerts
+    @abstractmethod
+    async def insert_alerts(self, alerts: List[dict]) -> None: ...
+
+    @abstractmethod
+    async def get_alert(self, alert_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def active_alerts(self) -> List[dict]: ...
+
+    @abstractmethod
+    async def find_alerts(
+        self,
+        limit: int,
+        status: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        tourist_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[AlertPosition] = None,
+        after: Optional[AlertPosition] = None,
+        fields: Optional[Sequence[str]] = None,
+        oldest_first: bool = False,
+    ) -> List[dict]:
+        """Alerts newest first by (created_at, id), optionally strictly before/after a position.
+
+        ``oldest_first`` returns the ``limit`` alerts nearest the lower bound instead, so
+        pages polled forward from ``after`` never skip rows.
+        """
+
+    @abstractmethod
+    def iter_alerts(
+        self,
+        status: Optional[str] = None,
+        alert_type: Optional[str] = None,
+        tourist_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[AlertPosition] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[dict]:
+        """Stream matching alerts oldest first by (created_at, id), strictly after ``after``"""
+
+    @abstractmethod
+    async def resolve_alert(self, alert_id: str, authority_id: str, resolved_at: datetime) -> bool:
+        """Mark an unresolved alert resolved; False if it is missing or was already resolved"""
+
+    # High-risk zones
+    @abstractmethod
+    async def list_zones(self, limit: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> List[dict]: ...
+
+    @abstractmethod
+    async def insert_zone(self, zone: dict) -> None: ...
+
+    @abstractmethod
+    async def replace_zones(self, zones: Iterable[dict]) -> None: ...
+
+    @abstractmethod
+    async def zones_containing(self, latitude: float, longitude: float, max_radius: float,
+                               fields: Optional[Sequence[str]] = None) -> List[dict]: ...
+
+
+def create_repository(backend: Optional[str] = None, **options) -> Repository:
+    """Build the repository selected by ``backend`` or the STORAGE_BACKEND setting"""
+    backend = backend or os.environ.get("STORAGE_BACKEND", "mongo")
+    if backend == "memory":
+        from memory_store import MemoryRepository
+        return MemoryRepository(**options)
+    if backend == "mongo":
+        from mongo_store import MongoRepository
+        return MongoRepository(os.environ['MONGO_URL'], os.environ['DB_NAME'], **options)
+    raise ValueError(f"Unknown storage backend: {backend}")
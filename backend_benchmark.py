@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Load generator and latency benchmark for the SafeTrail API.
+
+Simulates tourists walking between Delhi landmarks and streaming GPS fixes,
+occasional panic presses, and authority officers polling their dashboards.
+Reports p50/p95/p99 latency and throughput per endpoint and saves the results
+as JSON so runs can be compared between commits.
+
+    # In-process against the in-memory storage backend (no MongoDB or server needed)
+    python backend_benchmark.py --tourists 200 --officers 5 --duration 60
+
+    # Against a running server
+    python backend_benchmark.py --url http://127.0.0.1:8000 --tourists 200
+
+    # Compare with an earlier run
+    python backend_benchmark.py --compare benchmark-results/previous.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent
+backend_dir = ROOT_DIR / 'backend'
+
+# Walking routes are drawn between these points, several of which sit in the demo high-risk zones
+DELHI_LANDMARKS = [
+    ("India Gate", 28.6129, 77.2295),
+    ("Connaught Place", 28.6315, 77.2167),
+    ("Red Fort", 28.6562, 77.2410),
+    ("Jama Masjid", 28.6507, 77.2334),
+    ("Old Delhi Railway Station", 28.6644, 77.2198),
+    ("Chandni Chowk", 28.6506, 77.2300),
+    ("Humayun's Tomb", 28.5933, 77.2507),
+    ("Lotus Temple", 28.5535, 77.2588),
+    ("Qutub Minar", 28.5245, 77.1855),
+    ("Akshardham", 28.6127, 77.2773),
+]
+WALKING_SPEED_MPS = 1.4
+GPS_NOISE_DEG = 0.00005
+METERS_PER_DEG = 111_320
+
+
+async def sleep_until(seconds: float, deadline: float):
+    await asyncio.sleep(max(0.0, min(seconds, deadline - time.monotonic())))
+
+
+class Trajectory:
+    """A tourist walking from landmark to landmark at walking pace, with GPS noise"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        _, self.lat, self.lng = rng.choice(DELHI_LANDMARKS)
+        self.lat += rng.uniform(-0.005, 0.005)
+        self.lng += rng.uniform(-0.005, 0.005)
+        self._pick_target()
+
+    def _pick_target(self):
+        _, self.target_lat, self.target_lng = self.rng.choice(DELHI_LANDMARKS)
+
+    def advance(self, seconds: float, speedup: float):
+        step = WALKING_SPEED_MPS * seconds * speedup / METERS_PER_DEG
+        d_lat = self.target_lat - self.lat
+        d_lng = (self.target_lng - self.lng) * math.cos(math.radians(self.lat))
+        distance = math.hypot(d_lat, d_lng)
+        if distance <= step:
+            self.lat, self.lng = self.target_lat, self.target_lng
+            self._pick_target()
+        else:
+            self.lat += d_lat / distance * step
+            self.lng += d_lng / distance * step / math.cos(math.radians(self.lat))
+        return (self.lat + self.rng.gauss(0, GPS_NOISE_DEG), self.lng + self.rng.gauss(0, GPS_NOISE_DEG))
+
+
+class Recorder:
+    """Per-endpoint latency samples and status counts"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        self.statuses[label][response.status_code] += 1
+        if response.status_code >= 500:
+            self.errors[label] += 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            samples = np.array(self.latencies[label]) * 1000
+            endpoints[label] = {
+                "requests": int(samples.size),
+                "errors": self.errors[label],
+                "status_codes": {str(code): count for code, count in sorted(self.statuses[label].items())},
+                "throughput_rps": round(samples.size / elapsed, 2),
+                "p50_ms": round(float(np.percentile(samples, 50)), 2) if samples.size else None,
+                "p95_ms": round(float(np.percentile(samples, 95)), 2) if samples.size else None,
+                "p99_ms": round(float(np.percentile(samples, 99)), 2) if samples.size else None,
+                "max_ms": round(float(samples.max()), 2) if samples.size else None,
+            }
+        return endpoints
+
+
+async def register(client, recorder, semaphore, run_id, index, role):
+    payload = {
+        "email": f"bench-{run_id}-{role}-{index}@example.com",
+        "full_name": f"Bench {role.title()} {index}",
+        "role": role,
+        "password": "bench-password",
+    }
+    async with semaphore:
+        response = await recorder.request(client, "POST /api/auth/register", "POST", "/api/auth/register", json=payload)
+    if response is None or response.status_code != 200:
+        raise RuntimeError(f"Registering {payload['email']} failed: {response and response.text}")
+    body = response.json()
+    return body["user"]["id"], {"Authorization": f"Bearer {body['access_token']}"}
+
+
+async def tourist_loop(client, recorder, args, headers, user_id, rng, deadline):
+    trajectory = Trajectory(rng)
+    # Panics per second across all tourists, spread over everyone's pings
+    panic_probability = args.panic_rate / 60 * args.ping_interval / max(args.tourists, 1)
+    pending = []
+    await sleep_until(rng.uniform(0, args.ping_interval), deadline)
+    while time.monotonic() < deadline:
+        latitude, longitude = trajectory.advance(args.ping_interval, args.speedup)
+        fix = {
+            "tourist_id": user_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        if args.batch_size > 1:
+            pending.append(fix)
+            if len(pending) >= args.batch_size:
+                await recorder.request(client, "POST /api/tourist/locations/batch", "POST",
+                                       "/api/tourist/locations/batch", json={"samples": pending}, headers=headers)
+                pending = []
+        else:
+            await recorder.request(client, "PUT /api/tourist/location", "PUT", "/api/tourist/location",
+                                   json=fix, headers=headers)
+        if rng.random() < panic_probability:
+            await recorder.request(client, "POST /api/tourist/panic", "POST", "/api/tourist/panic", headers=headers)
+        await sleep_until(args.ping_interval, deadline)
+
+
+async def officer_loop(client, recorder, args, headers, rng, deadline):
+    etag = None
+    await sleep_until(rng.uniform(0, args.poll_interval), deadline)
+    while time.monotonic() < deadline:
+        conditional = {**headers, "If-None-Match": etag} if etag else headers
+        response = await recorder.request(client, "GET /api/authority/dashboard", "GET", "/api/authority/dashboard",
+                                          headers=conditional)
+        if response is not None and response.status_code == 200:
+            etag = response.headers.get("etag")
+        await recorder.request(client, "GET /api/authority/alerts", "GET", "/api/authority/alerts",
+                               params={"status": "active", "limit": 50}, headers=headers)
+        await sleep_until(args.poll_interval, deadline)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    setup_recorder = Recorder()
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+
+    app = None
+    if args.url:
+        transport = httpx.AsyncHTTPTransport()
+        base_url = args.url.rstrip("/")
+    else:
+        # In-process: the real app on the in-memory backend, with cheap password hashing for fast setup
+        os.environ.setdefault("STORAGE_BACKEND", "memory")
+        os.environ.setdefault("BCRYPT_ROUNDS", "4")
+        sys.path.insert(0, str(backend_dir))
+        os.chdir(backend_dir)
+        from server import app
+        await app.router.startup()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=30) as client:
+        if args.init_demo_data or not args.url:
+            await client.post("/api/init-demo-data")
+
+        print(f"Registering {args.tourists} tourists and {args.officers} officers...")
+        semaphore = asyncio.Semaphore(args.concurrency)
+        setup_started = time.monotonic()
+        tourists = await asyncio.gather(*(
+            register(client, setup_recorder, semaphore, run_id, i, "tourist") for i in range(args.tourists)
+        ))
+        officers = await asyncio.gather(*(
+            register(client, setup_recorder, semaphore, run_id, i, "authority") for i in range(args.officers)
+        ))
+
+        setup_elapsed = time.monotonic() - setup_started
+
+        print(f"Running load for {args.duration}s...")
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(tourist_loop(client, recorder, args, headers, user_id, random.Random(rng.random()), deadline)
+              for user_id, headers in tourists),
+            *(officer_loop(client, recorder, args, headers, random.Random(rng.random()), deadline)
+              for _, headers in officers),
+        )
+        elapsed = time.monotonic() - started
+
+    if app is not None:
+        await app.router.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.url or "in-process (memory storage)",
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "elapsed_seconds": round(elapsed, 2),
+        "endpoints": recorder.summary(elapsed),
+        # Registration happens before the load window, so it is reported on its own
+        "setup": setup_recorder.summary(setup_elapsed),
+    }
+
+
+def print_report(results, previous=None):
+    print(f"\nCommit {results['commit']} against {results['target']}, {results['elapsed_seconds']}s")
+    print("Setup: " + ", ".join(
+        f"{label} p95 {stats['p95_ms']} ms at {stats['throughput_rps']} req/s"
+        for label, stats in results["setup"].items()
+    ))
+    header = f"{'endpoint':<38}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if previous:
+        header += f"{'p95 vs prev':>13}"
+    print(header)
+    print("-" * len(header))
+    for label, stats in results["endpoints"].items():
+        line = (f"{label:<38}{stats['requests']:>9}{stats['errors']:>8}{stats['throughput_rps']:>9}"
+                f"{stats['p50_ms'] or '-':>9}{stats['p95_ms'] or '-':>9}{stats['p99_ms'] or '-':>9}")
+        before = previous and previous["endpoints"].get(label)
+        if before and before.get("p95_ms") and stats["p95_ms"]:
+            line += f"{(stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100:>+12.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server; omit to run the app in-process")
+    parser.add_argument("--tourists", type=int, default=100, help="Simulated tourists streaming GPS")
+    parser.add_argument("--officers", type=int, default=5, help="Simulated officers polling the dashboard")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load after setup")
+    parser.add_argument("--ping-interval", type=float, default=1.0, help="Seconds between a tourist's GPS fixes")
+    parser.add_argument("--batch-size", type=int, default=1, help="Fixes per /tourist/locations/batch request; 1 sends single pings")
+    parser.add_argument("--speedup", type=float, default=10.0, help="Walk this many times faster than real time")
+    parser.add_argument("--panic-rate", type=float, default=6.0, help="Panic presses per minute across all tourists")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between an officer's dashboard polls")
+    parser.add_argument("--concurrency", type=int, default=100, help="Maximum open connections")
+    parser.add_argument("--init-demo-data", action="store_true", help="Reset the demo zones on a remote server first")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for trajectories and panics")
+    parser.add_argument("--output", help="Where to write JSON results (default benchmark-results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare p95 latencies against")
+    args = parser.parse_args()
+
+    previous = json.loads(Path(args.compare).read_text()) if args.compare else None
+    # Resolved up front because the in-process run changes into the backend directory
+    output = Path(args.output).resolve() if args.output else (
+        ROOT_DIR / "benchmark-results" / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{git_commit() or 'unknown'}.json"
+    )
+    results = asyncio.run(run(args))
+    print_report(results, previous)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
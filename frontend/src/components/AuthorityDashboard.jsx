@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Shield, 
   Users, 
@@ -19,6 +19,19 @@ import { api, useAuth } from '../App.jsx';
 import TouristMap from './TouristMap.jsx';
 import Logo from './Logo.jsx';
 
+const STREAM_URL = `${import.meta.env.VITE_BACKEND_URL.replace(/^http/, 'ws')}/api/authority/stream`;
+const FALLBACK_POLL_MS = 30000;
+const RECONNECT_DELAY_MS = 5000;
+// Same sizes as the dashboard snapshot's recent_alerts and the default /authority/alerts page
+const RECENT_ALERTS_LIMIT = 50;
+const ALERT_LIST_LIMIT = 100;
+
+const alertFilterParams = (filter) => {
+  if (filter === 'all') return {};
+  if (filter === 'active' || filter === 'resolved') return { status: filter };
+  return { alert_type: filter };
+};
+
 const AuthorityDashboard = () => {
   const { user, logout } = useAuth();
   const [dashboardData, setDashboardData] = useState(null);
@@ -28,19 +41,86 @@ const AuthorityDashboard = () => {
   const [selectedTab, setSelectedTab] = useState('overview');
   const [alertFilter, setAlertFilter] = useState('all');
 
+  const streamOpen = useRef(false);
+  const alertFilterRef = useRef(alertFilter);
+
+  // Filtering happens server-side; the client-side filter below only covers pushed alerts
   useEffect(() => {
-    fetchDashboardData();
+    alertFilterRef.current = alertFilter;
     fetchAlerts();
-    
-    // Set up periodic refresh
+  }, [alertFilter]);
+
+  useEffect(() => {
+    fetchDashboardData();
+
+    let socket = null;
+    let reconnectTimer = null;
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(`${STREAM_URL}?token=${encodeURIComponent(localStorage.getItem('token'))}`);
+      socket.onopen = () => {
+        streamOpen.current = true;
+        // Resync once so nothing published while disconnected is missed
+        fetchDashboardData();
+        fetchAlerts();
+      };
+      socket.onmessage = (message) => applyStreamEvent(JSON.parse(message.data));
+      socket.onclose = () => {
+        streamOpen.current = false;
+        if (!closed) reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+      };
+    };
+    connect();
+
+    // Poll only while the push stream is down
     const interval = setInterval(() => {
+      if (streamOpen.current) return;
       fetchDashboardData();
       fetchAlerts();
-    }, 30000); // Refresh every 30 seconds
+    }, FALLBACK_POLL_MS);
 
-    return () => clearInterval(interval);
+    return () => {
+      closed = true;
+      clearInterval(interval);
+      clearTimeout(reconnectTimer);
+      if (socket) socket.close();
+    };
   }, []);
 
+  const applyStreamEvent = (event) => {
+    const { type, data } = event;
+    if (type === 'alert_created') {
+      setAlerts(prev => [data, ...prev.filter(alert => alert.id !== data.id)].slice(0, ALERT_LIST_LIMIT));
+      setDashboardData(prev => prev && ({
+        ...prev,
+        active_alerts: prev.active_alerts + 1,
+        recent_alerts: [data, ...prev.recent_alerts].slice(0, RECENT_ALERTS_LIMIT)
+      }));
+      if (data.alert_type === 'panic') toast.error(data.message);
+    } else if (type === 'alert_resolved') {
+      setAlerts(prev => prev.map(alert => alert.id === data.id ? { ...alert, ...data } : alert));
+      setDashboardData(prev => prev && ({
+        ...prev,
+        active_alerts: Math.max(prev.active_alerts - 1, 0),
+        recent_alerts: prev.recent_alerts.filter(alert => alert.id !== data.id)
+      }));
+    } else if (type === 'location_updated') {
+      setDashboardData(prev => {
+        if (!prev) return prev;
+        const location = { latitude: data.latitude, longitude: data.longitude, timestamp: data.timestamp };
+        const known = prev.tourist_locations.some(tourist => tourist.user_id === data.user_id);
+        if (!known) return prev;
+        return {
+          ...prev,
+          tourist_locations: prev.tourist_locations.map(tourist =>
+            tourist.user_id === data.user_id ? { ...tourist, current_location: location } : tourist
+          )
+        };
+      });
+    }
+  };
+
   const fetchDashboardData = async () => {
     try {
       const response = await api.get('/authority/dashboard');
@@ -57,7 +137,7 @@ const AuthorityDashboard = () => {
     if (!alertsLoading) setAlertsLoading(true);
     
     try {
-      const response = await api.get('/authority/alerts');
+      const response = await api.get('/authority/alerts', { params: alertFilterParams(alertFilterRef.current) });
       setAlerts(response.data);
     } catch (error) {
       console.error('Error fetching alerts:', error);
@@ -73,6 +153,11 @@ const AuthorityDashboard = () => {
       toast.success('Alert resolved successfully');
       fetchAlerts();
     } catch (error) {
+      if (error.response?.status === 409) {
+        toast.info('Alert was already resolved');
+        fetchAlerts();
+        return;
+      }
       console.error('Error resolving alert:', error);
       toast.error('Failed to resolve alert');
     }
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Shield, 
   MapPin, 
@@ -19,6 +19,11 @@ import QRCode from 'react-qr-code';
 import TouristMap from './TouristMap.jsx';
 import Logo from './Logo.jsx';
 
+// Buffered GPS fixes are flushed to the batch endpoint on this cadence
+const LOCATION_FLUSH_INTERVAL_MS = 15000;
+const LOCATION_FLUSH_SIZE = 20;
+const LOCATION_BUFFER_LIMIT = 500;
+
 const TouristDashboard = () => {
   const { user, logout } = useAuth();
   const [profile, setProfile] = useState(null);
@@ -26,10 +31,20 @@ const TouristDashboard = () => {
   const [showQR, setShowQR] = useState(false);
   const [locationStatus, setLocationStatus] = useState('offline');
   const [currentLocation, setCurrentLocation] = useState(null);
+  const locationBuffer = useRef([]);
+  const flushing = useRef(false);
 
   useEffect(() => {
     fetchProfile();
     startLocationTracking();
+
+    const interval = setInterval(flushLocationBuffer, LOCATION_FLUSH_INTERVAL_MS);
+    window.addEventListener('pagehide', flushLocationBuffer);
+    return () => {
+      clearInterval(interval);
+      window.removeEventListener('pagehide', flushLocationBuffer);
+      flushLocationBuffer();
+    };
   }, []);
 
   const fetchProfile = async () => {
@@ -66,7 +81,7 @@ const TouristDashboard = () => {
                 longitude: position.coords.longitude
               };
               setCurrentLocation(newLocation);
-              updateLocation(newLocation);
+              bufferLocation(newLocation);
             },
             (error) => {
               console.error('Location error:', error);
@@ -99,6 +114,40 @@ const TouristDashboard = () => {
     }
   };
 
+  const bufferLocation = (location) => {
+    locationBuffer.current.push({
+      tourist_id: user.id,
+      latitude: location.latitude,
+      longitude: location.longitude,
+      timestamp: new Date().toISOString()
+    });
+    if (locationBuffer.current.length >= LOCATION_FLUSH_SIZE) {
+      flushLocationBuffer();
+    }
+  };
+
+  const flushLocationBuffer = async () => {
+    if (flushing.current || locationBuffer.current.length === 0) return;
+
+    flushing.current = true;
+    const samples = locationBuffer.current;
+    locationBuffer.current = [];
+    try {
+      await api.post('/tourist/locations/batch', { samples });
+    } catch (error) {
+      console.error('Error flushing buffered locations:', error);
+      const status = error.response?.status;
+      if (status >= 400 && status < 500 && status !== 408 && status !== 429) {
+        // The server rejected the batch itself; resending it would fail the same way
+        return;
+      }
+      // Keep the fixes for the next flush, dropping the oldest on a long outage
+      locationBuffer.current = [...samples, ...locationBuffer.current].slice(-LOCATION_BUFFER_LIMIT);
+    } finally {
+      flushing.current = false;
+    }
+  };
+
   const triggerPanicAlert = async () => {
     if (!currentLocation) {
       toast.error('Location not available. Please enable location services.');
@@ -106,6 +155,8 @@ const TouristDashboard = () => {
     }
 
     try {
+      // Send buffered fixes first so the alert carries the newest position
+      await flushLocationBuffer();
       const response = await api.post('/tourist/panic');
       toast.success('🚨 PANIC ALERT SENT! Authorities have been notified.');
       
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Bulk-seed tourists, profiles and location history into MongoDB for staging.
+
+    # 100k generated tourists with a day of history each
+    python seed_tourists.py generate --count 100000 --history-hours 24
+
+    # Import from CSV (email,full_name,password[,role]) or JSON / NDJSON objects
+    python seed_tourists.py import tourists.csv
+
+Passwords are hashed on a process pool and documents are written with
+unordered ``insert_many`` batches. Re-running is safe: ids are derived from
+the email, existing users are skipped before hashing, and duplicate-key
+errors from concurrent or interrupted runs are ignored.
+"""
+
+import asyncio
+import csv
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+import bcrypt
+import typer
+
+# Add the backend directory to the path
+backend_dir = Path(__file__).parent / 'backend'
+sys.path.insert(0, str(backend_dir))
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db_setup import ensure_indexes, geojson_point
+from location_history import RAW_RESOLUTION, bucket_id, bucket_start
+
+# Load environment variables
+load_dotenv(backend_dir / '.env')
+
+# Stable ids so a re-run maps every email onto the documents it already created
+SEED_NAMESPACE = uuid.UUID("6f1d3c52-5b8e-4a57-9d0f-3c1e9a7b2d44")
+DUPLICATE_KEY = 11000
+
+FIRST_NAMES = ["Aarav", "Priya", "Liam", "Emma", "Hiroshi", "Yuki", "Carlos", "Sofia", "Omar", "Fatima",
+               "Noah", "Mia", "Arjun", "Ananya", "Lucas", "Chloe", "Wei", "Mei", "Ivan", "Olga"]
+LAST_NAMES = ["Sharma", "Patel", "Smith", "Garcia", "Tanaka", "Kim", "Muller", "Rossi", "Khan", "Silva",
+              "Brown", "Nguyen", "Singh", "Dubois", "Ivanov", "Lopez", "Chen", "Wilson", "Haddad", "Costa"]
+# Centre of the simulated area (Connaught Place) and how far tourists start from it
+DELHI_CENTER = (28.6315, 77.2167)
+DELHI_SPREAD_DEG = 0.08
+
+app = typer.Typer(help="Seed tourists, profiles and location history for staging", add_completion=False)
+
+
+def hash_passwords(passwords: List[str], rounds: int) -> List[str]:
+    """Runs in a worker process; bcrypt is CPU bound so each process takes a slice"""
+    return [bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+            for password in passwords]
+
+
+def seed_user_id(email: str) -> str:
+    return str(uuid.uuid5(SEED_NAMESPACE, email))
+
+
+def seed_profile(user_id: str, email: str, created_at: datetime) -> dict:
+    rng = random.Random(user_id)
+    return {
+        'id': str(uuid.uuid5(SEED_NAMESPACE, f"profile:{email}")),
+        'user_id': user_id,
+        'digital_id': f"DT{rng.randint(100000, 999999)}",
+        'safety_score': 85,
+        'current_location': None,
+        'planned_itinerary': [],
+        'family_tracking_enabled': False,
+        'emergency_contacts': [],
+        'blockchain_hash': hashlib.sha256(user_id.encode('utf-8')).hexdigest(),
+        'trip_start_date': None,
+        'trip_end_date': None,
+        'created_at': created_at,
+    }
+
+
+def random_walk(user_id: str, end: datetime, hours: float, interval_seconds: int) -> List[tuple]:
+    """Deterministic (per user) walk of (timestamp, lat, lng) fixes ending at ``end``"""
+    rng = random.Random(user_id)
+    lat = DELHI_CENTER[0] + rng.uniform(-DELHI_SPREAD_DEG, DELHI_SPREAD_DEG)
+    lng = DELHI_CENTER[1] + rng.uniform(-DELHI_SPREAD_DEG, DELHI_SPREAD_DEG)
+    heading = rng.uniform(0, 2 * math.pi)
+    # Walking pace, roughly 1.4 m/s
+    step_deg = 1.4 * interval_seconds / 111_320
+    fixes = []
+    steps = int(hours * 3600 // interval_seconds)
+    for i in range(steps, 0, -1):
+        heading += rng.gauss(0, 0.3)
+        lat += math.cos(heading) * step_deg
+        lng += math.sin(heading) * step_deg / math.cos(math.radians(lat))
+        fixes.append((end - timedelta(seconds=i * interval_seconds), lat, lng))
+    return fixes
+
+
+def history_operations(user_id: str, fixes: List[tuple]) -> List[UpdateOne]:
+    buckets: Dict[datetime, List[tuple]] = {}
+    for fix in fixes:
+        buckets.setdefault(bucket_start(fix[0]), []).append(fix)
+    # $setOnInsert only, so a re-run never appends the same fixes twice
+    return [
+        UpdateOne(
+            {"_id": bucket_id(user_id, start)},
+            {"$setOnInsert": {
+                "tourist_id": user_id,
+                "bucket_start": start,
+                "resolution": RAW_RESOLUTION,
+                "lats": [fix[1] for fix in bucket],
+                "lngs": [fix[2] for fix in bucket],
+                "ts": [fix[0].timestamp() for fix in bucket],
+                "count": len(bucket),
+            }},
+            upsert=True,
+        )
+        for start, bucket in buckets.items()
+    ]
+
+
+async def insert_unordered(collection, documents: List[dict]) -> int:
+    """Insert what is new and return how many were inserted; duplicates from earlier runs are skipped"""
+    if not documents:
+        return 0
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as exc:
+        details = exc.details
+        if details.get('writeConcernErrors') or any(
+            error.get('code') != DUPLICATE_KEY for error in details.get('writeErrors', [])
+        ):
+            raise
+        return details.get('nInserted', 0)
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Seeder:
+    def __init__(self, db, pool: ProcessPoolExecutor, workers: int, rounds: int,
+                 history_hours: float, history_interval: int):
+        self.db = db
+        self.pool = pool
+        self.workers = workers
+        self.rounds = rounds
+        self.history_hours = history_hours
+        self.history_interval = history_interval
+        self.stats = {"rows": 0, "skipped_existing": 0, "hashed": 0, "users_inserted": 0,
+                      "profiles_inserted": 0, "history_buckets": 0}
+        self.hash_seconds = 0.0
+
+    async def _hash(self, passwords: List[str]) -> List[str]:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        slice_size = max(1, math.ceil(len(passwords) / self.workers))
+        slices = [passwords[i:i + slice_size] for i in range(0, len(passwords), slice_size)]
+        hashed = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, hash_passwords, chunk, self.rounds) for chunk in slices
+        ))
+        self.hash_seconds += time.perf_counter() - started
+        return [value for chunk in hashed for value in chunk]
+
+    async def _prepare(self, rows: List[dict]) -> List[dict]:
+        """Hash passwords for rows not yet seeded in the process pool; rows already present are kept
+        unhashed so an interrupted run can still backfill their profiles"""
+        self.stats["rows"] += len(rows)
+        emails = [row['email'] for row in rows]
+        existing = {
+            user['email']: user
+            async for user in self.db.users.find({"email": {"$in": emails}}, {"_id": 0, "email": 1, "id": 1, "role": 1})
+        }
+        seen = set()
+        prepared, fresh = [], []
+        for row in rows:
+            if row['email'] in seen:
+                continue
+            seen.add(row['email'])
+            user = existing.get(row['email'])
+            if user is not None:
+                row['existing_user'] = user
+            else:
+                fresh.append(row)
+            prepared.append(row)
+        self.stats["skipped_existing"] += len(rows) - len(fresh)
+        if fresh:
+            hashes = await self._hash([row['password'] for row in fresh])
+            self.stats["hashed"] += len(hashes)
+            for row, hashed_password in zip(fresh, hashes):
+                row['hashed_password'] = hashed_password
+        return prepared
+
+    async def _write(self, rows: List[dict]) -> None:
+        now = datetime.now(timezone.utc)
+        users, profiles, history = [], [], []
+        for row in rows:
+            existing_user = row.get('existing_user')
+            if existing_user is not None:
+                # Only the profile is backfilled; the unique user_id index skips ones already there
+                if existing_user.get('role') == 'tourist':
+                    profiles.append(seed_profile(existing_user['id'], row['email'], now))
+                continue
+            user_id = seed_user_id(row['email'])
+            users.append({
+                'id': user_id,
+                'email': row['email'],
+                'full_name': row['full_name'],
+                'role': row.get('role') or 'tourist',
+                'created_at': now,
+                'is_active': True,
+                'hashed_password': row['hashed_password'],
+            })
+            if users[-1]['role'] != 'tourist':
+                continue
+            profile = seed_profile(user_id, row['email'], now)
+            if self.history_hours > 0:
+                fixes = random_walk(user_id, now, self.history_hours, self.history_interval)
+                if fixes:
+                    timestamp, lat, lng = fixes[-1]
+                    profile['current_location'] = {
+                        "latitude": lat,
+                        "longitude": lng,
+                        "timestamp": timestamp.isoformat(),
+                        "point": geojson_point(lat, lng),
+                    }
+                    history.extend(history_operations(user_id, fixes))
+            profiles.append(profile)
+
+        self.stats["users_inserted"] += await insert_unordered(self.db.users, users)
+        self.stats["profiles_inserted"] += await insert_unordered(self.db.tourist_profiles, profiles)
+        if history:
+            result = await self.db.location_history.bulk_write(history, ordered=False)
+            self.stats["history_buckets"] += result.upserted_count
+
+    async def run(self, rows: Iterable[dict], batch_size: int) -> None:
+        # Hash the next batch while the current one is being written
+        batches = batched(rows, batch_size)
+        next_batch = next(batches, None)
+        pending = asyncio.create_task(self._prepare(next_batch)) if next_batch else None
+        while pending is not None:
+            prepared = await pending
+            next_batch = next(batches, None)
+            pending = asyncio.create_task(self._prepare(next_batch)) if next_batch else None
+            await self._write(prepared)
+            typer.echo(f"  {self.stats['rows']} rows processed, {self.stats['users_inserted']} users inserted")
+
+
+async def seed(rows: Iterable[dict], batch_size: int, workers: int, rounds: int,
+               history_hours: float, history_interval: int) -> None:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    started = time.perf_counter()
+    try:
+        # Unique indexes on email and user_id are what make re-runs idempotent
+        await ensure_indexes(db)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            seeder = Seeder(db, pool, workers, rounds, history_hours, history_interval)
+            await seeder.run(rows, batch_size)
+    finally:
+        client.close()
+
+    elapsed = time.perf_counter() - started
+    stats = seeder.stats
+    typer.echo(
+        f"\nDone in {elapsed:.1f}s: {stats['rows']} rows, {stats['users_inserted']} users and "
+        f"{stats['profiles_inserted']} profiles inserted, {stats['skipped_existing']} already present, "
+        f"{stats['history_buckets']} history buckets written"
+    )
+    typer.echo(
+        f"Throughput: {stats['rows'] / elapsed:.0f} rows/s overall, "
+        f"{stats['hashed'] / seeder.hash_seconds if seeder.hash_seconds else 0:.0f} hashes/s "
+        f"on {workers} processes at {rounds} bcrypt rounds"
+    )
+
+
+def generated_rows(count: int, password: str, email_domain: str, start: int) -> Iterator[dict]:
+    for i in range(start, start + count):
+        rng = random.Random(i)
+        yield {
+            'email': f"tourist{i:07d}@{email_domain}",
+            'full_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'password': password,
+        }
+
+
+def file_rows(path: Path) -> Iterator[dict]:
+    """CSV with a header row, a JSON array, or one JSON object per line"""
+    with path.open(newline='', encoding='utf-8') as handle:
+        if path.suffix.lower() == '.csv':
+            rows = csv.DictReader(handle)
+        elif path.suffix.lower() == '.json':
+            rows = json.load(handle)
+        else:
+            rows = (json.loads(line) for line in handle if line.strip())
+        for number, row in enumerate(rows, start=1):
+            missing = [field for field in ('email', 'full_name', 'password') if not row.get(field)]
+            if missing:
+                raise typer.BadParameter(f"Row {number} is missing {', '.join(missing)}")
+            yield {
+                'email': row['email'].strip().lower(),
+                'full_name': row['full_name'].strip(),
+                'password': row['password'],
+                'role': (row.get('role') or 'tourist').strip(),
+            }
+
+
+BATCH_SIZE = typer.Option(1000, help="Documents per insert_many batch")
+WORKERS = typer.Option(os.cpu_count() or 4, help="Processes hashing passwords")
+ROUNDS = typer.Option(int(os.environ.get("BCRYPT_ROUNDS", "12")), help="bcrypt cost factor")
+HISTORY_HOURS = typer.Option(0.0, help="Hours of simulated location history per tourist")
+HISTORY_INTERVAL = typer.Option(60, help="Seconds between simulated fixes")
+
+
+@app.command()
+def generate(
+    count: int = typer.Option(1000, help="Number of tourists to create"),
+    start: int = typer.Option(0, help="First tourist number; emails are tourist<N>@<domain>"),
+    password: str = typer.Option("tourist123", help="Password given to every generated tourist"),
+    email_domain: str = typer.Option("seed.safetrail.test", help="Domain of generated emails"),
+    batch_size: int = BATCH_SIZE,
+    workers: int = WORKERS,
+    rounds: int = ROUNDS,
+    history_hours: float = HISTORY_HOURS,
+    history_interval: int = HISTORY_INTERVAL,
+):
+    """Generate tourists with deterministic names and emails"""
+    asyncio.run(seed(generated_rows(count, password, email_domain, start), batch_size, workers, rounds,
+                     history_hours, history_interval))
+
+
+@app.command("import")
+def import_file(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV, JSON or NDJSON file"),
+    batch_size: int = BATCH_SIZE,
+    workers: int = WORKERS,
+    rounds: int = ROUNDS,
+    history_hours: float = HISTORY_HOURS,
+    history_interval: int = HISTORY_INTERVAL,
+):
+    """Import users from a file with email, full_name, password and optional role"""
+    asyncio.run(seed(file_rows(path), batch_size, workers, rounds, history_hours, history_interval))
+
+
+if __name__ == "__main__":
+    app()
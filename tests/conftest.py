@@ -0,0 +1,34 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Backend modules import each other as top-level modules, the way server.py runs them
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# API tests run server.py against the in-memory store with cheap password hashing
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+
+@pytest.fixture(scope="session")
+def client():
+    # One app lifecycle per run: shutdown closes the password hashing pool for good
+    import server
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def register(client):
+    """Register a user through the API; returns its id and bearer headers"""
+    def register_user(email: str, role: str) -> dict:
+        response = client.post("/api/auth/register", json={
+            "email": email, "password": "secret123", "full_name": email.split("@")[0], "role": role,
+        })
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return {"id": body["user"]["id"], "headers": {"Authorization": f"Bearer {body['access_token']}"}}
+    return register_user
@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+from alert_dispatch import AlertDispatcher
+
+
+def alert(alert_type: str, alert_id: str) -> dict:
+    return {"id": alert_id, "alert_type": alert_type, "tourist_id": "tourist-1"}
+
+
+class FakeSender:
+    """Records persisted and delivered batches; fails the first ``failures`` persist calls"""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.attempts = []
+        self.persisted = []
+        self.delivered = []
+
+    async def persist(self, alerts):
+        self.attempts.append(time.monotonic())
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if len(self.attempts) <= self.failures:
+            raise RuntimeError("storage unavailable")
+        self.persisted.append([item["id"] for item in alerts])
+
+    def deliver(self, alerts):
+        self.delivered.append([item["id"] for item in alerts])
+
+
+def test_panic_dispatched_before_lower_priorities():
+    async def scenario():
+        sender = FakeSender()
+        dispatcher = AlertDispatcher(sender.persist, sender.deliver, workers=1, reserved_workers=0)
+        futures = await dispatcher.submit([
+            alert("custom", "other-1"),
+            alert("geo_fence", "fence-1"),
+            alert("panic", "panic-1"),
+            alert("geo_fence", "fence-2"),
+            alert("panic", "panic-2"),
+        ])
+        dispatcher.start()
+        assert all(await asyncio.gather(*futures))
+        await dispatcher.stop()
+        return sender
+
+    sender = asyncio.run(scenario())
+    # One priority per batch, most urgent first, submission order within a priority
+    assert sender.persisted == [["panic-1", "panic-2"], ["fence-1", "fence-2"], ["other-1"]]
+    assert sender.delivered == sender.persisted
+
+
+def test_reserved_worker_takes_panic_while_others_are_busy():
+    async def scenario():
+        persisted = []
+        release = asyncio.Event()
+
+        async def persist(alerts):
+            if alerts[0]["alert_type"] != "panic":
+                await release.wait()
+            persisted.append(alerts[0]["id"])
+
+        dispatcher = AlertDispatcher(persist, lambda alerts: None, workers=1, reserved_workers=1)
+        dispatcher.start()
+        [slow] = await dispatcher.submit([alert("geo_fence", "fence-1")])
+        await asyncio.sleep(0.01)
+        [panic] = await dispatcher.submit([alert("panic", "panic-1")])
+        assert await asyncio.wait_for(panic, timeout=1)
+        assert persisted == ["panic-1"]
+        release.set()
+        assert await slow
+        await dispatcher.stop()
+        return persisted
+
+    assert asyncio.run(scenario()) == ["panic-1", "fence-1"]
+
+
+def test_failed_persist_is_retried_with_backoff():
+    async def scenario():
+        sender = FakeSender(failures=2)
+        dispatcher = AlertDispatcher(sender.persist, sender.deliver, workers=1, reserved_workers=0,
+                                     max_attempts=3, retry_delay=0.02)
+        dispatcher.start()
+        [future] = await dispatcher.submit([alert("geo_fence", "fence-1")])
+        delivered = await future
+        await dispatcher.stop()
+        return sender, dispatcher, delivered
+
+    sender, dispatcher, delivered = asyncio.run(scenario())
+    assert delivered is True
+    assert sender.persisted == [["fence-1"]]
+    assert dispatcher.retries == 2
+    assert dispatcher.dead_lettered == 0
+    # The wait grows with each attempt: retry_delay, then 2 * retry_delay
+    first_gap = sender.attempts[1] - sender.attempts[0]
+    second_gap = sender.attempts[2] - sender.attempts[1]
+    assert first_gap >= 0.02
+    assert second_gap >= 0.04
+
+
+def test_dead_letter_after_max_attempts():
+    async def scenario():
+        sender = FakeSender(failures=10)
+        dispatcher = AlertDispatcher(sender.persist, sender.deliver, workers=1, reserved_workers=0,
+                                     max_attempts=3, retry_delay=0.001)
+        dispatcher.start()
+        futures = await dispatcher.submit([alert("anomaly", "anomaly-1"), alert("anomaly", "anomaly-2")])
+        results = await asyncio.gather(*futures)
+        await dispatcher.stop()
+        return sender, dispatcher, results
+
+    sender, dispatcher, results = asyncio.run(scenario())
+    assert results == [False, False]
+    assert len(sender.attempts) == 3
+    assert sender.delivered == []
+    assert dispatcher.dead_lettered == 2
+    assert [letter["alert"]["id"] for letter in dispatcher.dead_letters] == ["anomaly-1", "anomaly-2"]
+    assert "storage unavailable" in dispatcher.dead_letters[0]["error"]
+
+
+def test_dead_letters_can_be_retried():
+    async def scenario():
+        sender = FakeSender(failures=1)
+        dispatcher = AlertDispatcher(sender.persist, sender.deliver, workers=1, reserved_workers=0,
+                                     max_attempts=1)
+        dispatcher.start()
+        [future] = await dispatcher.submit([alert("missing", "missing-1")])
+        assert await future is False
+        assert await dispatcher.retry_dead_letters() == 1
+        await dispatcher.stop()
+        return sender, dispatcher
+
+    sender, dispatcher = asyncio.run(scenario())
+    assert sender.persisted == [["missing-1"]]
+    assert len(dispatcher.dead_letters) == 0
+
+
+def test_saturation_ignores_queued_panics():
+    async def scenario():
+        dispatcher = AlertDispatcher(FakeSender().persist, lambda alerts: None, max_pending=2)
+        await dispatcher.submit([alert("panic", f"panic-{i}") for i in range(5)])
+        assert not dispatcher.saturated
+        await dispatcher.submit([alert("geo_fence", "fence-1"), alert("geo_fence", "fence-2")])
+        return dispatcher.saturated
+
+    assert asyncio.run(scenario()) is True
@@ -0,0 +1,98 @@
+import asyncio
+import base64
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+
+T0 = datetime(2026, 2, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def insert_alerts(tourist_id: str, specs) -> list:
+    """Store alerts built from (minutes after T0, alert_type, status) tuples"""
+    alerts = [
+        server.Alert(tourist_id=tourist_id, alert_type=alert_type, status=status, message="Pagination check",
+                     location={"latitude": 28.6, "longitude": 77.2},
+                     created_at=T0 + timedelta(minutes=minutes)).model_dump()
+        for minutes, alert_type, status in specs
+    ]
+    asyncio.run(server.repo.insert_alerts(alerts))
+    return alerts
+
+
+def newest_first(alerts) -> list:
+    return [alert["id"] for alert in sorted(alerts, key=lambda alert: (alert["created_at"], alert["id"]), reverse=True)]
+
+
+@pytest.fixture
+def authority(register):
+    return register(f"pagination-{uuid.uuid4().hex[:8]}@example.com", "authority")
+
+
+def test_pages_cross_tied_created_at_without_gaps(client, authority):
+    # Five alerts share one timestamp, so the page boundaries fall inside the tie
+    alerts = insert_alerts("paging-tourist", [(0, "anomaly", "active")] * 5 + [(1, "anomaly", "active")] * 2)
+
+    ids, cursor = [], None
+    while True:
+        params = {"tourist_id": "paging-tourist", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/authority/alerts", headers=authority["headers"], params=params)
+        assert response.status_code == 200
+        ids += [alert["id"] for alert in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert ids == newest_first(alerts)
+
+
+def test_since_polls_walk_forward_through_ties(client, authority):
+    alerts = insert_alerts("polling-tourist", [(0, "panic", "active")] * 4)
+    expected = list(reversed(newest_first(alerts)))
+
+    first = client.get("/api/authority/alerts", headers=authority["headers"],
+                       params={"tourist_id": "polling-tourist", "limit": 1})
+    [newest] = first.json()
+    assert newest["id"] == expected[-1]
+
+    # Polling from the oldest alert returns the rest oldest first, a page at a time
+    since = server.encode_alert_cursor(next(alert for alert in alerts if alert["id"] == expected[0]))
+    polled = []
+    for _ in range(3):
+        response = client.get("/api/authority/alerts", headers=authority["headers"],
+                              params={"tourist_id": "polling-tourist", "limit": 2, "since": since})
+        polled += [alert["id"] for alert in response.json()]
+        since = response.headers["X-Latest-Cursor"]
+    assert polled == expected[1:]
+
+
+def test_status_and_type_filters_combine(client, authority):
+    alerts = insert_alerts("filter-tourist", [
+        (0, "panic", "active"),
+        (1, "panic", "resolved"),
+        (2, "geo_fence", "resolved"),
+        (3, "panic", "resolved"),
+        (4, "geo_fence", "active"),
+    ])
+    response = client.get("/api/authority/alerts", headers=authority["headers"], params={
+        "tourist_id": "filter-tourist", "status": "resolved", "alert_type": "panic",
+    })
+    assert response.status_code == 200
+    expected = [alert for alert in alerts if alert["status"] == "resolved" and alert["alert_type"] == "panic"]
+    assert [alert["id"] for alert in response.json()] == newest_first(expected)
+
+
+@pytest.mark.parametrize("param", ["cursor", "since"])
+@pytest.mark.parametrize("value", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b'["yesterday", "alert-1"]').decode("ascii"),
+    base64.urlsafe_b64encode(b'{"created_at": null}').decode("ascii"),
+])
+def test_malformed_cursor_is_rejected(client, authority, param, value):
+    response = client.get("/api/authority/alerts", headers=authority["headers"], params={param: value})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+from anomaly import MISSING, AnomalyDetector
+from geo_index import ZoneIndex
+
+T0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+MISSING_AFTER = 1800
+
+
+def detector_with_pings(*tourist_ids):
+    detector = AnomalyDetector(ZoneIndex(), missing_after=MISSING_AFTER)
+    detector.observe_many(list(tourist_ids), [28.6] * len(tourist_ids), [77.2] * len(tourist_ids),
+                          [T0] * len(tourist_ids), received_at=T0.timestamp())
+    return detector
+
+
+def swept_ids(detector, after_seconds: float):
+    return sorted(event.tourist_id for event in detector.sweep(T0.timestamp() + after_seconds))
+
+
+def test_missing_only_for_tourists_on_an_active_trip():
+    detector = detector_with_pings("on-trip", "trip-ended", "no-trip", "open-ended")
+    detector.set_trip("on-trip", T0 - timedelta(days=1), T0 + timedelta(days=3))
+    detector.set_trip("trip-ended", T0 - timedelta(days=3), T0 + timedelta(minutes=10))
+    detector.set_trip("open-ended", T0 - timedelta(days=1), None)
+
+    assert swept_ids(detector, MISSING_AFTER - 1) == []
+    events = detector.sweep(T0.timestamp() + MISSING_AFTER)
+    assert sorted(event.tourist_id for event in events) == ["on-trip", "open-ended"]
+    assert {event.kind for event in events} == {MISSING}
+    # Once per silence
+    assert swept_ids(detector, MISSING_AFTER * 2) == []
+
+
+def test_trip_set_before_the_first_ping_applies():
+    detector = AnomalyDetector(ZoneIndex(), missing_after=MISSING_AFTER)
+    detector.set_trip("tourist-1", T0.isoformat(), (T0 + timedelta(days=1)).isoformat())
+    detector.observe_many(["tourist-1"], [28.6], [77.2], [T0], received_at=T0.timestamp())
+    assert swept_ids(detector, MISSING_AFTER) == ["tourist-1"]
+
+
+def test_trip_not_started_yet_is_not_swept():
+    detector = detector_with_pings("tourist-1")
+    detector.set_trip("tourist-1", T0 + timedelta(days=1), T0 + timedelta(days=5))
+    assert swept_ids(detector, MISSING_AFTER) == []
+
+
+def test_ping_after_missing_rearms_the_check():
+    detector = detector_with_pings("tourist-1")
+    detector.set_trip("tourist-1", T0 - timedelta(days=1), T0 + timedelta(days=1))
+    assert swept_ids(detector, MISSING_AFTER) == ["tourist-1"]
+    later = T0 + timedelta(seconds=MISSING_AFTER + 60)
+    detector.observe_many(["tourist-1"], [28.6], [77.2], [later], received_at=later.timestamp())
+    assert swept_ids(detector, MISSING_AFTER + 60 + MISSING_AFTER) == ["tourist-1"]
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from location_history import LocationSample
+
+T0 = datetime(2026, 1, 2, 6, 0, tzinfo=timezone.utc)
+
+
+def ndjson(response) -> list:
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_exported_timestamps_use_z(client, register):
+    authority = register("exports@example.com", "authority")
+    alert = server.Alert(tourist_id="export-tourist", alert_type="anomaly", message="Export check",
+                         location={"latitude": 28.6, "longitude": 77.2},
+                         created_at=datetime(2026, 1, 1, 9, 30, tzinfo=timezone.utc)).model_dump()
+    asyncio.run(server.repo.insert_alerts([alert]))
+    resolved = client.put(f"/api/authority/alerts/{alert['id']}/resolve", headers=authority["headers"])
+    assert resolved.status_code == 200
+
+    response = client.get("/api/authority/exports/alerts", headers=authority["headers"],
+                          params={"tourist_id": "export-tourist"})
+    [row] = [json.loads(line) for line in response.text.splitlines()]
+    assert row["created_at"] == "2026-01-01T09:30:00Z"
+    assert row["resolved_at"].endswith("Z")
+
+    csv_export = client.get("/api/authority/exports/alerts", headers=authority["headers"],
+                            params={"tourist_id": "export-tourist", "format": "csv"})
+    assert "2026-01-01T09:30:00Z" in csv_export.text
+
+
+def test_alert_export_resumes_after_cursor_inside_a_tie(client, register):
+    authority = register("export-resume@example.com", "authority")
+    alerts = [
+        server.Alert(tourist_id="resume-tourist", alert_type="anomaly", message="Resume check",
+                     location={"latitude": 28.6, "longitude": 77.2}, created_at=T0 + timedelta(minutes=minutes)).model_dump()
+        for minutes in (0, 1, 1, 1, 2)
+    ]
+    asyncio.run(server.repo.insert_alerts(alerts))
+    params = {"tourist_id": "resume-tourist"}
+
+    rows = ndjson(client.get("/api/authority/exports/alerts", headers=authority["headers"], params=params))
+    assert [row["id"] for row in rows] == [
+        alert["id"] for alert in sorted(alerts, key=lambda alert: (alert["created_at"], alert["id"]))
+    ]
+
+    resumed = ndjson(client.get("/api/authority/exports/alerts", headers=authority["headers"],
+                                params={**params, "cursor": rows[2]["cursor"]}))
+    assert resumed == rows[3:]
+
+
+def test_location_export_resumes_after_cursor(client, register):
+    authority = register("export-locations@example.com", "authority")
+    samples = [
+        LocationSample(tourist_id, 28.6, 77.2, T0 + timedelta(minutes=minutes))
+        for tourist_id in ("export-a", "export-b") for minutes in (0, 30, 70)
+    ]
+    asyncio.run(server.location_history.append(samples))
+    params = {"start": T0.isoformat(), "end": (T0 + timedelta(hours=3)).isoformat()}
+
+    rows = [
+        row for row in ndjson(client.get("/api/authority/exports/locations", headers=authority["headers"],
+                                         params=params))
+        if row["tourist_id"].startswith("export-")
+    ]
+    assert [(row["tourist_id"], row["timestamp"]) for row in rows] == [
+        (sample.tourist_id, sample.timestamp.isoformat().replace("+00:00", "Z")) for sample in samples
+    ]
+
+    resumed = ndjson(client.get("/api/authority/exports/locations", headers=authority["headers"],
+                                params={**params, "cursor": rows[2]["cursor"]}))
+    assert [row for row in resumed if row["tourist_id"].startswith("export-")] == rows[3:]
+
+
+@pytest.mark.parametrize("export", ["alerts", "locations"])
+def test_malformed_export_cursor_is_rejected(client, register, export):
+    authority = register(f"export-cursor-{export}@example.com", "authority")
+    response = client.get(f"/api/authority/exports/{export}", headers=authority["headers"],
+                          params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
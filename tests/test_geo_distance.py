@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from geo_distance import haversine, haversine_matrix, within_radius, zones_to_arrays
+
+DELHI = (28.6139, 77.2090)
+MUMBAI = (19.0760, 72.8777)
+
+
+def test_haversine_known_distances():
+    assert haversine(*DELHI, *DELHI) == 0
+    # Delhi to Mumbai is about 1,150km on a sphere
+    assert haversine(*DELHI, *MUMBAI) == pytest.approx(1_153_000, rel=0.005)
+    assert haversine(*MUMBAI, *DELHI) == pytest.approx(haversine(*DELHI, *MUMBAI))
+    # A quarter of the way round the earth
+    assert haversine(0, 0, 0, 90) == pytest.approx(np.pi / 2 * 6371000.0)
+
+
+def test_matrix_matches_scalar_haversine():
+    lats, lngs = [28.6, 28.61, -33.86, 51.5], [77.2, 77.22, 151.2, -0.12]
+    center_lats, center_lngs = [28.6139, 19.0760, 35.68], [77.2090, 72.8777, 139.69]
+
+    distances = haversine_matrix(lats, lngs, center_lats, center_lngs)
+    assert distances.shape == (4, 3)
+    for i, (lat, lng) in enumerate(zip(lats, lngs)):
+        for j, (center_lat, center_lng) in enumerate(zip(center_lats, center_lngs)):
+            assert distances[i, j] == pytest.approx(haversine(lat, lng, center_lat, center_lng))
+
+
+def test_within_radius_is_inclusive_per_centre():
+    centre_lat, centre_lng = DELHI
+    north = centre_lat + 150 / 111320.0
+    distance = haversine(north, centre_lng, centre_lat, centre_lng)
+
+    mask = within_radius([centre_lat, north], [centre_lng, centre_lng], [centre_lat, centre_lat],
+                         [centre_lng, centre_lng], [100, distance])
+    assert mask.dtype == bool
+    assert mask.tolist() == [[True, True], [False, True]]
+
+
+def test_empty_inputs_keep_their_shape():
+    assert haversine_matrix([], [], [28.6], [77.2]).shape == (0, 1)
+    assert within_radius([28.6], [77.2], [], [], []).shape == (1, 0)
+
+
+def test_zones_to_arrays():
+    zones = [
+        {"id": "a", "center_lat": 28.6, "center_lng": 77.2, "radius": 100},
+        {"id": "b", "center_lat": 19.07, "center_lng": 72.87, "radius": 250.5},
+    ]
+    center_lats, center_lngs, radii = zones_to_arrays(zones)
+    assert center_lats.tolist() == [28.6, 19.07]
+    assert center_lngs.tolist() == [77.2, 72.87]
+    assert radii.tolist() == [100.0, 250.5]
+    assert all(array.dtype == np.float64 for array in (center_lats, center_lngs, radii))
+    assert [array.size for array in zones_to_arrays([])] == [0, 0, 0]
@@ -0,0 +1,94 @@
+import math
+
+from geo_distance import haversine
+from geo_index import METERS_PER_DEGREE_LAT, ZoneIndex
+
+
+def zone(zone_id: str, lat: float, lng: float, radius: float) -> dict:
+    return {"id": zone_id, "name": zone_id, "center_lat": lat, "center_lng": lng, "radius": radius,
+            "risk_level": "high"}
+
+
+def zone_ids(zones) -> set:
+    return {zone["id"] for zone in zones}
+
+
+def brute_force(zones, lat: float, lng: float) -> set:
+    return {z["id"] for z in zones if haversine(lat, lng, z["center_lat"], z["center_lng"]) <= z["radius"]}
+
+
+def test_zone_spanning_cell_boundary_found_from_every_cell():
+    index = ZoneIndex(cell_size_deg=0.01)
+    # Centred on a grid corner, so the circle covers four cells
+    index.add(zone("corner", 28.61, 77.21, 300))
+    offset = 200 / METERS_PER_DEGREE_LAT
+    for d_lat in (-offset, offset):
+        for d_lng in (-offset, offset):
+            assert zone_ids(index.zones_containing(28.61 + d_lat, 77.21 + d_lng)) == {"corner"}
+    assert index.zones_containing(28.61 + 2 * offset, 77.21) == []
+
+
+def test_overlapping_zones_and_exact_radius_check():
+    index = ZoneIndex()
+    index.rebuild([zone("big", 28.6, 77.2, 1000), zone("small", 28.6, 77.2, 100)])
+    assert zone_ids(index.zones_containing(28.6, 77.2)) == {"big", "small"}
+    # Inside the small zone's cell and bounding box, but outside its circle
+    lat = 28.6 + 150 / METERS_PER_DEGREE_LAT
+    assert zone_ids(index.candidates(lat, 77.2)) == {"big", "small"}
+    assert zone_ids(index.zones_containing(lat, 77.2)) == {"big"}
+
+
+def test_zones_containing_many_matches_brute_force():
+    zones = [
+        zone("a", 28.600, 77.200, 500),
+        zone("b", 28.605, 77.204, 800),
+        zone("c", 28.640, 77.250, 2500),
+        zone("d", 19.076, 72.877, 1200),
+    ]
+    index = ZoneIndex(cell_size_deg=0.005)
+    index.rebuild(zones)
+    lats = [28.600 + i * 0.002 for i in range(30)] + [19.076, 19.09, -33.86]
+    lngs = [77.200 + i * 0.0025 for i in range(30)] + [72.877, 72.877, 151.2]
+
+    results = index.zones_containing_many(lats, lngs)
+    assert len(results) == len(lats)
+    for lat, lng, found in zip(lats, lngs, results):
+        assert zone_ids(found) == brute_force(zones, lat, lng)
+    assert any(len(found) > 1 for found in results)
+
+
+def test_remove_and_replace_update_cells():
+    index = ZoneIndex()
+    index.add(zone("z", 28.6, 77.2, 200))
+    # Re-adding under the same id moves the zone instead of duplicating it
+    index.add(zone("z", 12.97, 77.59, 200))
+    assert len(index) == 1
+    assert index.zones_containing(28.6, 77.2) == []
+    assert zone_ids(index.zones_containing(12.97, 77.59)) == {"z"}
+    assert index.get("z")["center_lat"] == 12.97
+
+    index.remove("z")
+    index.remove("missing")
+    assert len(index) == 0
+    assert index.get("z") is None
+    assert index.zones_containing(12.97, 77.59) == []
+    assert index._cells == {}
+
+
+def test_rebuild_replaces_contents_and_max_radius():
+    index = ZoneIndex()
+    assert index.max_radius == 0.0
+    index.rebuild([zone("a", 28.6, 77.2, 300), zone("b", 28.7, 77.3, 900)])
+    assert index.max_radius == 900
+    index.rebuild([zone("c", 28.8, 77.4, 50)])
+    assert zone_ids(index.zones()) == {"c"}
+    assert index.max_radius == 50
+    assert index.zones_containing(28.7, 77.3) == []
+
+
+def test_high_latitude_zone_covers_its_longitude_span():
+    index = ZoneIndex()
+    index.add(zone("north", 78.22, 15.65, 2000))
+    # 1.9km due east is several longitude cells away this far north
+    d_lng = math.degrees(1900 / (6371000.0 * math.cos(math.radians(78.22))))
+    assert zone_ids(index.zones_containing(78.22, 15.65 + d_lng)) == {"north"}
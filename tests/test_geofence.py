@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from geo_index import METERS_PER_DEGREE_LAT, ZoneIndex
+from geofence import DWELL, ENTER, EXIT, GeofenceTracker
+from memory_store import MemoryRepository
+
+CENTER_LAT = 28.6139
+CENTER_LNG = 77.2090
+RADIUS = 100.0
+EXIT_MARGIN = 50.0
+T0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def north_of_center(meters: float):
+    return CENTER_LAT + meters / METERS_PER_DEGREE_LAT, CENTER_LNG
+
+
+@pytest.fixture
+def tracker():
+    repo = MemoryRepository()
+    asyncio.run(repo.insert_zone({
+        "id": "zone-1", "name": "Market", "center_lat": CENTER_LAT, "center_lng": CENTER_LNG,
+        "radius": RADIUS, "risk_level": "high",
+    }))
+    zone_index = ZoneIndex()
+    zone_index.rebuild(asyncio.run(repo.list_zones()))
+    return GeofenceTracker(zone_index, exit_margin=EXIT_MARGIN, dwell_thresholds=(600, 1800))
+
+
+def fix(tracker, meters: float, seconds: float, tourist_id: str = "tourist-1"):
+    lat, lng = north_of_center(meters)
+    return tracker.evaluate_many([tourist_id], [lat], [lng], [T0 + timedelta(seconds=seconds)])
+
+
+def kinds(events):
+    return [event.kind for event in events]
+
+
+def test_entry_then_immediate_exit(tracker):
+    assert kinds(fix(tracker, 0, 0)) == [ENTER]
+    events = fix(tracker, RADIUS + EXIT_MARGIN + 500, 1)
+    assert kinds(events) == [EXIT]
+    assert events[0].dwell_seconds == 1
+    assert tracker.zones_for("tourist-1") == []
+    assert len(tracker) == 0
+
+
+def test_entry_and_exit_in_one_batch(tracker):
+    inside = north_of_center(0)
+    outside = north_of_center(RADIUS + EXIT_MARGIN + 500)
+    events = tracker.evaluate_many(
+        ["tourist-1", "tourist-1"], [inside[0], outside[0]], [inside[1], outside[1]], [T0, T0 + timedelta(seconds=5)]
+    )
+    assert kinds(events) == [ENTER, EXIT]
+
+
+def test_dwell_fires_exactly_at_threshold(tracker):
+    fix(tracker, 0, 0)
+    assert fix(tracker, 0, 599) == []
+    events = fix(tracker, 0, 600)
+    assert kinds(events) == [DWELL]
+    assert events[0].dwell_seconds == 600
+    # Each threshold fires once
+    assert fix(tracker, 0, 601) == []
+    assert kinds(fix(tracker, 0, 1800)) == [DWELL]
+    assert fix(tracker, 0, 3600) == []
+
+
+def test_crossing_several_thresholds_at_once(tracker):
+    fix(tracker, 0, 0)
+    events = fix(tracker, 0, 2000)
+    assert kinds(events) == [DWELL, DWELL]
+
+
+def test_no_exit_inside_hysteresis_band(tracker):
+    fix(tracker, 0, 0)
+    assert fix(tracker, RADIUS + 20, 10) == []
+    assert fix(tracker, RADIUS + EXIT_MARGIN - 5, 20) == []
+    assert tracker.zones_for("tourist-1") == ["zone-1"]
+    # Coming back inside from the band is not a new entry
+    assert fix(tracker, 0, 30) == []
+    assert kinds(fix(tracker, RADIUS + EXIT_MARGIN + 5, 40)) == [EXIT]
+
+
+def test_dwell_keeps_counting_inside_hysteresis_band(tracker):
+    fix(tracker, 0, 0)
+    events = fix(tracker, RADIUS + 20, 600)
+    assert kinds(events) == [DWELL]
+
+
+def test_reentry_after_exit_starts_a_new_stay(tracker):
+    fix(tracker, 0, 0)
+    fix(tracker, RADIUS + EXIT_MARGIN + 500, 700)
+    assert kinds(fix(tracker, 0, 800)) == [ENTER]
+    # Dwell is measured from the new entry, not the first one
+    assert fix(tracker, 0, 1300) == []
+    assert kinds(fix(tracker, 0, 1400)) == [DWELL]
+
+
+def test_late_fix_does_not_rewind_presence(tracker):
+    fix(tracker, 0, 100)
+    assert fix(tracker, RADIUS + EXIT_MARGIN + 500, 50) == []
+    assert tracker.zones_for("tourist-1") == ["zone-1"]
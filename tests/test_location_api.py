@@ -0,0 +1,52 @@
+import pytest
+
+import server
+
+
+def test_batch_with_naive_and_offset_timestamps(client, register):
+    tourist = register("mixed@example.com", "tourist")
+    response = client.post("/api/tourist/locations/batch", headers=tourist["headers"], json={"samples": [
+        {"tourist_id": tourist["id"], "latitude": 28.61, "longitude": 77.20, "timestamp": "2026-01-01T10:00:05"},
+        {"tourist_id": tourist["id"], "latitude": 28.62, "longitude": 77.21, "timestamp": "2026-01-01T10:00:00Z"},
+    ]})
+    assert response.status_code == 200, response.text
+    assert response.json()["accepted"] == 2
+    # The naive fix is read as UTC, so it is the newer of the two
+    assert server.location_buffer.get(tourist["id"])["latitude"] == 28.61
+
+
+@pytest.mark.parametrize("latitude, longitude", [(95, 77.2), (28.6, 200), (-90.5, 0)])
+def test_out_of_range_coordinates_are_rejected(client, register, latitude, longitude):
+    tourist = register(f"range-{latitude}-{longitude}@example.com", "tourist")
+    response = client.put("/api/tourist/location", headers=tourist["headers"], json={
+        "tourist_id": tourist["id"], "latitude": latitude, "longitude": longitude,
+    })
+    assert response.status_code == 422
+    assert server.location_buffer.get(tourist["id"]) is None
+
+
+def test_zone_with_out_of_range_center_is_rejected(client, register):
+    authority = register("zones@example.com", "authority")
+    response = client.post("/api/zones", headers=authority["headers"], json={
+        "name": "Nowhere", "center_lat": 28.6, "center_lng": 181, "radius": 100,
+        "risk_level": "high", "description": "Off the map",
+    })
+    assert response.status_code == 422
+
+
+def test_spatial_reads_see_a_ping_before_it_is_flushed(client, register):
+    tourist = register("nearby@example.com", "tourist")
+    authority = register("nearby-officer@example.com", "authority")
+    response = client.put("/api/tourist/location", headers=tourist["headers"], json={
+        "tourist_id": tourist["id"], "latitude": -33.8688, "longitude": 151.2093,
+    })
+    assert response.status_code == 200
+    assert server.location_buffer.get(tourist["id"]) is not None
+
+    near = client.get("/api/authority/tourists/near", headers=authority["headers"],
+                      params={"latitude": -33.8688, "longitude": 151.2093, "radius": 500})
+    assert [row["user_id"] for row in near.json()] == [tourist["id"]]
+
+    viewport = client.get("/api/authority/tourists/viewport", headers=authority["headers"],
+                          params={"south": -34, "west": 151, "north": -33.5, "east": 151.5, "zoom": 12})
+    assert [row["user_id"] for row in viewport.json()["tourists"]] == [tourist["id"]]
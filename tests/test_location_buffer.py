@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from location_buffer import LatestPositionBuffer
+
+T0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def location(latitude: float) -> dict:
+    return {"latitude": latitude, "longitude": 77.2}
+
+
+class FakeWriter:
+    """Records written batches; fails the first ``failures`` calls, optionally after a delay"""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.written = []
+
+    async def __call__(self, batch):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise RuntimeError("storage unavailable")
+        self.written.append(batch)
+
+
+def test_failed_flush_requeues_batch():
+    async def scenario():
+        writer = FakeWriter(failures=1)
+        buffer = LatestPositionBuffer(writer)
+        buffer.put("tourist-1", location(1.0), T0)
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        assert len(buffer) == 1
+        assert buffer.get("tourist-1") == location(1.0)
+        assert await buffer.flush() == 1
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert writer.written == [{"tourist-1": location(1.0)}]
+    assert len(buffer) == 0
+
+
+def test_requeue_keeps_newer_fix_from_during_the_write():
+    async def scenario():
+        writer = FakeWriter(failures=1, delay=0.05)
+        buffer = LatestPositionBuffer(writer)
+        buffer.put("tourist-1", location(1.0), T0)
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        buffer.put("tourist-1", location(2.0), T0 + timedelta(seconds=5))
+        with pytest.raises(RuntimeError):
+            await flush
+        return buffer
+
+    assert asyncio.run(scenario()).get("tourist-1") == location(2.0)
+
+
+def test_in_flight_entries_stay_readable():
+    async def scenario():
+        buffer = LatestPositionBuffer(FakeWriter(delay=0.05))
+        buffer.put("tourist-1", location(1.0), T0)
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        during = buffer.get("tourist-1")
+        await flush
+        return during, buffer.get("tourist-1")
+
+    assert asyncio.run(scenario()) == (location(1.0), None)
+
+
+def test_cancelled_flush_puts_batch_back():
+    async def scenario():
+        writer = FakeWriter(delay=0.05)
+        buffer = LatestPositionBuffer(writer)
+        buffer.put("tourist-1", location(1.0), T0)
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        # The shutdown flush still writes the position
+        assert await buffer.flush() == 1
+        return writer
+
+    assert asyncio.run(scenario()).written == [{"tourist-1": location(1.0)}]
+
+
+def test_entry_dead_lettered_after_max_attempts():
+    async def scenario():
+        buffer = LatestPositionBuffer(FakeWriter(failures=10), max_attempts=3)
+        buffer.put("tourist-1", location(1.0), T0)
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await buffer.flush()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert len(buffer) == 0
+    assert buffer.dead_lettered == 1
+    assert buffer.dead_letters[0]["user_id"] == "tourist-1"
+    assert "storage unavailable" in buffer.dead_letters[0]["error"]
+
+
+def test_newer_fix_resets_failed_attempts():
+    async def scenario():
+        buffer = LatestPositionBuffer(FakeWriter(failures=10), max_attempts=2)
+        buffer.put("tourist-1", location(1.0), T0)
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        buffer.put("tourist-1", location(2.0), T0 + timedelta(seconds=5))
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert buffer.get("tourist-1") == location(2.0)
+    assert buffer.dead_lettered == 0
+
+
+def test_older_fix_does_not_replace_newer():
+    buffer = LatestPositionBuffer(FakeWriter())
+    buffer.put("tourist-1", location(2.0), T0 + timedelta(seconds=5))
+    buffer.put("tourist-1", location(1.0), T0)
+    assert buffer.get("tourist-1") == location(2.0)
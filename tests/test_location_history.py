@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from location_history import LocationSample
+from memory_store import MemoryLocationHistory
+
+T0 = datetime(2026, 1, 1, 10, 30, tzinfo=timezone.utc)
+
+
+def collect(iterator):
+    async def run():
+        return [sample async for sample in iterator]
+    return asyncio.run(run())
+
+
+def test_fixes_since_keep_each_tourist_in_time_order():
+    history = MemoryLocationHistory()
+    samples = [
+        LocationSample(tourist_id, 28.6, 77.2, T0 + timedelta(minutes=minutes))
+        for minutes in (50, 10, 40, 95, 70) for tourist_id in ("b", "a")
+    ]
+    asyncio.run(history.append(samples))
+
+    fixes = collect(history.iter_fixes_since(T0 + timedelta(minutes=15)))
+    assert len(fixes) == 8
+    for tourist_id in ("a", "b"):
+        times = [fix.timestamp for fix in fixes if fix.tourist_id == tourist_id]
+        assert times == sorted(times)
+        assert times[0] == T0 + timedelta(minutes=40)
+    # Hour buckets are streamed in order, tourists interleaved within each hour
+    buckets = [fix.timestamp.hour for fix in fixes]
+    assert buckets == sorted(buckets)
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from memory_store import MemoryRepository
+
+T0 = datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def alert(alert_id: str, minutes: int, alert_type: str = "anomaly", status: str = "active") -> dict:
+    return {"id": alert_id, "tourist_id": "tourist-1", "alert_type": alert_type, "status": status,
+            "created_at": T0 + timedelta(minutes=minutes)}
+
+
+def repository(*alerts) -> MemoryRepository:
+    repo = MemoryRepository()
+    asyncio.run(repo.insert_alerts(list(alerts)))
+    return repo
+
+
+def ids(alerts) -> list:
+    return [alert["id"] for alert in alerts]
+
+
+def collect(iterator) -> list:
+    async def run():
+        return [item async for item in iterator]
+    return ids(asyncio.run(run()))
+
+
+def test_find_alerts_keysets_split_a_tie():
+    repo = repository(alert("a", 0), alert("b", 1), alert("c", 1), alert("d", 1), alert("e", 2))
+    tie = (T0 + timedelta(minutes=1), "c")
+
+    assert ids(asyncio.run(repo.find_alerts(10, before=tie))) == ["b", "a"]
+    assert ids(asyncio.run(repo.find_alerts(10, after=tie))) == ["e", "d"]
+    assert ids(asyncio.run(repo.find_alerts(10, after=tie, oldest_first=True))) == ["d", "e"]
+
+
+def test_find_alerts_time_range_includes_start_excludes_end():
+    repo = repository(alert("a", 0), alert("b", 1), alert("c", 1), alert("d", 2))
+    found = asyncio.run(repo.find_alerts(10, start=T0 + timedelta(minutes=1), end=T0 + timedelta(minutes=2)))
+    assert ids(found) == ["c", "b"]
+
+
+def test_find_alerts_filters_within_status_partition():
+    repo = repository(
+        alert("a", 0, "panic", "resolved"),
+        alert("b", 1, "geo_fence", "resolved"),
+        alert("c", 2, "panic", "active"),
+        alert("d", 3, "panic", "resolved"),
+    )
+    assert ids(asyncio.run(repo.find_alerts(10, status="resolved", alert_type="panic"))) == ["d", "a"]
+    assert ids(asyncio.run(repo.find_alerts(1, status="resolved", alert_type="panic"))) == ["d"]
+
+
+def test_resolve_moves_alert_between_partitions():
+    repo = repository(alert("a", 0), alert("b", 1))
+    assert asyncio.run(repo.resolve_alert("a", "authority-1", T0 + timedelta(hours=1)))
+    assert not asyncio.run(repo.resolve_alert("a", "authority-1", T0 + timedelta(hours=2)))
+
+    assert ids(asyncio.run(repo.active_alerts())) == ["b"]
+    assert ids(asyncio.run(repo.find_alerts(10, status="resolved"))) == ["a"]
+    # The unfiltered ordering keeps a single entry per alert
+    assert ids(asyncio.run(repo.find_alerts(10))) == ["b", "a"]
+
+
+def test_reinserting_an_alert_reindexes_it():
+    repo = repository(alert("a", 0), alert("b", 1))
+    asyncio.run(repo.insert_alerts([alert("a", 5, status="resolved")]))
+    assert ids(asyncio.run(repo.find_alerts(10))) == ["a", "b"]
+    assert ids(asyncio.run(repo.find_alerts(10, status="active"))) == ["b"]
+
+
+def test_iter_alerts_resumes_inside_a_tie_across_batches():
+    repo = repository(*[alert(f"t{i}", 1) for i in range(5)], alert("a", 0), alert("z", 2))
+    assert collect(repo.iter_alerts(batch_size=2)) == ["a", "t0", "t1", "t2", "t3", "t4", "z"]
+    assert collect(repo.iter_alerts(after=(T0 + timedelta(minutes=1), "t1"), batch_size=2)) == ["t2", "t3", "t4", "z"]
+
+
+def test_iter_alerts_start_and_after_take_the_later_bound():
+    repo = repository(alert("a", 0), alert("b", 1), alert("c", 1), alert("d", 2))
+    start = T0 + timedelta(minutes=1)
+    # A cursor before start does not reach back past it
+    assert collect(repo.iter_alerts(start=start, after=(T0, "a"))) == ["b", "c", "d"]
+    assert collect(repo.iter_alerts(start=start, after=(start, "b"))) == ["c", "d"]
+    assert collect(repo.iter_alerts(start=start, end=T0 + timedelta(minutes=2))) == ["b", "c"]
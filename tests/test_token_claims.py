@@ -0,0 +1,45 @@
+import pytest
+
+import server
+
+
+@pytest.fixture
+def trusted_claims(monkeypatch):
+    monkeypatch.setattr(server, "TRUST_TOKEN_CLAIMS", True)
+    lookups = []
+    get_user_by_id = server.repo.get_user_by_id
+
+    async def counting_get_user_by_id(user_id):
+        lookups.append(user_id)
+        return await get_user_by_id(user_id)
+
+    monkeypatch.setattr(server.repo, "get_user_by_id", counting_get_user_by_id)
+    return lookups
+
+
+def test_fresh_claims_skip_the_user_lookup(client, register, trusted_claims):
+    tourist = register("claims-fresh@example.com", "tourist")
+    server.user_cache.invalidate(tourist["id"])
+    assert client.get("/api/tourist/profile", headers=tourist["headers"]).status_code == 200
+    assert trusted_claims == []
+
+
+def test_deactivated_user_is_not_trusted_from_old_claims(client, register, trusted_claims):
+    tourist = register("claims-disabled@example.com", "tourist")
+    authority = register("claims-officer@example.com", "authority")
+    response = client.put(f"/api/authority/users/{tourist['id']}", headers=authority["headers"],
+                          json={"is_active": False})
+    assert response.status_code == 200
+    assert client.get("/api/tourist/profile", headers=tourist["headers"]).status_code == 401
+
+
+def test_change_survives_a_restart(client, register, trusted_claims):
+    tourist = register("claims-restart@example.com", "tourist")
+    authority = register("claims-restart-officer@example.com", "authority")
+    client.put(f"/api/authority/users/{tourist['id']}", headers=authority["headers"], json={"role": "authority"})
+    # A restarted or different worker has neither the user nor its marker cached
+    server.user_cache.clear()
+    server.claim_markers.clear()
+    response = client.get("/api/tourist/profile", headers=tourist["headers"])
+    assert response.status_code == 403
+    assert tourist["id"] in trusted_claims